@@ -1,7 +1,7 @@
 import os
 import logging
 
-from flask import Flask
+from flask import Flask, request
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from sqlalchemy.orm import DeclarativeBase
@@ -36,6 +36,9 @@ app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
 # initialize the app with the extension, flask-sqlalchemy >= 3.0.x
 db.init_app(app)
 
+# 정적 파일 브라우저 캐시 시간(초)
+STATIC_MAX_AGE = int(os.environ.get("STATIC_MAX_AGE", 3600))
+
 # Custom template filters
 @app.template_filter('currency')
 def currency_filter(amount):
@@ -110,10 +113,14 @@ def alert_type_filter(alert_type):
 
 @app.after_request
 def after_request(response):
-    """Add cache-busting headers for development"""
-    response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
-    response.headers['Pragma'] = 'no-cache'
-    response.headers['Expires'] = '0'
+    """Set caching headers: static files are cached briefly, other responses revalidate unless a view set its own"""
+    if request.endpoint == 'static':
+        # ETag/Last-Modified는 send_static_file이 설정하므로 재검증 주기만 지정
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = STATIC_MAX_AGE
+    elif 'Cache-Control' not in response.headers:
+        response.headers['Cache-Control'] = 'private, no-cache'
     return response
 
 @login_manager.user_loader
@@ -128,6 +135,18 @@ with app.app_context():
     
     db.create_all()
     
+    # 기존 DB에 새로 추가된 컬럼/인덱스 반영
+    from migrations import upgrade_schema
+    upgrade_schema()
+    
+    # 보고서 집계 테이블이 비어 있으면 기존 거래로 채움
+    from ledger_rollup import ensure_rollup
+    ensure_rollup()
+    
+    # 거래 검색 색인 생성 (비어 있으면 기존 거래 색인)
+    from search_index import ensure_search_index
+    ensure_search_index()
+    
     # Initialize sample data on first run
     from routes import create_tables
     from models import Institution, User
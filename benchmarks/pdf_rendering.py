@@ -0,0 +1,87 @@
+"""
+PDF 렌더링 벤치마크
+
+합성 월별 현금흐름 데이터로 재무 보고서 PDF를 반복 렌더링해
+- 이전 방식: 스타일을 HTML <style>에 넣어 렌더링마다 CSS 파싱/글꼴 설정 생성
+- 현재 방식: pdf_renderer의 공유 렌더러 (파싱된 스타일시트와 FontConfiguration 재사용)
+의 렌더링 지연 시간을 비교한다. 첫 렌더링(준비 비용 포함)은 따로 표시한다.
+
+사용법:
+    python benchmarks/pdf_rendering.py [--months 24] [--repeat 20]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def synthetic_cashflow(months):
+    """monthly_cashflow 결과 형태의 합성 데이터"""
+    rows = []
+    for index in range(months):
+        year, month = 2024 + index // 12, index % 12 + 1
+        income = 50_000_000 + (index * 7_919_000) % 20_000_000
+        expense = 40_000_000 + (index * 5_237_000) % 25_000_000
+        rows.append({'year': year, 'month': month, 'period': f'{year}-{month:02d}',
+                     'income': float(income), 'expense': float(expense), 'net': float(income - expense)})
+    return rows
+
+
+def render_inline(html, css):
+    """이전 방식: <style>을 포함한 HTML 문자열을 매번 처음부터 렌더링"""
+    import weasyprint
+    return weasyprint.HTML(string=html.replace('</head>', f'<style>{css}</style></head>', 1)).write_pdf()
+
+
+def measure(render, repeat):
+    """(첫 렌더링 ms, 이후 렌더링 ms 목록)"""
+    timings = []
+    for _ in range(repeat + 1):
+        started = time.perf_counter()
+        render()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings[0], timings[1:]
+
+
+def summary(label, first_ms, timings):
+    ordered = sorted(timings)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    print(f'{label}')
+    print(f'  첫 렌더링 {first_ms:10.1f} ms')
+    print(f'  평균      {statistics.mean(timings):10.1f} ms  (중앙값 {statistics.median(timings):.1f} ms, p95 {p95:.1f} ms)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='PDF 렌더링 벤치마크')
+    parser.add_argument('--months', type=int, default=24, help='보고서 기간 (개월)')
+    parser.add_argument('--repeat', type=int, default=20, help='측정 반복 횟수')
+    args = parser.parse_args()
+
+    from pdf_renderer import PDF_TEMPLATE_DIR, PdfRenderer
+    from report_renderers import REPORT_PDF_STYLESHEETS, REPORT_PDF_TEMPLATE, report_pdf_context
+
+    data = synthetic_cashflow(args.months)
+    last = data[-1]
+    start_date, end_date = date(2024, 1, 1), date(last['year'], last['month'], 28)
+    context = report_pdf_context(data, start_date, end_date)
+
+    renderer = PdfRenderer()
+    html = renderer.render_html(REPORT_PDF_TEMPLATE, **context)
+    css = ''.join(open(os.path.join(PDF_TEMPLATE_DIR, name), encoding='utf-8').read()
+                  for name in REPORT_PDF_STYLESHEETS)
+
+    print(f'{args.months}개월 보고서, {args.repeat}회 반복')
+    print()
+    summary('이전 방식 (인라인 CSS, 매번 파싱)', *measure(lambda: render_inline(html, css), args.repeat))
+    summary('공유 렌더러 (파싱된 CSS, 글꼴 설정 재사용)',
+            *measure(lambda: renderer.render(REPORT_PDF_TEMPLATE, stylesheets=REPORT_PDF_STYLESHEETS, **context),
+                     args.repeat))
+
+
+if __name__ == '__main__':
+    main()
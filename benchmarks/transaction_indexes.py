@@ -0,0 +1,178 @@
+"""
+Transaction 인덱스 벤치마크
+
+합성 거래 데이터(기본 100만 건)를 만든 뒤 대시보드/거래목록/보고서/데이터관리의
+대표 쿼리를 인덱스 없이, 그리고 인덱스를 만든 뒤 각각 실행해
+실행 계획과 소요 시간을 비교한다.
+
+사용법:
+    python benchmarks/transaction_indexes.py [--rows 1000000] [--database-url URL]
+
+--database-url을 생략하면 임시 SQLite 파일을 사용한다.
+운영 DB를 지정하면 안 된다 (거래 인덱스를 삭제했다가 다시 만든다).
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BATCH_SIZE = 50000
+REPEAT = 3
+
+NOW = datetime.now().replace(microsecond=0)
+MONTH_START = NOW.replace(day=1, hour=0, minute=0, second=0)
+
+# (이름, SQL) - routes.py의 조회 형태를 그대로 옮긴 쿼리
+QUERIES = [
+    ('dashboard: 이번 달 수입 합계',
+     'SELECT SUM(amount) FROM "transaction" '
+     'WHERE is_active = :active AND amount > 0 AND transaction_date >= :start AND transaction_date < :end'),
+    ('transactions: 최신 거래 20건',
+     'SELECT id FROM "transaction" WHERE is_active = :active '
+     'ORDER BY transaction_date DESC LIMIT 20'),
+    ('dashboard: 미분류 건수',
+     'SELECT COUNT(*) FROM "transaction" WHERE classification_status = :status'),
+    ('reports: 부서별 기간 지출',
+     'SELECT SUM(amount) FROM "transaction" '
+     'WHERE department_id = :department_id AND transaction_date >= :start AND transaction_date < :end'),
+    ('transactions: 계정별 최신 거래',
+     'SELECT id FROM "transaction" WHERE account_id = :account_id '
+     'ORDER BY transaction_date DESC LIMIT 20'),
+    ('data_management: 오늘 업로드 건수',
+     'SELECT COUNT(*) FROM "transaction" WHERE created_at >= :today AND created_at < :end'),
+]
+
+
+def query_params(ids):
+    """쿼리 바인드 값 (SQLite 저장 형식과 같은 문자열 일시 사용)"""
+    fmt = '%Y-%m-%d %H:%M:%S'
+    return {
+        'active': True,
+        'status': 'pending',
+        'start': MONTH_START.strftime(fmt),
+        'end': (NOW + timedelta(days=1)).strftime(fmt),
+        'today': NOW.replace(hour=0, minute=0, second=0).strftime(fmt),
+        'department_id': int(ids['department'][0]),
+        'account_id': int(ids['account'][0]),
+    }
+
+
+def generate_rows(rng, start, count, ids):
+    """합성 거래 행 생성"""
+    dates = NOW - pd.to_timedelta(rng.integers(0, 730 * 86400, count), unit='s')
+    amounts = np.round(rng.lognormal(10, 1.5, count), -1) * np.where(rng.random(count) < 0.7, -1, 1)
+    frame = pd.DataFrame({
+        'account_id': rng.choice(ids['account'], count),
+        'transaction_id': [f'BENCH-{n:08d}' for n in range(start, start + count)],
+        'amount': amounts,
+        'transaction_type': np.where(amounts > 0, 'credit', 'debit'),
+        'description': rng.choice(['급여', '사무용품', '카페', '택시', '임대료', '통신비'], count),
+        'counterparty': rng.choice(['회사', '문구점', '스타벅스', '카카오T', '건물주', 'KT'], count),
+        'transaction_date': dates.to_pydatetime(),
+        'department_id': rng.choice(ids['department'], count),
+        'category_id': rng.choice(ids['category'], count),
+        'vendor_id': rng.choice(ids['vendor'], count),
+        'classification_status': rng.choice(['pending', 'classified', 'manual'], count, p=[0.2, 0.7, 0.1]),
+        'is_active': rng.random(count) > 0.02,
+        'created_at': (NOW - pd.to_timedelta(rng.integers(0, 90 * 86400, count), unit='s')).to_pydatetime(),
+    })
+    return frame.astype(object).to_dict('records')
+
+
+def explain(conn, sql, params):
+    """DB별 실행 계획 문자열"""
+    from sqlalchemy import text
+
+    if conn.dialect.name == 'sqlite':
+        rows = conn.execute(text('EXPLAIN QUERY PLAN ' + sql), params).fetchall()
+        return ' / '.join(row[-1] for row in rows)
+    rows = conn.execute(text('EXPLAIN ' + sql), params).fetchall()
+    return ' / '.join(row[0].strip() for row in rows)
+
+
+def run_queries(conn, params):
+    """쿼리별 (최소 소요 시간 ms, 실행 계획) 측정"""
+    from sqlalchemy import text
+
+    results = []
+    for name, sql in QUERIES:
+        timings = []
+        for _ in range(REPEAT):
+            started = time.perf_counter()
+            conn.execute(text(sql), params).fetchall()
+            timings.append((time.perf_counter() - started) * 1000)
+        results.append((name, min(timings), explain(conn, sql, params)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Transaction 인덱스 벤치마크')
+    parser.add_argument('--rows', type=int, default=1_000_000, help='합성 거래 건수')
+    parser.add_argument('--database-url', help='벤치마크용 DB URL (기본: 임시 SQLite)')
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+    else:
+        db_path = os.path.join(tempfile.mkdtemp(prefix='fin-flow-bench-'), 'bench.db')
+        os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+
+    # 앱 import 시 테이블/샘플 데이터가 생성되므로 DATABASE_URL 설정 후 import
+    from app import app, db
+    from models import Account, Category, Department, Transaction, Vendor
+
+    with app.app_context():
+        ids = {
+            'account': [row.id for row in db.session.query(Account.id)],
+            'department': [row.id for row in db.session.query(Department.id)],
+            'category': [row.id for row in db.session.query(Category.id)],
+            'vendor': [row.id for row in db.session.query(Vendor.id)],
+        }
+        if not all(ids.values()):
+            sys.exit('샘플 계정/부서/분류/업체 데이터가 필요합니다.')
+
+        table = Transaction.__table__
+        indexes = [index for index in table.indexes if not index.unique]
+
+        with db.engine.begin() as conn:
+            for index in indexes:
+                index.drop(conn, checkfirst=True)
+
+            print(f'합성 거래 {args.rows:,}건 생성 중...')
+            rng = np.random.default_rng(42)
+            for start in range(0, args.rows, BATCH_SIZE):
+                count = min(BATCH_SIZE, args.rows - start)
+                conn.execute(table.insert(), generate_rows(rng, start, count, ids))
+
+        params = query_params(ids)
+        with db.engine.connect() as conn:
+            before = run_queries(conn, params)
+
+        with db.engine.begin() as conn:
+            for index in indexes:
+                index.create(conn, checkfirst=True)
+            if conn.dialect.name == 'sqlite':
+                conn.exec_driver_sql('ANALYZE')
+            else:
+                conn.exec_driver_sql('ANALYZE "transaction"')
+
+        with db.engine.connect() as conn:
+            after = run_queries(conn, params)
+
+    print()
+    for (name, before_ms, before_plan), (_, after_ms, after_plan) in zip(before, after):
+        print(f'{name}')
+        print(f'  인덱스 없음 {before_ms:10.1f} ms  {before_plan}')
+        print(f'  인덱스 사용 {after_ms:10.1f} ms  {after_plan}')
+
+
+if __name__ == '__main__':
+    main()
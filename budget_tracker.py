@@ -0,0 +1,120 @@
+"""
+예산 사용 현황
+
+ledger_rollup 모듈이 거래 변경과 함께 증분 갱신하는 budget_consumption 카운터를 읽어
+예산 화면, 예산 보고서, 예산 초과 알림에 예산 대비 사용액을 제공한다.
+"""
+
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import func
+
+from app import db
+from models import Alert, AlertSetting, BudgetConsumption, CategoryBudget, Department
+
+
+def consumption_by(scope, months):
+    """(연, 월) 목록에 걸친 scope('department'/'category')별 사용액 {ID: Decimal}"""
+    if not months:
+        return {}
+    rows = db.session.query(
+        BudgetConsumption.ref_id,
+        func.sum(BudgetConsumption.spent)
+    ).filter(
+        BudgetConsumption.scope == scope,
+        (BudgetConsumption.year * 100 + BudgetConsumption.month).in_([year * 100 + month for year, month in months])
+    ).group_by(BudgetConsumption.ref_id).all()
+    return {ref_id: Decimal(str(spent or 0)) for ref_id, spent in rows}
+
+
+def usage(budget, spent):
+    """예산 대비 사용 현황 딕셔너리"""
+    budget = float(budget or 0)
+    spent = float(spent or 0)
+    return {
+        'budget': budget,
+        'spent': spent,
+        'remaining': budget - spent,
+        'ratio': round(spent / budget * 100, 1) if budget > 0 else 0
+    }
+
+
+def department_usage(year, through_month=12):
+    """부서별 연간 예산 사용 현황 {부서 ID: usage} (1월 ~ through_month 사용액)"""
+    spent = consumption_by('department', [(year, month) for month in range(1, through_month + 1)])
+    return {department.id: usage(department.budget, spent.get(department.id))
+            for department in Department.query.all()}
+
+
+def category_usage(year, month):
+    """해당 월 분류 예산 사용 현황 {예산 ID: usage}"""
+    spent = consumption_by('category', [(year, month)])
+    budgets = CategoryBudget.query.filter_by(year=year, month=month, is_active=True).all()
+    return {budget.id: usage(budget.budget_amount, spent.get(budget.category_id)) for budget in budgets}
+
+
+def budget_threshold():
+    """활성 예산 알림 설정의 임계 사용률(%) - 설정이 없으면 None"""
+    settings = AlertSetting.query.filter_by(alert_type='budget', is_active=True).all()
+    thresholds = []
+    for setting in settings:
+        try:
+            thresholds.append(float(setting.condition_value))
+        except (TypeError, ValueError):
+            continue
+    return min(thresholds) if thresholds else None
+
+
+def check_budget_alerts(today=None):
+    """
+    예산 사용률이 알림 임계값 이상인 부서(연간)/분류(이번달)에 예산 알림 생성
+
+    같은 대상에는 한 달에 한 번만 알림을 만든다. 생성한 알림 수를 반환한다.
+    """
+    threshold = budget_threshold()
+    if threshold is None:
+        return 0
+
+    today = today or date.today()
+    month_start = datetime.combine(today.replace(day=1), datetime.min.time())
+
+    candidates = []
+    departments = {department.id: department for department in Department.query.all()}
+    for department_id, status in department_usage(today.year, today.month).items():
+        if status['budget'] > 0 and status['ratio'] >= threshold:
+            candidates.append(('department', department_id, status['ratio'],
+                               f"{departments[department_id].name}의 올해 지출이 예산의 {status['ratio']:.0f}%에 달했습니다."))
+    budgets = {budget.id: budget for budget in
+               CategoryBudget.query.filter_by(year=today.year, month=today.month, is_active=True).all()}
+    for budget_id, status in category_usage(today.year, today.month).items():
+        if status['budget'] > 0 and status['ratio'] >= threshold:
+            category = budgets[budget_id].category
+            name = category.name if category else '알수없음'
+            candidates.append(('category_budget', budget_id, status['ratio'],
+                               f"{name} 분류의 이번 달 지출이 예산의 {status['ratio']:.0f}%에 달했습니다."))
+
+    created = 0
+    for related_table, related_id, ratio, message in candidates:
+        exists = Alert.query.filter(
+            Alert.alert_type == 'budget',
+            Alert.related_table == related_table,
+            Alert.related_id == related_id,
+            Alert.created_at >= month_start
+        ).first()
+        if exists:
+            continue
+        alert = Alert()
+        alert.title = '예산 초과 경고'
+        alert.message = message
+        alert.alert_type = 'budget'
+        alert.severity = 'error' if ratio >= 100 else 'warning'
+        alert.related_table = related_table
+        alert.related_id = related_id
+        alert.is_read = False
+        db.session.add(alert)
+        created += 1
+
+    if created:
+        db.session.commit()
+    return created
@@ -0,0 +1,162 @@
+"""
+애플리케이션 캐시
+
+대시보드 KPI, 차트, 보고서 데이터처럼 계산 비용이 큰 JSON 페이로드를 파라미터별로 캐시한다.
+기본 저장소는 프로세스 내 LRU + TTL이며, CACHE_REDIS_URL을 지정하면 Redis(호환 서버 포함)를
+사용해 여러 워커가 캐시 값도 공유한다.
+
+무효화는 키를 지우지 않고 네임스페이스 세대(generation) 번호를 올리는 방식이다.
+세대 번호는 Redis 또는 DB(cache_generation 테이블)에 두므로, 메모리 저장소를 쓰더라도
+한 워커에서 올린 세대가 모든 워커의 캐시 키에 반영된다.
+거래가 바뀌어 커밋되면 ledger_rollup이 invalidate_ledger_cache()를 호출한다.
+rule_engine도 같은 세대 번호(rules 네임스페이스)로 워커별 규칙 캐시를 맞춘다.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import jsonify, request
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from models import CacheGeneration
+
+CACHE_TTL = int(os.environ.get('CACHE_TTL', 60))
+CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 512))
+CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL')
+
+LEDGER_NAMESPACE = 'ledger'
+RULES_NAMESPACE = 'rules'
+
+
+class MemoryBackend:
+    """프로세스 내 LRU + TTL 저장소"""
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class RedisBackend:
+    """Redis 저장소 - 값은 JSON으로 저장"""
+
+    def __init__(self, url):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        value = self.client.get(key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key, value, ttl):
+        self.client.setex(key, ttl, json.dumps(value, default=str))
+
+    def counter(self, key):
+        return int(self.client.get(key) or 0)
+
+    def incr(self, key):
+        return self.client.incr(key)
+
+
+class DatabaseGenerations:
+    """cache_generation 테이블의 세대 번호 (세션과 별도 연결에서 바로 커밋)"""
+
+    def counter(self, key):
+        with db.engine.connect() as conn:
+            return conn.execute(
+                select(CacheGeneration.generation).where(CacheGeneration.key == key)
+            ).scalar() or 0
+
+    def incr(self, key):
+        statement = update(CacheGeneration).where(CacheGeneration.key == key).values(
+            generation=CacheGeneration.generation + 1
+        )
+        with db.engine.begin() as conn:
+            if conn.execute(statement).rowcount:
+                return self.counter(key)
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(CacheGeneration.__table__.insert().values(key=key, generation=1))
+        except IntegrityError:
+            # 다른 워커가 먼저 행을 만든 경우
+            with db.engine.begin() as conn:
+                conn.execute(statement)
+        return self.counter(key)
+
+
+def create_backend():
+    """설정에 맞는 캐시 저장소 생성 (redis 패키지가 없으면 메모리 사용)"""
+    if CACHE_REDIS_URL:
+        try:
+            return RedisBackend(CACHE_REDIS_URL)
+        except ImportError:
+            print("Warning: redis package not installed, using in-memory cache")
+    return MemoryBackend()
+
+
+_backend = create_backend()
+_generations = _backend if isinstance(_backend, RedisBackend) else DatabaseGenerations()
+
+
+def cache_generation(namespace):
+    """네임스페이스의 현재 세대 번호 (모든 워커 공유)"""
+    return _generations.counter(f'generation:{namespace}')
+
+
+def bump_generation(namespace):
+    """네임스페이스 세대 번호를 올려 모든 워커의 캐시를 무효화"""
+    return _generations.incr(f'generation:{namespace}')
+
+
+def _cache_key(namespace, name, params):
+    generation = cache_generation(namespace)
+    return f'{namespace}:{generation}:{name}:{json.dumps(params, sort_keys=True, default=str)}'
+
+
+def get_or_compute(name, params, compute, ttl=CACHE_TTL, namespace=LEDGER_NAMESPACE):
+    """캐시된 값 반환 - 없으면 compute()로 계산해 저장"""
+    key = _cache_key(namespace, name, params)
+    value = _backend.get(key)
+    if value is None:
+        value = compute()
+        _backend.set(key, value, ttl)
+    return value
+
+
+def invalidate_ledger_cache():
+    """거래 데이터에 의존하는 캐시 전체 무효화"""
+    bump_generation(LEDGER_NAMESPACE)
+
+
+def cacheable_json(payload):
+    """ETag를 붙인 JSON 응답 - 브라우저는 매번 재검증하고 If-None-Match가 같으면 304"""
+    response = jsonify(payload)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.add_etag()
+    return response.make_conditional(request)
@@ -0,0 +1,286 @@
+"""
+거래 내역/보고서 내보내기
+
+기간 거래를 계정/분류/부서/업체와 조인한 단일 쿼리로 읽고, yield_per로 일정 건수씩
+가져오면서 바로 파일 행으로 쓴다. 전체 결과를 메모리에 올리지 않으므로
+1년치 거래도 일정한 메모리로 내려받을 수 있다.
+
+- CSV: 생성기 응답으로 조각 단위 전송
+- Excel: openpyxl write_only 워크북을 임시 파일에 쓴 뒤 send_file로 전송
+- Parquet/Arrow IPC: 타입 있는 컬럼(decimal 금액, timestamp 일시, 사전 인코딩 이름)으로
+  레코드 배치 단위 기록 (pyarrow가 설치된 경우)
+"""
+
+import csv
+import io
+import os
+import re
+import tempfile
+from decimal import Decimal
+
+from flask import send_file
+from sqlalchemy import select
+
+from app import db
+from models import Account, Category, Department, Transaction, Vendor
+from utils import date_range_filter
+from xlsx_writer import XLSX_MIMETYPE, XlsxWorkbook
+
+# 서버 측 커서에서 한 번에 가져올 행 수
+EXPORT_FETCH_SIZE = 1000
+
+TRANSACTION_EXPORT_COLUMNS = ['거래일', '거래시간', '계정', '거래유형', '금액', '내용', '거래처',
+                              '분류', '부서', '업체', '분류상태']
+
+CLASSIFICATION_STATUS_LABELS = {
+    'pending': '미분류',
+    'classified': '분류완료',
+    'manual': '수동분류'
+}
+
+# 컬럼형 형식 -> (확장자, MIME 타입)
+COLUMNAR_EXPORT_FORMATS = {
+    'parquet': ('parquet', 'application/vnd.apache.parquet'),
+    'arrow': ('arrows', 'application/vnd.apache.arrow.stream')
+}
+
+# 컬럼형 파일의 레코드 배치(Parquet 행 그룹) 크기
+COLUMNAR_BATCH_SIZE = 65536
+
+# 업로드 파일의 거래유형 라벨과 같은 값으로 내보냄
+TRANSACTION_TYPE_EXPORT_LABELS = {
+    'credit': '입금',
+    'debit': '출금',
+    'transfer': '이체'
+}
+
+AMOUNT_QUANTUM = Decimal('0.01')
+
+# 이체 거래내용 끝의 받는 계정 표기 (업로드/거래 추가 시 붙임)
+TRANSFER_NOTE_PATTERN = re.compile(r'^(.*) \(받는 계정: (.+)\)$', re.S)
+
+
+def period_transactions_query(start_date, end_date):
+    """기간 활성 거래와 계정/분류/부서/업체 이름을 한 번에 조회하는 쿼리 (최신순)"""
+    return select(
+        Transaction.transaction_date,
+        Account.account_name,
+        Transaction.transaction_type,
+        Transaction.amount,
+        Transaction.description,
+        Transaction.counterparty,
+        Category.name.label('category_name'),
+        Department.name.label('department_name'),
+        Vendor.name.label('vendor_name'),
+        Transaction.classification_status
+    ).select_from(Transaction).outerjoin(
+        Account, Account.id == Transaction.account_id
+    ).outerjoin(
+        Category, Category.id == Transaction.category_id
+    ).outerjoin(
+        Department, Department.id == Transaction.department_id
+    ).outerjoin(
+        Vendor, Vendor.id == Transaction.vendor_id
+    ).where(
+        Transaction.is_active == True,
+        date_range_filter(Transaction.transaction_date, start_date, end_date)
+    ).order_by(Transaction.transaction_date.desc(), Transaction.id.desc())
+
+
+def has_period_transactions(start_date, end_date):
+    """기간에 활성 거래가 있는지 확인"""
+    return db.session.query(Transaction.id).filter(
+        Transaction.is_active == True,
+        date_range_filter(Transaction.transaction_date, start_date, end_date)
+    ).first() is not None
+
+
+def iter_transaction_rows(start_date, end_date):
+    """기간 거래를 내보내기 컬럼 순서의 값 목록으로 하나씩 반환 (서버 측 커서 사용)"""
+    result = db.session.execute(
+        period_transactions_query(start_date, end_date).execution_options(yield_per=EXPORT_FETCH_SIZE)
+    )
+    for row in result:
+        yield [
+            row.transaction_date.strftime('%Y-%m-%d'),
+            row.transaction_date.strftime('%H:%M:%S'),
+            row.account_name or '',
+            row.transaction_type or '',
+            row.amount,
+            row.description or '',
+            row.counterparty or '',
+            row.category_name or '',
+            row.department_name or '',
+            row.vendor_name or '',
+            CLASSIFICATION_STATUS_LABELS.get(row.classification_status, row.classification_status or '')
+        ]
+
+
+def stream_transactions_csv(start_date, end_date):
+    """기간 거래 CSV를 UTF-8 BOM과 함께 조각 단위로 생성"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    # UTF-8 BOM 추가 (Excel에서 한글 깨짐 방지)
+    buffer.write('\ufeff')
+    writer.writerow(TRANSACTION_EXPORT_COLUMNS)
+
+    for index, row in enumerate(iter_transaction_rows(start_date, end_date), 1):
+        writer.writerow(row)
+        if index % EXPORT_FETCH_SIZE == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue().encode('utf-8')
+
+
+def send_temp_file(path, download_name, mimetype):
+    """임시 파일을 첨부 파일로 전송 (응답 종료 후 파일 삭제)"""
+    try:
+        response = send_file(path, as_attachment=True, download_name=download_name, mimetype=mimetype)
+    except Exception:
+        os.remove(path)
+        raise
+    response.call_on_close(lambda: os.remove(path))
+    return response
+
+
+def temp_export_path(suffix):
+    """내보내기용 임시 파일 경로"""
+    handle, path = tempfile.mkstemp(suffix=suffix, prefix='export-')
+    os.close(handle)
+    return path
+
+
+class XlsxExport(XlsxWorkbook):
+    """응답으로 전송할 수 있는 write_only 워크북"""
+
+    def send(self, download_name):
+        """임시 파일로 저장해 send_file로 전송"""
+        path = temp_export_path('.xlsx')
+        try:
+            self.save(path)
+        except Exception:
+            os.remove(path)
+            raise
+        return send_temp_file(path, download_name, XLSX_MIMETYPE)
+
+
+def columnar_schema():
+    """
+    컬럼형 내보내기 스키마
+
+    컬럼명은 거래 업로드 형식과 같아 내보낸 파일을 그대로 다시 올릴 수 있다.
+    반복되는 이름 컬럼은 사전 인코딩한다.
+    """
+    import pyarrow as pa
+
+    label = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        pa.field('거래일자', pa.timestamp('us'), nullable=False),
+        pa.field('계정', label),
+        pa.field('거래유형', label),
+        pa.field('금액', pa.decimal128(15, 2), nullable=False),
+        pa.field('메모', pa.string()),
+        pa.field('거래처', pa.string()),
+        pa.field('대상계정', label),
+        pa.field('분류', label),
+        pa.field('부서', label),
+        pa.field('업체', label),
+        pa.field('분류상태', label)
+    ])
+
+
+def split_transfer_note(transaction_type, description):
+    """이체 거래내용을 (메모, 대상계정)으로 분리 - 이체가 아니거나 표기가 없으면 대상계정은 None"""
+    if transaction_type == 'transfer' and description:
+        match = TRANSFER_NOTE_PATTERN.match(description)
+        if match:
+            return match.group(1), match.group(2)
+    return description, None
+
+
+class GrowingDictionary:
+    """배치 사이에 공유하는 사전 (새 값은 뒤에만 추가되어 Arrow 스트림에 delta로 기록됨)"""
+
+    def __init__(self):
+        self.positions = {}
+        self.values = []
+
+    def encode(self, values):
+        """값 목록을 사전 인코딩 배열로 변환"""
+        import pyarrow as pa
+
+        indices = []
+        for value in values:
+            if value is None:
+                indices.append(None)
+                continue
+            position = self.positions.get(value)
+            if position is None:
+                position = self.positions[value] = len(self.values)
+                self.values.append(value)
+            indices.append(position)
+        return pa.DictionaryArray.from_arrays(pa.array(indices, pa.int32()), pa.array(self.values, pa.string()))
+
+
+def iter_transaction_batches(start_date, end_date, schema):
+    """기간 거래를 columnar_schema 레코드 배치로 하나씩 반환 (서버 측 커서 사용)"""
+    import pyarrow as pa
+
+    dictionaries = {field.name: GrowingDictionary() for field in schema if pa.types.is_dictionary(field.type)}
+    result = db.session.execute(
+        period_transactions_query(start_date, end_date).execution_options(yield_per=EXPORT_FETCH_SIZE)
+    )
+    for rows in result.partitions(COLUMNAR_BATCH_SIZE):
+        # 업로드 시 메모에 붙는 받는 계정 표기는 대상계정 컬럼으로 분리 (다시 올리면 같은 거래내용이 됨)
+        notes = [split_transfer_note(row.transaction_type, row.description) for row in rows]
+        columns = {
+            '거래일자': [row.transaction_date for row in rows],
+            '계정': [row.account_name for row in rows],
+            '거래유형': [TRANSACTION_TYPE_EXPORT_LABELS.get(row.transaction_type, row.transaction_type)
+                     for row in rows],
+            '금액': [Decimal(row.amount).quantize(AMOUNT_QUANTUM) for row in rows],
+            '메모': [memo for memo, _ in notes],
+            '거래처': [row.counterparty for row in rows],
+            '대상계정': [target for _, target in notes],
+            '분류': [row.category_name for row in rows],
+            '부서': [row.department_name for row in rows],
+            '업체': [row.vendor_name for row in rows],
+            '분류상태': [CLASSIFICATION_STATUS_LABELS.get(row.classification_status, row.classification_status)
+                     for row in rows]
+        }
+        arrays = [dictionaries[field.name].encode(columns[field.name]) if field.name in dictionaries
+                  else pa.array(columns[field.name], field.type) for field in schema]
+        yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def write_transactions_columnar(start_date, end_date, export_format, path):
+    """기간 거래를 Parquet 또는 Arrow IPC 스트림 파일로 저장"""
+    import pyarrow as pa
+
+    schema = columnar_schema()
+    batches = iter_transaction_batches(start_date, end_date, schema)
+    if export_format == 'parquet':
+        import pyarrow.parquet as pq
+        with pq.ParquetWriter(path, schema, compression='zstd') as writer:
+            for batch in batches:
+                writer.write_batch(batch)
+    else:
+        options = pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+        with pa.ipc.new_stream(path, schema, options=options) as writer:
+            for batch in batches:
+                writer.write_batch(batch)
+
+
+def send_transactions_columnar(start_date, end_date, export_format, download_name):
+    """기간 거래 컬럼형 파일을 임시 파일로 만들어 전송"""
+    extension, mimetype = COLUMNAR_EXPORT_FORMATS[export_format]
+    path = temp_export_path(f'.{extension}')
+    try:
+        write_transactions_columnar(start_date, end_date, export_format, path)
+    except Exception:
+        os.remove(path)
+        raise
+    return send_temp_file(path, f'{download_name}.{extension}', mimetype)
@@ -0,0 +1,362 @@
+"""
+거래 파일 업로드 파이프라인
+
+CSV/Excel/Parquet/Arrow IPC 파일을 청크 단위로 읽어 메모리 사용량을 일정하게 유지하고,
+계정/분류/부서/업체 이름은 미리 읽어 둔 조회용 딕셔너리로 변환한 뒤
+청크마다 한 번의 INSERT(executemany)로 저장한다.
+"""
+
+import hashlib
+import os
+import uuid
+from collections import Counter
+from datetime import datetime
+
+import numpy as np
+import openpyxl
+import pandas as pd
+from sqlalchemy import and_, func, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import db
+from budget_tracker import check_budget_alerts
+from ledger_rollup import add_to_rollup
+from models import Account, Category, Department, Transaction, Vendor
+from rule_engine import get_rule_set
+from search_index import index_transactions
+
+UPLOAD_CHUNK_SIZE = 5000
+
+# 업로드할 수 있는 파일 확장자 (arrow/feather는 Arrow IPC 파일, arrows는 Arrow IPC 스트림)
+UPLOAD_FILE_EXTENSIONS = ['csv', 'xls', 'xlsx', 'parquet', 'arrow', 'arrows', 'feather']
+COLUMNAR_FILE_EXTENSIONS = ['parquet', 'arrow', 'arrows', 'feather']
+
+# 필수 컬럼 (항상 5개 필수)
+REQUIRED_COLUMNS = ['계정', '거래일자', '거래유형', '금액', '거래처']
+
+# 거래유형 라벨 -> transaction_type
+TRANSACTION_TYPE_LABELS = {
+    '입금': 'credit', '수입': 'credit', 'deposit': 'credit',
+    '출금': 'debit', '지출': 'debit', 'withdrawal': 'debit',
+    '이체': 'transfer', 'transfer': 'transfer',
+}
+
+
+class UploadError(Exception):
+    """업로드 파일 자체를 처리할 수 없을 때 발생"""
+
+
+def iter_upload_chunks(stream, file_ext, chunksize=UPLOAD_CHUNK_SIZE):
+    """업로드 파일을 DataFrame 청크 단위로 읽기"""
+    if file_ext == 'csv':
+        yield from pd.read_csv(stream, encoding='utf-8', chunksize=chunksize)
+    elif file_ext == 'xlsx':
+        # read-only 모드로 행을 순차적으로 읽어 전체 시트를 메모리에 올리지 않음
+        workbook = openpyxl.load_workbook(stream, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            columns = [str(column).strip() if column is not None else '' for column in header]
+            buffer = []
+            for row in rows:
+                buffer.append(row)
+                if len(buffer) >= chunksize:
+                    yield pd.DataFrame(buffer, columns=columns)
+                    buffer = []
+            if buffer:
+                yield pd.DataFrame(buffer, columns=columns)
+        finally:
+            workbook.close()
+    elif file_ext in COLUMNAR_FILE_EXTENSIONS:
+        yield from _iter_columnar_chunks(stream, file_ext, chunksize)
+    else:
+        # xls는 스트리밍 읽기를 지원하지 않으므로 한 번에 읽은 뒤 나눔
+        df = pd.read_excel(stream)
+        for start in range(0, len(df), chunksize):
+            yield df.iloc[start:start + chunksize]
+
+
+def _iter_columnar_chunks(stream, file_ext, chunksize):
+    """Parquet/Arrow IPC 파일을 레코드 배치 단위로 읽어 DataFrame 청크로 변환 (문자열 파싱 없음)"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise UploadError('Parquet/Arrow 파일을 올리려면 pyarrow 패키지가 필요합니다.')
+
+    if file_ext == 'parquet':
+        batches = pq.ParquetFile(stream).iter_batches(batch_size=chunksize)
+    elif file_ext == 'arrows':
+        batches = pa.ipc.open_stream(stream)
+    else:
+        reader = pa.ipc.open_file(stream)
+        batches = (reader.get_batch(index) for index in range(reader.num_record_batches))
+
+    for batch in batches:
+        # decimal 금액은 float64로 바꿔 Decimal 객체 컬럼이 되지 않게 함
+        batch = pa.RecordBatch.from_arrays(
+            [column.cast(pa.float64()) if pa.types.is_decimal(column.type) else column for column in batch.columns],
+            names=batch.schema.names
+        )
+        for offset in range(0, batch.num_rows, chunksize):
+            yield batch.slice(offset, chunksize).to_pandas()
+
+
+def _text_column(chunk, column):
+    """문자열 컬럼을 공백 제거해 반환 (컬럼이 없으면 전부 NA)"""
+    if column not in chunk.columns:
+        return pd.Series(pd.NA, index=chunk.index, dtype='string')
+    return chunk[column].astype('string').str.strip()
+
+
+def _lookup_column(chunk, column, lookup, default_id):
+    """이름 컬럼을 ID 배열로 변환 (값이 없는 행은 기본값, 없는 이름은 NA)"""
+    names = _text_column(chunk, column)
+    ids = names.map(lookup).astype('Int64')
+    if default_id is not None:
+        ids = ids.mask(names.isna(), default_id)
+    return ids
+
+
+def normalize_chunk(chunk, lookups, default_account_id, defaults):
+    """
+    업로드 청크를 컬럼 단위로 정규화
+    
+    ORM 객체를 만들기 전에 금액/일시/거래유형/조회 ID를 벡터 연산으로 변환해
+    INSERT용 컬럼을 가진 DataFrame과 행별 오류 마스크(True면 건너뜀)를 반환한다.
+    """
+    # 계정 - 파일에 계정 컬럼이 있으면 그것을 우선 사용
+    account_names = _text_column(chunk, '계정')
+    account_ids = account_names.map(lookups.accounts)
+    unknown_accounts = account_names[account_names.notna() & account_ids.isna()].unique()
+    for account_name in unknown_accounts:
+        print(f"Warning: Account '{account_name}' not found, using default account")
+    account_ids = account_ids.fillna(default_account_id).astype('int64')
+
+    # 거래일자 + 거래시간 결합
+    if pd.api.types.is_datetime64_any_dtype(chunk['거래일자']):
+        dates = chunk['거래일자']
+    else:
+        dates = pd.to_datetime(chunk['거래일자'], format='mixed', errors='coerce')
+    times = _text_column(chunk, '거래시간')
+    has_time = times.str.contains(':', regex=False).fillna(False).astype(bool)
+    if has_time.any():
+        merged = pd.to_datetime(dates.dt.strftime('%Y-%m-%d').astype('string') + ' ' + times,
+                                format='mixed', errors='coerce')
+        dates = dates.mask(has_time, merged)
+
+    # 금액 - 숫자 컬럼(Parquet/Arrow 등)은 그대로, 문자열은 천 단위 구분자와 '원' 제거
+    if pd.api.types.is_numeric_dtype(chunk['금액']):
+        amounts = chunk['금액'].to_numpy(dtype='float64', na_value=np.nan)
+    else:
+        amounts = pd.to_numeric(
+            chunk['금액'].astype('string').str.replace(',', '', regex=False)
+            .str.replace('원', '', regex=False).str.strip(),
+            errors='coerce'
+        ).to_numpy(dtype='float64', na_value=np.nan)
+
+    # 거래유형 - 지출과 이체(보내는 쪽)는 음수로
+    types = _text_column(chunk, '거래유형').map(TRANSACTION_TYPE_LABELS)
+    negative = types.isin(['debit', 'transfer']).to_numpy()
+    amounts = np.where(negative, -np.abs(amounts), amounts)
+    types = types.fillna('debit')  # 알 수 없는 유형은 기본값
+    is_transfer = (types == 'transfer').to_numpy()
+
+    # 이체는 대상계정 필수 (비어 있으면 업로드 폼의 기본 대상계정 사용)
+    targets = _text_column(chunk, '대상계정')
+    targets = targets.mask((targets == '').fillna(False).astype(bool))
+    if defaults.get('target_account'):
+        targets = targets.fillna(defaults['target_account'])
+    has_target = targets.notna().to_numpy()
+
+    errors = dates.isna().to_numpy() | np.isnan(amounts) | (is_transfer & ~has_target)
+
+    # 거래처 / 메모
+    counterparties = _text_column(chunk, '거래처').fillna('')
+    descriptions = _text_column(chunk, '메모').fillna(counterparties)
+    transfer_notes = (' (받는 계정: ' + targets + ')').fillna('')
+    descriptions = descriptions.where(~is_transfer, descriptions + transfer_notes)
+
+    # 분류 정보 (이체가 아닌 경우만)
+    frame = pd.DataFrame({
+        'account_id': account_ids,
+        'amount': amounts,
+        'transaction_type': types.astype(object),
+        'description': descriptions.astype(object),
+        'counterparty': counterparties.astype(object),
+        'transaction_date': dates,
+    }, index=chunk.index)
+    for field, column, lookup in (('category_id', '분류', lookups.categories),
+                                  ('department_id', '부서', lookups.departments),
+                                  ('vendor_id', '업체', lookups.vendors)):
+        frame[field] = _lookup_column(chunk, column, lookup, defaults.get(field)).mask(is_transfer)
+
+    # 분류 상태 - 이체는 자동으로 분류됨
+    has_classification = frame[['category_id', 'department_id', 'vendor_id']].notna().any(axis=1)
+    frame['classification_status'] = np.where(is_transfer | has_classification.to_numpy(),
+                                              'classified', 'pending').astype(object)
+    frame['classified_rule_id'] = pd.Series(pd.NA, index=chunk.index, dtype='Int64')
+
+    return frame.reset_index(drop=True), errors
+
+
+class LookupCache:
+    """이름 -> ID 조회용 딕셔너리 (업로드 시작 시 한 번만 로드)"""
+
+    def __init__(self):
+        self.accounts = {account.account_name: account.id for account in
+                         db.session.query(Account.id, Account.account_name)}
+        self.categories = {category.name: category.id for category in
+                           db.session.query(Category.id, Category.name)}
+        self.departments = {department.name: department.id for department in
+                            db.session.query(Department.id, Department.name)}
+        self.vendors = {vendor.name: vendor.id for vendor in
+                        db.session.query(Vendor.id, Vendor.name)}
+        self.account_names = {account_id: name for name, account_id in self.accounts.items()}
+
+
+class TransactionImporter:
+    """거래 파일을 청크 단위로 읽어 일괄 저장"""
+
+    def __init__(self, account_id, default_target_account='', default_category_id='',
+                 default_department_id='', default_vendor_id='', chunksize=UPLOAD_CHUNK_SIZE,
+                 progress=None):
+        self.account_id = int(account_id)
+        self.chunksize = chunksize
+        self.progress = progress
+        self.lookups = LookupCache()
+        self.defaults = {
+            'target_account': self.lookups.account_names.get(int(default_target_account))
+            if default_target_account else None,
+            'category_id': int(default_category_id) if default_category_id else None,
+            'department_id': int(default_department_id) if default_department_id else None,
+            'vendor_id': int(default_vendor_id) if default_vendor_id else None,
+        }
+        self.rule_set = get_rule_set()
+        self.batch_id = uuid.uuid4().hex
+        self.upload_prefix = f'UPLOAD-{datetime.now().strftime("%Y%m%d%H%M%S")}-{self.batch_id[:8]}'
+        self.row_count = 0
+        self.fingerprint_counts = Counter()
+        self.parsed_count = 0
+        self.processed_count = 0
+        self.failed_count = 0
+        self.classified_count = 0
+        self.duplicate_count = 0
+        self.last_inserted_id = 0
+
+    def run(self, stream, file_ext):
+        """파일 전체를 처리하고 처리 건수 반환"""
+        columns_checked = False
+        for chunk in iter_upload_chunks(stream, file_ext, self.chunksize):
+            if not columns_checked:
+                missing_columns = [col for col in REQUIRED_COLUMNS if col not in chunk.columns]
+                if missing_columns:
+                    raise UploadError(f'필수 컬럼이 누락되었습니다: {", ".join(missing_columns)}')
+                columns_checked = True
+            self.parsed_count += len(chunk)
+            self.import_chunk(chunk)
+            self.report_progress()
+        return self.processed_count
+
+    def report_progress(self):
+        """진행 상황 콜백 호출 (백그라운드 작업용)"""
+        if self.progress is not None:
+            self.progress(rows_parsed=self.parsed_count, rows_inserted=self.processed_count,
+                          rows_classified=self.classified_count, rows_failed=self.failed_count,
+                          rows_duplicate=self.duplicate_count)
+
+    def import_chunk(self, chunk):
+        """청크 하나를 정규화, 자동 분류 후 한 번의 INSERT로 저장 (이미 있는 거래는 건너뜀)"""
+        frame, errors = normalize_chunk(chunk, self.lookups, self.account_id, self.defaults)
+        if errors.any():
+            print(f"Warning: {int(errors.sum())} rows skipped (invalid date/amount or transfer without target account)")
+        self.failed_count += int(errors.sum())
+        frame = frame[~errors].reset_index(drop=True)
+        if frame.empty:
+            return
+
+        start = self.row_count
+        self.row_count += len(frame)
+        frame['transaction_id'] = [f'{self.upload_prefix}-{n:04d}' for n in range(start, start + len(frame))]
+        frame['fingerprint'] = self.fingerprint_frame(frame)
+        frame['import_batch_id'] = self.batch_id
+        self.classify_frame(frame)
+
+        rows = frame.astype(object).where(frame.notna(), None).to_dict('records')
+        insert_ignoring_duplicates(rows)
+        inserted = and_(Transaction.import_batch_id == self.batch_id, Transaction.id > self.last_inserted_id)
+        add_to_rollup(inserted)
+        index_transactions(inserted)
+        db.session.commit()
+
+        # ON CONFLICT로 건너뛴 행은 rowcount로 알 수 없으므로 배치 ID로 실제 저장 건수 확인
+        inserted_count, classified_count, last_inserted_id = db.session.execute(
+            select(func.count(Transaction.id), func.count(Transaction.classified_rule_id), func.max(Transaction.id))
+            .where(Transaction.import_batch_id == self.batch_id)
+        ).one()
+        self.last_inserted_id = last_inserted_id or 0
+        self.duplicate_count += len(rows) - (inserted_count - self.processed_count)
+        self.processed_count = inserted_count
+        self.classified_count = classified_count
+
+    def fingerprint_frame(self, frame):
+        """
+        계정/일시/금액/거래처/메모로 만든 내용 해시
+        
+        같은 파일 안의 동일한 거래는 몇 번째 등장인지를 함께 해시해 구분하므로,
+        같은 명세서를 다시 올리면 전부 중복으로 걸러지고 정상적인 반복 거래는 유지된다.
+        """
+        keys = (frame['account_id'].astype(str) + '|' +
+                frame['transaction_date'].dt.strftime('%Y-%m-%dT%H:%M:%S') + '|' +
+                frame['amount'].map('{:.2f}'.format) + '|' +
+                frame['counterparty'].astype(str) + '|' +
+                frame['description'].astype(str))
+        occurrences = keys.groupby(keys).cumcount() + keys.map(self.fingerprint_counts).fillna(0).astype(int)
+        self.fingerprint_counts.update(keys.value_counts().to_dict())
+        return [hashlib.sha256(f'{key}|{occurrence}'.encode('utf-8')).hexdigest()
+                for key, occurrence in zip(keys, occurrences)]
+
+    def classify_frame(self, frame):
+        """자동 분류 규칙을 청크 전체에 벡터 연산으로 적용"""
+        if not len(self.rule_set):
+            return
+        rule_ids = self.rule_set.classify_frame(frame)
+        for rule_id in np.unique(rule_ids[rule_ids > 0]):
+            mask = rule_ids == rule_id
+            for column, value in self.rule_set.get(int(rule_id)).update_values().items():
+                frame.loc[mask, column] = value
+        self.classified_count += int((rule_ids > 0).sum())
+
+
+def insert_ignoring_duplicates(rows):
+    """fingerprint가 이미 있는 행은 건너뛰고 일괄 INSERT (ON CONFLICT DO NOTHING)"""
+    dialect_name = db.engine.dialect.name
+    if dialect_name == 'postgresql':
+        stmt = postgresql.insert(Transaction).on_conflict_do_nothing()
+    elif dialect_name == 'sqlite':
+        stmt = sqlite.insert(Transaction).on_conflict_do_nothing()
+    else:
+        # ON CONFLICT를 지원하지 않는 DB는 기존 fingerprint를 먼저 조회해 제외
+        existing = set(db.session.scalars(
+            select(Transaction.fingerprint)
+            .where(Transaction.fingerprint.in_([row['fingerprint'] for row in rows]))
+        ))
+        rows = [row for row in rows if row['fingerprint'] not in existing]
+        stmt = insert(Transaction)
+
+    if rows:
+        db.session.execute(stmt, rows)
+
+
+def run_import_job(progress, path, file_ext, account_id, **defaults):
+    """백그라운드 작업으로 업로드 파일 처리 (임시 파일은 처리 후 삭제)"""
+    try:
+        importer = TransactionImporter(account_id, progress=progress, **defaults)
+        with open(path, 'rb') as stream:
+            processed_count = importer.run(stream, file_ext)
+        check_budget_alerts()
+        return f'{processed_count}건의 거래가 성공적으로 업로드되었습니다.'
+    finally:
+        os.remove(path)
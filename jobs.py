@@ -0,0 +1,56 @@
+"""
+백그라운드 작업 실행기
+
+대용량 업로드처럼 오래 걸리는 작업을 웹 워커 밖의 스레드 풀에서 실행한다.
+작업 상태와 진행 상황은 job 테이블에 기록되어 어느 워커에서든 /jobs/<id>로 조회할 수 있다.
+"""
+
+import os
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+
+from sqlalchemy import update
+
+from app import app, db
+from models import Job
+
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+
+_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix='job')
+
+
+def update_job(job_id, **values):
+    """작업 행의 상태/진행 상황 갱신"""
+    db.session.execute(update(Job).where(Job.id == job_id).values(**values))
+    db.session.commit()
+
+
+def submit_job(job_type, target, *args, user_id=None, job_fields=None, **kwargs):
+    """
+    작업을 job 테이블에 등록하고 스레드 풀에서 실행
+
+    target은 progress(**counts) 콜백을 첫 인자로 받고, 완료 메시지를 반환한다.
+    job_fields는 등록 시점에 함께 저장할 Job 컬럼 값이다.
+    """
+    job = Job(job_type=job_type, status='queued', user_id=user_id, **(job_fields or {}))
+    db.session.add(job)
+    db.session.commit()
+    _executor.submit(_run_job, job.id, target, args, kwargs)
+    return job
+
+
+def _run_job(job_id, target, args, kwargs):
+    """작업 실행 (앱 컨텍스트 안에서 별도 세션 사용)"""
+    with app.app_context():
+        try:
+            update_job(job_id, status='running', started_at=datetime.utcnow())
+            message = target(partial(update_job, job_id), *args, **kwargs)
+            update_job(job_id, status='completed', message=message, finished_at=datetime.utcnow())
+        except Exception as e:
+            traceback.print_exc()
+            db.session.rollback()
+            update_job(job_id, status='failed', error=str(e), finished_at=datetime.utcnow())
+        finally:
+            db.session.remove()
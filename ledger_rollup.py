@@ -0,0 +1,263 @@
+"""
+원장 일별 집계(rollup) 관리
+
+보고서와 대시보드가 원본 거래 테이블 대신 읽는 ledger_rollup 테이블을 유지한다.
+키는 (일자, 계정, 부서, 분류, 업체, 부호, 이체 여부)이고 합계와 건수를 가진다.
+
+- ORM으로 거래를 추가/수정/분할/소프트 삭제하면 flush 이벤트에서 증분 반영
+- 일괄 INSERT/UPDATE 경로(업로드, 규칙 일괄 적용)는 add_to_rollup / rollup_adjusted로 반영
+- rebuild_rollup()으로 기간 또는 전체를 원본 거래에서 다시 계산
+- 부서/분류별 월 예산 사용액(budget_consumption)도 같은 증감분으로 함께 갱신
+- 집계가 바뀐 트랜잭션이 커밋되면 거래 의존 캐시(cache 모듈)를 무효화
+"""
+
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import Date, and_, case, delete, event, extract, func, insert, select, true, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app import db
+from cache import invalidate_ledger_cache
+from models import BudgetConsumption, LedgerRollup, Transaction
+
+ROLLUP_KEY_COLUMNS = ('day', 'account_id', 'department_id', 'category_id', 'vendor_id',
+                      'sign', 'is_transfer')
+BUDGET_KEY_COLUMNS = ('scope', 'ref_id', 'year', 'month')
+
+# flush 시 한 번에 조회할 거래 ID 수
+ROLLUP_ID_CHUNK_SIZE = 500
+
+
+def aggregate_transactions(condition):
+    """조건에 맞는 활성 거래를 rollup 키별 {key: [합계, 건수]}로 집계"""
+    key_columns = (
+        func.date(Transaction.transaction_date, type_=Date),
+        Transaction.account_id,
+        func.coalesce(Transaction.department_id, 0),
+        func.coalesce(Transaction.category_id, 0),
+        func.coalesce(Transaction.vendor_id, 0),
+        case((Transaction.amount > 0, 1), else_=-1),
+        case((Transaction.transaction_type == 'transfer', True), else_=False)
+    )
+    rows = db.session.connection().execute(
+        select(*key_columns, func.sum(Transaction.amount), func.count(Transaction.id)).where(
+            condition,
+            Transaction.is_active == True,
+            Transaction.amount != 0
+        ).group_by(*key_columns)
+    )
+
+    totals = {}
+    for row in rows:
+        *key, total, count = row
+        key[-1] = bool(key[-1])
+        totals[tuple(key)] = [Decimal(str(total or 0)), count]
+    return totals
+
+
+def upsert_increments(table, key_columns, value_columns, rows):
+    """키별 값 컬럼을 증가시킴 (없는 키는 생성)"""
+    connection = db.session.connection()
+    dialect_name = connection.dialect.name
+    if dialect_name in ('postgresql', 'sqlite'):
+        dialect_insert = postgresql.insert if dialect_name == 'postgresql' else sqlite.insert
+        stmt = dialect_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(key_columns),
+            set_={column: table.c[column] + stmt.excluded[column] for column in value_columns}
+        )
+        connection.execute(stmt, rows)
+        return
+
+    # ON CONFLICT를 지원하지 않는 DB는 키별 UPDATE 후 없으면 INSERT
+    for row in rows:
+        result = connection.execute(
+            update(table).where(
+                and_(*(table.c[column] == row[column] for column in key_columns))
+            ).values(**{column: table.c[column] + row[column] for column in value_columns})
+        )
+        if not result.rowcount:
+            connection.execute(insert(table).values(**row))
+
+
+def budget_consumption_rows(deltas, factor=1):
+    """rollup 증감분 중 이체 제외 지출을 부서/분류 x 월 예산 사용액 증감분으로 변환"""
+    consumption = {}
+    for key, (total, count) in deltas.items():
+        day, _, department_id, category_id, _, sign, is_transfer = key
+        if sign > 0 or is_transfer:
+            continue
+        for scope, ref_id in (('department', department_id), ('category', category_id)):
+            entry = consumption.setdefault((scope, ref_id, day.year, day.month), [Decimal(0), 0])
+            entry[0] -= total
+            entry[1] += count
+    return [dict(zip(BUDGET_KEY_COLUMNS, key), spent=spent * factor, transaction_count=count * factor)
+            for key, (spent, count) in consumption.items() if spent or count]
+
+
+def apply_rollup_deltas(deltas, factor=1):
+    """{key: [합계, 건수]} 증감분을 rollup 테이블과 예산 사용액에 더함 (없는 키는 생성)"""
+    rows = [dict(zip(ROLLUP_KEY_COLUMNS, key), total=total * factor, transaction_count=count * factor)
+            for key, (total, count) in deltas.items() if total or count]
+    if not rows:
+        return
+
+    # 커밋 후 거래 의존 캐시 무효화
+    db.session().info['ledger_changed'] = True
+
+    upsert_increments(LedgerRollup.__table__, ROLLUP_KEY_COLUMNS, ('total', 'transaction_count'), rows)
+
+    consumption_rows = budget_consumption_rows(deltas, factor)
+    if consumption_rows:
+        upsert_increments(BudgetConsumption.__table__, BUDGET_KEY_COLUMNS,
+                          ('spent', 'transaction_count'), consumption_rows)
+
+
+def add_to_rollup(condition):
+    """일괄 INSERT한 거래를 rollup에 반영"""
+    apply_rollup_deltas(aggregate_transactions(condition))
+
+
+@contextmanager
+def rollup_adjusted(condition):
+    """
+    condition에 맞는 거래를 일괄 UPDATE하는 동안 rollup 보정
+
+    UPDATE 전 집계를 빼고 UPDATE 후 집계를 더한다.
+    condition은 UPDATE로 바뀌지 않는 컬럼(ID, 적요, 금액 등)만 사용해야 한다.
+    """
+    # 세션에 남은 변경을 먼저 반영해야 UPDATE 전 집계와 flush 리스너 보정이 겹치지 않음
+    db.session.flush()
+    apply_rollup_deltas(aggregate_transactions(condition), factor=-1)
+    yield
+    apply_rollup_deltas(aggregate_transactions(condition))
+
+
+def _apply_for_ids(ids, factor):
+    """거래 ID 목록의 현재 집계를 rollup에 더하거나 뺌"""
+    ids = list(ids)
+    for start in range(0, len(ids), ROLLUP_ID_CHUNK_SIZE):
+        chunk = ids[start:start + ROLLUP_ID_CHUNK_SIZE]
+        apply_rollup_deltas(aggregate_transactions(Transaction.id.in_(chunk)), factor=factor)
+
+
+@event.listens_for(Session, 'before_flush')
+def _subtract_changed_transactions(session, flush_context, instances):
+    """수정/삭제될 거래의 기존 집계를 flush 전에 뺌"""
+    if session is not db.session():
+        return
+    changed_ids = [obj.id for obj in session.dirty
+                   if isinstance(obj, Transaction) and obj.id and session.is_modified(obj)]
+    deleted_ids = [obj.id for obj in session.deleted if isinstance(obj, Transaction) and obj.id]
+    if changed_ids or deleted_ids:
+        _apply_for_ids(changed_ids + deleted_ids, factor=-1)
+    session.info['rollup_changed_ids'] = changed_ids
+
+
+@event.listens_for(Session, 'after_flush')
+def _add_flushed_transactions(session, flush_context):
+    """추가/수정된 거래의 새 집계를 flush 후에 더함"""
+    if session is not db.session():
+        return
+    ids = session.info.pop('rollup_changed_ids', [])
+    ids += [obj.id for obj in session.new if isinstance(obj, Transaction)]
+    if ids:
+        _apply_for_ids(ids, factor=1)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_cache_after_commit(session):
+    """거래/집계가 바뀐 트랜잭션이 커밋되면 캐시 무효화"""
+    if session.info.pop('ledger_changed', False):
+        invalidate_ledger_cache()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_rolled_back_changes(session):
+    """롤백된 변경은 캐시 무효화 대상에서 제외"""
+    session.info.pop('ledger_changed', None)
+
+
+def rebuild_rollup(start_day=None, end_day=None):
+    """기간(양 끝 포함, 생략 시 전체) rollup을 원본 거래에서 다시 계산 - 생성한 집계 행 수 반환"""
+    from utils import date_range_filter
+
+    db.session.execute(delete(LedgerRollup).where(rollup_period_filter(start_day, end_day)))
+    totals = aggregate_transactions(date_range_filter(Transaction.transaction_date, start_day, end_day))
+    apply_rollup_deltas(totals)
+    # 삭제한 rollup 행은 예산 사용액에서 빠지지 않았으므로 걸친 월 전체를 rollup에서 다시 계산
+    rebuild_budget_consumption(start_day, end_day)
+    db.session.commit()
+    return len(totals)
+
+
+def month_bounds(start_day=None, end_day=None):
+    """기간이 걸친 월의 첫날과 마지막 날"""
+    if isinstance(start_day, datetime):
+        start_day = start_day.date()
+    if isinstance(end_day, datetime):
+        end_day = end_day.date()
+    if start_day is not None:
+        start_day = start_day.replace(day=1)
+    if end_day is not None:
+        end_day = (end_day.replace(day=1) + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    return start_day, end_day
+
+
+def rebuild_budget_consumption(start_day=None, end_day=None):
+    """기간이 걸친 월(생략 시 전체)의 예산 사용액을 rollup에서 다시 계산 (커밋은 호출자가 함)"""
+    start_month, end_month = month_bounds(start_day, end_day)
+    year_month = BudgetConsumption.year * 100 + BudgetConsumption.month
+    conditions = []
+    if start_month is not None:
+        conditions.append(year_month >= start_month.year * 100 + start_month.month)
+    if end_month is not None:
+        conditions.append(year_month <= end_month.year * 100 + end_month.month)
+    db.session.execute(delete(BudgetConsumption).where(and_(*conditions) if conditions else true()))
+
+    year = extract('year', LedgerRollup.day)
+    month = extract('month', LedgerRollup.day)
+    rows = []
+    for scope, ref_column in (('department', LedgerRollup.department_id), ('category', LedgerRollup.category_id)):
+        query = select(
+            year, month, ref_column,
+            func.sum(LedgerRollup.total), func.sum(LedgerRollup.transaction_count)
+        ).where(
+            LedgerRollup.sign < 0,
+            LedgerRollup.is_transfer == False,
+            rollup_period_filter(start_month, end_month)
+        ).group_by(year, month, ref_column)
+        for row in db.session.execute(query):
+            rows.append({'scope': scope, 'ref_id': row[2], 'year': int(row[0]), 'month': int(row[1]),
+                         'spent': -Decimal(str(row[3] or 0)), 'transaction_count': int(row[4] or 0)})
+    if rows:
+        db.session.execute(insert(BudgetConsumption), rows)
+    return len(rows)
+
+
+def ensure_rollup():
+    """rollup/예산 사용액이 비어 있는데 원본이 있으면 전체 재계산 (기존 DB 최초 기동 시)"""
+    if db.session.query(LedgerRollup.id).first() is None and db.session.query(Transaction.id).first() is not None:
+        rebuilt = rebuild_rollup()
+        print(f"Ledger rollup rebuilt: {rebuilt} rows")
+    elif db.session.query(BudgetConsumption.id).first() is None and db.session.query(LedgerRollup.id).first() is not None:
+        rebuilt = rebuild_budget_consumption()
+        db.session.commit()
+        print(f"Budget consumption rebuilt: {rebuilt} rows")
+
+
+def rollup_period_filter(start_day=None, end_day=None):
+    """rollup 일자 필터 (양 끝 포함)"""
+    conditions = []
+    if start_day is not None:
+        if isinstance(start_day, datetime):
+            start_day = start_day.date()
+        conditions.append(LedgerRollup.day >= start_day)
+    if end_day is not None:
+        if isinstance(end_day, datetime):
+            end_day = end_day.date()
+        conditions.append(LedgerRollup.day <= end_day)
+    return and_(*conditions) if conditions else true()
@@ -0,0 +1,68 @@
+"""
+스키마 업그레이드 헬퍼
+
+db.create_all()은 새 테이블만 만들기 때문에, 이미 존재하는 테이블에
+모델에 추가된 컬럼과 인덱스를 반영한다. 여러 번 실행해도 안전하다.
+"""
+
+from sqlalchemy import exists, inspect, text, update
+from sqlalchemy.orm import aliased
+
+from app import db
+
+# 다른 인덱스로 대체되어 기존 DB에서 지울 인덱스
+OBSOLETE_INDEXES = [
+    'ix_transaction_active_date',  # ix_transaction_active_date_id로 대체
+]
+
+
+def upgrade_schema():
+    """기존 테이블에 누락된 컬럼과 인덱스 추가, 대체된 인덱스 삭제"""
+    engine = db.engine
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    preparer = engine.dialect.identifier_preparer
+
+    with engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+
+            existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(
+                    f'ALTER TABLE {preparer.quote(table.name)} '
+                    f'ADD COLUMN {preparer.quote(column.name)} {column_type}'
+                ))
+                print(f"Schema upgrade: added column {table.name}.{column.name}")
+
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+        for index_name in OBSOLETE_INDEXES:
+            conn.execute(text(f'DROP INDEX IF EXISTS {preparer.quote(index_name)}'))
+
+        release_deleted_fingerprints(conn)
+
+
+def release_deleted_fingerprints(conn):
+    """
+    삭제(비활성)된 거래의 fingerprint 제거 - 같은 내용을 다시 업로드할 수 있게 함
+
+    분할 원본은 비활성이어도 원본 거래가 다시 올라오지 않도록 fingerprint를 유지한다.
+    """
+    from models import Transaction
+
+    child = aliased(Transaction)
+    result = conn.execute(
+        update(Transaction).where(
+            Transaction.is_active == False,
+            Transaction.fingerprint.isnot(None),
+            ~exists().where(child.split_parent_id == Transaction.id)
+        ).values(fingerprint=None)
+    )
+    if result.rowcount:
+        print(f"Schema upgrade: released fingerprints of {result.rowcount} deleted transactions")
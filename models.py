@@ -138,6 +138,7 @@ class Transaction(db.Model):
     vendor_id = db.Column(db.Integer, db.ForeignKey('vendor.id'))
     contract_id = db.Column(db.Integer, db.ForeignKey('contract.id'))  # 계약 연결
     classification_status = db.Column(db.String(20), default='pending')  # pending, classified, manual
+    classified_rule_id = db.Column(db.Integer, db.ForeignKey('mapping_rule.id'))  # 자동 분류한 규칙 (provenance)
     
     # Split transaction fields
     is_active = db.Column(db.Boolean, default=True)  # 분할 후 원본은 비활성화
@@ -145,6 +146,8 @@ class Transaction(db.Model):
     
     # Metadata
     raw_data = db.Column(db.Text)  # 원본 데이터 JSON
+    fingerprint = db.Column(db.String(64), unique=True, index=True)  # 업로드 중복 방지용 내용 해시
+    import_batch_id = db.Column(db.String(32), index=True)  # 업로드 배치 ID
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -153,6 +156,60 @@ class Transaction(db.Model):
     department = db.relationship('Department', backref='transactions')
     vendor = db.relationship('Vendor', backref='transactions')
     contract = db.relationship('Contract', backref='transactions')
+    classified_rule = db.relationship('MappingRule', backref='classified_transactions')
+    
+    def soft_delete(self):
+        """거래 소프트 삭제 - 같은 내용을 다시 업로드할 수 있도록 중복 방지 해시도 지움"""
+        self.is_active = False
+        self.fingerprint = None
+
+# 대시보드/거래목록/보고서/데이터관리 조회 조건에 맞춘 인덱스
+# (기존 DB에는 migrations.upgrade_schema()가 생성)
+# 거래목록 키셋 페이지네이션의 (거래일시, ID) 비교/정렬도 이 인덱스 범위 탐색으로 처리
+db.Index('ix_transaction_active_date_id', Transaction.is_active, Transaction.transaction_date, Transaction.id)
+db.Index('ix_transaction_status', Transaction.classification_status)
+db.Index('ix_transaction_account_date', Transaction.account_id, Transaction.transaction_date)
+db.Index('ix_transaction_department_date', Transaction.department_id, Transaction.transaction_date)
+db.Index('ix_transaction_category_date', Transaction.category_id, Transaction.transaction_date)
+db.Index('ix_transaction_vendor_date', Transaction.vendor_id, Transaction.transaction_date)
+db.Index('ix_transaction_created_at', Transaction.created_at)
+
+class CacheGeneration(db.Model):
+    """캐시 네임스페이스 세대 번호 - cache 모듈이 관리 (Redis가 없을 때 워커 간 무효화 공유)"""
+    key = db.Column(db.String(100), primary_key=True)
+    generation = db.Column(db.Integer, nullable=False, default=0)
+
+class LedgerRollup(db.Model):
+    """일별 원장 집계 (일자 x 계정 x 부서 x 분류 x 업체 x 부호) - ledger_rollup 모듈이 관리"""
+    __table_args__ = (
+        db.UniqueConstraint('day', 'account_id', 'department_id', 'category_id', 'vendor_id',
+                            'sign', 'is_transfer', name='uq_ledger_rollup_key'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    account_id = db.Column(db.Integer, nullable=False)
+    department_id = db.Column(db.Integer, nullable=False, default=0)  # 0 = 미지정
+    category_id = db.Column(db.Integer, nullable=False, default=0)  # 0 = 미지정
+    vendor_id = db.Column(db.Integer, nullable=False, default=0)  # 0 = 미지정
+    sign = db.Column(db.SmallInteger, nullable=False)  # 1 = 수입, -1 = 지출
+    is_transfer = db.Column(db.Boolean, nullable=False, default=False)
+    total = db.Column(db.Numeric(15, 2), nullable=False, default=0)
+    transaction_count = db.Column(db.Integer, nullable=False, default=0)
+
+class BudgetConsumption(db.Model):
+    """부서/분류별 월 예산 사용액 (이체 제외 지출, 양수) - ledger_rollup 모듈이 관리"""
+    __table_args__ = (
+        db.UniqueConstraint('scope', 'ref_id', 'year', 'month', name='uq_budget_consumption_key'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.String(20), nullable=False)  # department, category
+    ref_id = db.Column(db.Integer, nullable=False, default=0)  # 부서/분류 ID, 0 = 미지정
+    year = db.Column(db.Integer, nullable=False)
+    month = db.Column(db.Integer, nullable=False)
+    spent = db.Column(db.Numeric(15, 2), nullable=False, default=0)
+    transaction_count = db.Column(db.Integer, nullable=False, default=0)
 
 class MappingRule(db.Model):
     """거래 자동 분류 규칙"""
@@ -311,3 +368,50 @@ class CategoryBudget(db.Model):
     
     # Relationships
     category = db.relationship('Category', backref='budgets')
+
+class Job(db.Model):
+    """백그라운드 작업 (대용량 업로드 등)"""
+    id = db.Column(db.Integer, primary_key=True)
+    job_type = db.Column(db.String(50), nullable=False)  # transaction_import, report_export
+    status = db.Column(db.String(20), default='queued')  # queued, running, completed, failed, expired
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    
+    # 진행 상황
+    rows_parsed = db.Column(db.Integer, default=0)
+    rows_inserted = db.Column(db.Integer, default=0)
+    rows_classified = db.Column(db.Integer, default=0)
+    rows_failed = db.Column(db.Integer, default=0)
+    rows_duplicate = db.Column(db.Integer, default=0)  # 이미 등록된 거래라 건너뛴 행
+    
+    message = db.Column(db.Text)  # 완료 메시지
+    error = db.Column(db.Text)  # 실패 사유
+    
+    # 결과 파일 (보고서 내보내기)
+    artifact_key = db.Column(db.String(64), index=True)  # 같은 요청 중복 제거용 키
+    artifact_path = db.Column(db.String(500))
+    artifact_name = db.Column(db.String(200))  # 내려받을 파일명
+    expires_at = db.Column(db.DateTime)
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    
+    def to_dict(self):
+        """작업 상태 JSON 변환"""
+        return {
+            'id': self.id,
+            'job_type': self.job_type,
+            'status': self.status,
+            'rows_parsed': self.rows_parsed or 0,
+            'rows_inserted': self.rows_inserted or 0,
+            'rows_classified': self.rows_classified or 0,
+            'rows_failed': self.rows_failed or 0,
+            'rows_duplicate': self.rows_duplicate or 0,
+            'message': self.message,
+            'error': self.error,
+            'artifact_name': self.artifact_name,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
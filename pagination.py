@@ -0,0 +1,102 @@
+"""
+키셋(커서) 페이지네이션
+
+OFFSET 대신 마지막으로 본 행의 정렬 키 (일시, ID) 다음부터 읽어
+몇 번째 페이지든 인덱스 범위 탐색 한 번으로 가져온다.
+전체 건수는 COUNT(*) 대신 추정치(PostgreSQL 실행 계획 또는 상한 있는 COUNT)를 쓴다.
+"""
+
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import func, select, tuple_
+
+from app import db
+
+# 추정 건수를 셀 때 읽는 최대 행 수 (PostgreSQL 이외)
+COUNT_ESTIMATE_CAP = 10000
+
+
+def encode_cursor(sort_value, row_id):
+    """(정렬 일시, ID)를 URL에 넣을 커서 문자열로 변환"""
+    raw = json.dumps([sort_value.isoformat(), row_id])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """커서 문자열을 (정렬 일시, ID)로 변환 - 잘못된 값이면 None"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(sort_value), int(row_id)
+    except (ValueError, TypeError):
+        return None
+
+
+def approximate_count(query, cap=COUNT_ESTIMATE_CAP):
+    """
+    쿼리 결과 건수 추정 - (건수, 추정 여부)
+
+    PostgreSQL은 실행 계획의 예상 행 수를, 그 밖의 DB는 cap건까지만 센 값을 쓴다.
+    """
+    connection = db.session.connection()
+    if connection.dialect.name == 'postgresql':
+        compiled = query.order_by(None).statement.compile(dialect=connection.dialect)
+        plan = connection.exec_driver_sql('EXPLAIN (FORMAT JSON) ' + str(compiled), compiled.params).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows']), True
+
+    limited = query.order_by(None).limit(cap + 1).subquery()
+    count = db.session.execute(select(func.count()).select_from(limited)).scalar() or 0
+    return min(count, cap), count > cap
+
+
+class KeysetPagination:
+    """
+    (sort_column DESC, id DESC) 순 키셋 페이지
+
+    after 커서가 있으면 그 다음(더 오래된) 페이지, before 커서가 있으면 그 이전(더 최근) 페이지를 읽는다.
+    이전 페이지에서 센 건수(total)를 넘겨받으면 다시 세지 않는다.
+    """
+
+    def __init__(self, query, sort_column, id_column, per_page, after=None, before=None, with_total=True,
+                 total=None, total_is_estimate=False):
+        self.per_page = per_page
+        key = tuple_(sort_column, id_column)
+        after_key = decode_cursor(after) if after is not None else None
+        before_key = decode_cursor(before) if before is not None else None
+
+        if before_key is not None:
+            # 이전 페이지: 커서보다 최근 행을 오름차순으로 읽고 뒤집음
+            rows = query.filter(key > tuple_(*before_key)).order_by(
+                sort_column.asc(), id_column.asc()
+            ).limit(per_page + 1).all()
+            self.has_prev = len(rows) > per_page
+            self.has_next = True
+            self.items = list(reversed(rows[:per_page]))
+        else:
+            if after_key is not None:
+                query_page = query.filter(key < tuple_(*after_key))
+            else:
+                query_page = query
+            rows = query_page.order_by(sort_column.desc(), id_column.desc()).limit(per_page + 1).all()
+            self.has_prev = after_key is not None
+            self.has_next = len(rows) > per_page
+            self.items = rows[:per_page]
+
+        self.sort_attr = sort_column.key
+        self.id_attr = id_column.key
+        self.next_cursor = self._cursor(self.items[-1]) if self.items and self.has_next else None
+        self.prev_cursor = self._cursor(self.items[0]) if self.items and self.has_prev else None
+
+        if not with_total:
+            self.total, self.total_is_estimate = None, False
+        elif total is not None:
+            self.total, self.total_is_estimate = total, total_is_estimate
+        else:
+            self.total, self.total_is_estimate = approximate_count(query)
+
+    def _cursor(self, item):
+        return encode_cursor(getattr(item, self.sort_attr), getattr(item, self.id_attr))
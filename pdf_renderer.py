@@ -0,0 +1,99 @@
+"""
+PDF 렌더링
+
+templates/pdf의 Jinja 템플릿을 HTML로 렌더링한 뒤 WeasyPrint로 PDF를 만든다.
+스타일시트는 처음 쓸 때 한 번만 파싱해 weasyprint.CSS 객체로 보관하고, 글꼴 설정(FontConfiguration)도
+프로세스 안에서 공유하므로 렌더링마다 CSS 파싱과 글꼴 로딩을 반복하지 않는다.
+
+Flask 앱에 의존하지 않아 웹 요청, 보고서 내보내기 프로세스 풀, 매뉴얼 생성 스크립트에서 함께 쓴다.
+"""
+
+import os
+import threading
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+PDF_TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates', 'pdf')
+
+
+def format_number(value):
+    """천 단위 구분 정수 표기"""
+    return f'{value or 0:,.0f}'
+
+
+def format_krw(value):
+    """원화 금액 표기"""
+    return f'{format_number(value)} KRW'
+
+
+def format_percent(value):
+    """소수 첫째 자리 백분율 표기"""
+    return f'{value or 0:.1f}%'
+
+
+class PdfRenderer:
+    """템플릿 환경, 파싱된 스타일시트, 글꼴 설정을 재사용하는 PDF 렌더러"""
+
+    def __init__(self, template_dir=PDF_TEMPLATE_DIR):
+        self.template_dir = template_dir
+        self.environment = Environment(
+            loader=FileSystemLoader(template_dir),
+            autoescape=select_autoescape(['html'])
+        )
+        self.environment.filters.update(number=format_number, krw=format_krw, percent=format_percent)
+        self._font_config = None
+        self._stylesheets = {}
+        # WeasyPrint 글꼴 설정은 스레드 간 동시 사용을 보장하지 않으므로 렌더링을 직렬화
+        # (병렬 렌더링은 보고서 내보내기 프로세스 풀이 담당)
+        self._lock = threading.Lock()
+
+    @property
+    def font_config(self):
+        """공유 글꼴 설정 (처음 사용할 때 생성)"""
+        if self._font_config is None:
+            from weasyprint.text.fonts import FontConfiguration
+            self._font_config = FontConfiguration()
+        return self._font_config
+
+    def stylesheet(self, name):
+        """템플릿 디렉터리의 CSS 파일을 파싱한 weasyprint.CSS (파일별로 한 번만 파싱)"""
+        if name not in self._stylesheets:
+            import weasyprint
+            self._stylesheets[name] = weasyprint.CSS(
+                filename=os.path.join(self.template_dir, name),
+                font_config=self.font_config
+            )
+        return self._stylesheets[name]
+
+    def render_html(self, template_name, **context):
+        """템플릿을 HTML 문자열로 렌더링"""
+        return self.environment.get_template(template_name).render(**context)
+
+    def render(self, template_name, stylesheets=(), base_url=None, **context):
+        """템플릿을 PDF 바이트로 렌더링"""
+        import weasyprint
+
+        html = self.render_html(template_name, **context)
+        with self._lock:
+            return weasyprint.HTML(string=html, base_url=base_url or self.template_dir).write_pdf(
+                stylesheets=[self.stylesheet(name) for name in stylesheets],
+                font_config=self.font_config
+            )
+
+
+_renderer = None
+_renderer_lock = threading.Lock()
+
+
+def pdf_renderer():
+    """프로세스 공유 PDF 렌더러"""
+    global _renderer
+    with _renderer_lock:
+        if _renderer is None:
+            _renderer = PdfRenderer()
+        return _renderer
+
+
+def render_pdf(template_name, stylesheets=(), **context):
+    """공유 렌더러로 템플릿을 PDF 바이트로 렌더링"""
+    return pdf_renderer().render(template_name, stylesheets=stylesheets, **context)
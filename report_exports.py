@@ -0,0 +1,122 @@
+"""
+보고서 내보내기 작업
+
+보고서 파일(CSV/Excel/PDF) 생성을 요청 처리 밖에서 실행한다.
+- 작업은 jobs 모듈의 스레드 풀에서 돌고, CPU를 쓰는 렌더링은 별도 프로세스 풀에서 실행
+- 완성된 파일은 REPORT_EXPORT_DIR에 저장하고 REPORT_EXPORT_TTL초 동안 내려받을 수 있음
+- 같은 보고서(유형, 기간, 형식, 데이터)는 진행 중이거나 만료 전인 작업을 다시 사용
+"""
+
+import hashlib
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from app import db
+from jobs import submit_job
+from models import Job
+from report_renderers import REPORT_EXPORT_FORMATS, report_filename, write_report_file
+from reporting import monthly_cashflow
+
+REPORT_EXPORT_JOB = 'report_export'
+REPORT_EXPORT_DIR = os.environ.get('REPORT_EXPORT_DIR', os.path.join(tempfile.gettempdir(), 'fin-flow-exports'))
+REPORT_EXPORT_TTL = int(os.environ.get('REPORT_EXPORT_TTL', 3600))
+REPORT_EXPORT_WORKERS = int(os.environ.get('REPORT_EXPORT_WORKERS', 2))
+
+_render_pool = None
+_render_pool_lock = threading.Lock()
+
+
+def render_pool():
+    """렌더링 프로세스 풀 (처음 사용할 때 생성, spawn 방식이라 부모의 스레드/DB 연결을 물려받지 않음)"""
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is None:
+            _render_pool = ProcessPoolExecutor(
+                max_workers=REPORT_EXPORT_WORKERS,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _render_pool
+
+
+def export_key(report_type, start_date, end_date, export_format, data):
+    """같은 보고서 파일을 찾기 위한 키 (보고서 데이터가 바뀌면 달라짐)"""
+    payload = json.dumps([report_type, export_format, str(start_date), str(end_date), data],
+                         sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def artifact_available(job, now=None):
+    """완료된 작업의 파일을 아직 내려받을 수 있는지 확인"""
+    now = now or datetime.utcnow()
+    return (job.status == 'completed' and job.expires_at is not None and job.expires_at > now
+            and bool(job.artifact_path) and os.path.exists(job.artifact_path))
+
+
+def find_reusable_export(key):
+    """진행 중이거나 파일이 남아 있는 같은 키의 작업"""
+    now = datetime.utcnow()
+    jobs = Job.query.filter(
+        Job.job_type == REPORT_EXPORT_JOB,
+        Job.artifact_key == key,
+        Job.status.in_(['queued', 'running', 'completed'])
+    ).order_by(Job.id.desc()).all()
+    for job in jobs:
+        if job.status != 'completed' or artifact_available(job, now):
+            return job
+    return None
+
+
+def purge_expired_exports():
+    """만료된 보고서 파일 삭제 후 작업을 expired로 표시 - 정리한 작업 수 반환"""
+    expired = Job.query.filter(
+        Job.job_type == REPORT_EXPORT_JOB,
+        Job.status == 'completed',
+        Job.expires_at <= datetime.utcnow()
+    ).all()
+    for job in expired:
+        if job.artifact_path and os.path.exists(job.artifact_path):
+            try:
+                os.remove(job.artifact_path)
+            except OSError:
+                continue
+        job.status = 'expired'
+    if expired:
+        db.session.commit()
+    return len(expired)
+
+
+def request_report_export(report_type, start_date, end_date, export_format, user_id=None):
+    """보고서 내보내기 작업 등록 - (작업, 기존 작업 재사용 여부)"""
+    purge_expired_exports()
+
+    data = monthly_cashflow(start_date, end_date)
+    key = export_key(report_type, start_date, end_date, export_format, data)
+    job = find_reusable_export(key)
+    if job:
+        return job, True
+
+    job = submit_job(
+        REPORT_EXPORT_JOB, run_report_export, key, data, report_type, start_date, end_date, export_format,
+        user_id=user_id,
+        job_fields={'artifact_key': key, 'artifact_name': report_filename(start_date, end_date, export_format)}
+    )
+    return job, False
+
+
+def run_report_export(progress, key, data, report_type, start_date, end_date, export_format):
+    """보고서 파일을 프로세스 풀에서 만들고 작업에 파일 위치와 만료 시각 기록"""
+    extension, _ = REPORT_EXPORT_FORMATS[export_format]
+    os.makedirs(REPORT_EXPORT_DIR, exist_ok=True)
+    # 같은 키의 이전 파일이 만료 정리로 지워져도 영향이 없도록 작업마다 다른 파일명 사용
+    path = os.path.join(REPORT_EXPORT_DIR, f'{key}-{uuid.uuid4().hex[:8]}.{extension}')
+
+    render_pool().submit(write_report_file, export_format, data, start_date, end_date, path).result()
+
+    progress(artifact_path=path, expires_at=datetime.utcnow() + timedelta(seconds=REPORT_EXPORT_TTL))
+    return f'{report_filename(start_date, end_date, export_format)} 파일이 준비되었습니다.'
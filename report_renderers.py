@@ -0,0 +1,181 @@
+"""
+보고서 파일 렌더링
+
+월별 현금흐름 데이터(reporting.monthly_cashflow 결과)를 CSV/Excel/PDF 파일로 만든다.
+앱/DB에 의존하지 않으므로 요청 처리 중에도, 보고서 내보내기 작업의 프로세스 풀에서도 같은 함수를 쓴다.
+"""
+
+import csv
+import io
+import os
+from datetime import datetime
+
+from pdf_renderer import pdf_renderer, render_pdf
+from xlsx_writer import XLSX_MIMETYPE, XlsxWorkbook
+
+# 형식 -> (확장자, MIME 타입)
+REPORT_EXPORT_FORMATS = {
+    'csv': ('csv', 'text/csv; charset=utf-8'),
+    'excel': ('xlsx', XLSX_MIMETYPE),
+    'pdf': ('pdf', 'application/pdf')
+}
+
+
+def report_filename(start_date, end_date, export_format):
+    """내려받을 보고서 파일명"""
+    extension, _ = REPORT_EXPORT_FORMATS[export_format]
+    return f"financial_report_{start_date}_{end_date}.{extension}"
+
+
+def report_csv(data, start_date, end_date):
+    """CSV 보고서 바이트 (UTF-8 BOM 포함)"""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    
+    # 리포트 헤더 정보
+    writer.writerow(['Vlan24 - 재무 리포트'])
+    writer.writerow([f'기간: {start_date} ~ {end_date}'])
+    writer.writerow([f'생성일: {datetime.now().strftime("%Y-%m-%d %H:%M")}'])
+    writer.writerow([''])
+    
+    # 요약 정보
+    total_income = sum(row['income'] for row in data)
+    total_expense = sum(row['expense'] for row in data)
+    net_flow = total_income - total_expense
+    
+    writer.writerow(['== 요약 정보 =='])
+    writer.writerow(['총 수입', f'{total_income:,.0f}원'])
+    writer.writerow(['총 지출', f'{total_expense:,.0f}원'])
+    writer.writerow(['순현금흐름', f'{net_flow:,.0f}원'])
+    writer.writerow(['평균 월 수입', f'{total_income/len(data) if data else 0:,.0f}원'])
+    writer.writerow(['평균 월 지출', f'{total_expense/len(data) if data else 0:,.0f}원'])
+    writer.writerow([''])
+    
+    # 월별 상세 데이터
+    writer.writerow(['== 월별 상세 =='])
+    writer.writerow(['기간', '수입(원)', '지출(원)', '순현금흐름(원)', '수입 비중(%)', '지출 비중(%)'])
+    
+    for row in data:
+        income_ratio = (row['income'] / total_income * 100) if total_income > 0 else 0
+        expense_ratio = (row['expense'] / total_expense * 100) if total_expense > 0 else 0
+        
+        writer.writerow([
+            row['period'],
+            f"{row['income']:,.0f}",
+            f"{row['expense']:,.0f}",
+            f"{row['net']:,.0f}",
+            f"{income_ratio:.1f}%",
+            f"{expense_ratio:.1f}%"
+        ])
+    
+    # BOM 추가로 Excel에서 한글 깨짐 방지
+    return output.getvalue().encode('utf-8-sig')
+
+
+def report_workbook(data, start_date, end_date, workbook=None):
+    """Excel 보고서 워크북 (리포트정보/재무요약/월별상세 시트)"""
+    # 요약 정보 계산
+    total_income = sum(row['income'] for row in data)
+    total_expense = sum(row['expense'] for row in data)
+    net_flow = total_income - total_expense
+    avg_income = total_income / len(data) if data else 0
+    avg_expense = total_expense / len(data) if data else 0
+    
+    # 요약 데이터
+    summary_rows = [
+        ['총 수입', f'{total_income:,.0f}원'],
+        ['총 지출', f'{total_expense:,.0f}원'],
+        ['순현금흐름', f'{net_flow:,.0f}원'],
+        ['평균 월 수입', f'{avg_income:,.0f}원'],
+        ['평균 월 지출', f'{avg_expense:,.0f}원'],
+        ['분석 기간', f'{len(data)}개월']
+    ]
+    
+    # 상세 데이터
+    detail_rows = []
+    for row in data:
+        income_ratio = (row['income'] / total_income * 100) if total_income > 0 else 0
+        expense_ratio = (row['expense'] / total_expense * 100) if total_expense > 0 else 0
+        
+        detail_rows.append([
+            row['period'],
+            row['income'],
+            row['expense'],
+            row['net'],
+            round(income_ratio, 1),
+            round(expense_ratio, 1),
+            round((row['net'] / row['expense'] * 100) if row['expense'] > 0 else 0, 1)
+        ])
+    
+    # 메타데이터
+    metadata_rows = [
+        ['리포트명', 'Vlan24 재무리포트'],
+        ['생성일시', datetime.now().strftime('%Y년 %m월 %d일 %H:%M')],
+        ['기간', f'{start_date} ~ {end_date}'],
+        ['데이터 건수', f'{len(data)}개월']
+    ]
+    
+    # Excel 시트 작성
+    workbook = workbook or XlsxWorkbook()
+    workbook.add_sheet('리포트정보', ['정보', '값'], metadata_rows)
+    workbook.add_sheet('재무요약', ['항목', '금액'], summary_rows, column_widths=[15, 20])
+    workbook.add_sheet('월별상세', ['기간', '수입(원)', '지출(원)', '순현금흐름(원)', '수입 비중(%)', '지출 비중(%)', '수익률(%)'],
+                       detail_rows, column_widths=[15] * 7)
+    return workbook
+
+
+REPORT_PDF_TEMPLATE = 'financial_report.html'
+REPORT_PDF_STYLESHEETS = ('report.css',)
+
+
+def report_pdf_context(data, start_date, end_date):
+    """PDF 보고서 템플릿 값"""
+    total_income = sum(row['income'] for row in data)
+    total_expense = sum(row['expense'] for row in data)
+    rows = [dict(row,
+                 income_ratio=(row['income'] / total_income * 100) if total_income > 0 else 0,
+                 expense_ratio=(row['expense'] / total_expense * 100) if total_expense > 0 else 0)
+            for row in data]
+    return {
+        'start_date': start_date,
+        'end_date': end_date,
+        'generated_at': datetime.now(),
+        'rows': rows,
+        'total_income': total_income,
+        'total_expense': total_expense,
+        'net_flow': total_income - total_expense,
+        'avg_income': total_income / len(data) if data else 0,
+        'avg_expense': total_expense / len(data) if data else 0,
+        'best_month': max(data, key=lambda x: x['net'])['period'] if data else 'N/A',
+        'worst_month': min(data, key=lambda x: x['net'])['period'] if data else 'N/A',
+        'expense_to_income': (total_expense / total_income * 100) if total_income > 0 else 0
+    }
+
+
+def report_pdf_html(data, start_date, end_date):
+    """PDF 보고서 HTML"""
+    return pdf_renderer().render_html(REPORT_PDF_TEMPLATE, **report_pdf_context(data, start_date, end_date))
+
+
+def report_pdf(data, start_date, end_date):
+    """PDF 보고서 바이트"""
+    return render_pdf(REPORT_PDF_TEMPLATE, stylesheets=REPORT_PDF_STYLESHEETS,
+                      **report_pdf_context(data, start_date, end_date))
+
+
+def write_report_file(export_format, data, start_date, end_date, path):
+    """보고서를 path에 저장 (임시 파일에 쓴 뒤 이름을 바꿔 완성된 파일만 보이게 함)"""
+    partial_path = f"{path}.{os.getpid()}.partial"
+    try:
+        if export_format == 'excel':
+            report_workbook(data, start_date, end_date).save(partial_path)
+        else:
+            content = report_csv(data, start_date, end_date) if export_format == 'csv' else report_pdf(data, start_date, end_date)
+            with open(partial_path, 'wb') as f:
+                f.write(content)
+        os.replace(partial_path, path)
+    except Exception:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+    return path
@@ -0,0 +1,247 @@
+"""
+보고서/대시보드 집계 서비스
+
+여러 화면(HTML 뷰, JSON API, 내보내기)에서 같은 집계를 공유하도록
+일별 원장 집계(ledger_rollup) 위의 조건부 SUM(CASE ...) 단일 쿼리 집계를 제공한다.
+"""
+
+from datetime import date, timedelta
+
+from sqlalchemy import and_, case, extract, func, or_, select
+
+from app import db
+from budget_tracker import consumption_by
+from ledger_rollup import rollup_period_filter
+from models import Account, Category, CategoryBudget, Department, LedgerRollup, Transaction
+
+
+# 대시보드 차트 기간(일)과 세부 구분
+CHART_WINDOWS = (7, 30, 90)
+CHART_BREAKDOWNS = ('account', 'department')
+
+
+def conditional_sum(value, *conditions):
+    """조건을 만족하는 행의 value 합계 (SUM(CASE WHEN ... THEN value ELSE 0 END))"""
+    return func.coalesce(func.sum(case((and_(*conditions), value), else_=0)), 0)
+
+
+class DashboardKpis:
+    """대시보드 KPI - 이번달/저번달 수입·지출, 미분류 건수, 부서 수를 한 번의 쿼리로 집계"""
+
+    def __init__(self, today=None):
+        self.today = today or date.today()
+        self.current_month = self.today.replace(day=1)
+        self.last_month = (self.current_month - timedelta(days=1)).replace(day=1)
+        self.next_month = (self.current_month + timedelta(days=32)).replace(day=1)
+
+    def compute(self):
+        """KPI 값 딕셔너리 반환 (지출은 양수)"""
+        total = LedgerRollup.total
+        # 이번달은 [1일, 다음달 1일) 구간 - 미래 일자로 입력된 다음달 이후 거래는 제외
+        this_month = and_(LedgerRollup.day >= self.current_month, LedgerRollup.day < self.next_month)
+        last_month = LedgerRollup.day < self.current_month
+        income = LedgerRollup.sign > 0
+        expense = LedgerRollup.sign < 0
+
+        unclassified_count = select(func.count(Transaction.id)).where(
+            Transaction.classification_status == 'pending',
+            Transaction.is_active.is_(True)
+        ).scalar_subquery()
+        departments_count = select(func.count(Department.id)).scalar_subquery()
+
+        # 저번달 1일 이후 일별 집계만 읽고 월/부호별 합계는 CASE로 나눔 (이체 제외)
+        row = db.session.execute(
+            select(
+                conditional_sum(total, this_month, income).label('current_income'),
+                conditional_sum(total, this_month, expense).label('current_expense'),
+                conditional_sum(total, last_month, income).label('last_income'),
+                conditional_sum(total, last_month, expense).label('last_expense'),
+                unclassified_count.label('unclassified_count'),
+                departments_count.label('departments_count')
+            ).where(
+                LedgerRollup.is_transfer == False,
+                rollup_period_filter(self.last_month)
+            )
+        ).one()
+
+        return {
+            'current_income': float(row.current_income or 0),
+            'current_expense': abs(float(row.current_expense or 0)),
+            'last_income': float(row.last_income or 0),
+            'last_expense': abs(float(row.last_expense or 0)),
+            'unclassified_count': int(row.unclassified_count or 0),
+            'departments_count': int(row.departments_count or 0)
+        }
+
+    def department_expenses(self, days=90):
+        """부서별 지출 현황 (이번달 1일 기준 최근 days일, 이체 제외)"""
+        rows = db.session.query(
+            Department.name,
+            func.sum(LedgerRollup.total).label('total')
+        ).join(LedgerRollup, LedgerRollup.department_id == Department.id).filter(
+            LedgerRollup.sign < 0,
+            LedgerRollup.is_transfer == False,
+            rollup_period_filter(self.current_month - timedelta(days=days))
+        ).group_by(Department.name).all()
+
+        return [{'name': row.name, 'total': float(abs(row.total or 0))} for row in rows]
+
+
+def daily_cashflow(days=7, breakdown=None, end_date=None):
+    """
+    최근 days일 일별 수입/지출 (일별 집계를 GROUP BY 일자로 합산, 이체 제외)
+
+    breakdown이 'account' 또는 'department'이면 구분별 시리즈도 함께 반환한다.
+    """
+    end_date = end_date or date.today()
+    start_date = end_date - timedelta(days=days - 1)
+    day_list = [start_date + timedelta(days=offset) for offset in range(days)]
+    positions = {day: index for index, day in enumerate(day_list)}
+
+    group_columns = [LedgerRollup.day]
+    if breakdown == 'account':
+        group_columns.append(LedgerRollup.account_id)
+    elif breakdown == 'department':
+        group_columns.append(LedgerRollup.department_id)
+
+    rows = db.session.query(
+        *group_columns,
+        conditional_sum(LedgerRollup.total, LedgerRollup.sign > 0).label('income'),
+        conditional_sum(LedgerRollup.total, LedgerRollup.sign < 0).label('expense')
+    ).filter(
+        LedgerRollup.is_transfer.is_(False),
+        rollup_period_filter(start_date, end_date)
+    ).group_by(*group_columns).all()
+
+    income = [0.0] * days
+    expense = [0.0] * days
+    groups = {}
+    for row in rows:
+        index = positions.get(row.day)
+        if index is None:
+            continue
+        income[index] += float(row.income or 0)
+        expense[index] += abs(float(row.expense or 0))
+        if breakdown:
+            group = groups.setdefault(row[1], {'income': [0.0] * days, 'expense': [0.0] * days})
+            group['income'][index] += float(row.income or 0)
+            group['expense'][index] += abs(float(row.expense or 0))
+
+    result = {
+        'dates': [day.strftime('%m/%d') for day in day_list],
+        'income': income,
+        'expense': expense
+    }
+
+    if breakdown:
+        if breakdown == 'account':
+            names = dict(db.session.query(Account.id, Account.account_name).filter(Account.id.in_(list(groups))))
+        else:
+            names = dict(db.session.query(Department.id, Department.name).filter(Department.id.in_(list(groups))))
+        result['breakdown'] = [{
+            'id': group_id,
+            'name': names.get(group_id, '미지정'),
+            'income': series['income'],
+            'expense': series['expense']
+        } for group_id, series in sorted(groups.items())]
+
+    return result
+
+
+def monthly_cashflow(start_date=None, end_date=None):
+    """
+    기간(양 끝 포함) 월별 수입/지출/순현금흐름 (이체 제외, 지출은 양수)
+
+    보고서 화면, 보고서 데이터 API, 보고서 내보내기가 같은 결과를 쓰도록
+    수입/지출을 조건부 SUM으로 한 번에 집계한다.
+    """
+    year = extract('year', LedgerRollup.day)
+    month = extract('month', LedgerRollup.day)
+
+    rows = db.session.query(
+        year.label('year'),
+        month.label('month'),
+        conditional_sum(LedgerRollup.total, LedgerRollup.sign > 0).label('income'),
+        conditional_sum(LedgerRollup.total, LedgerRollup.sign < 0).label('expense')
+    ).filter(
+        LedgerRollup.is_transfer == False,
+        rollup_period_filter(start_date, end_date)
+    ).group_by(year, month).order_by(year, month).all()
+
+    cashflow = []
+    for row in rows:
+        income = float(row.income or 0)
+        expense = float(row.expense or 0)
+        cashflow.append({
+            'year': int(row.year),
+            'month': int(row.month),
+            'period': f"{int(row.year)}-{int(row.month):02d}",
+            'income': income,
+            'expense': abs(expense),
+            'net': income + expense
+        })
+    return cashflow
+
+
+def period_months(start_date, end_date):
+    """기간에 걸친 (연, 월) 목록 (양 끝 월 포함)"""
+    months = []
+    year, month = start_date.year, start_date.month
+    while (year, month) <= (end_date.year, end_date.month):
+        months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def budget_vs_actual(start_date, end_date):
+    """
+    기간이 걸친 월의 부서별/분류별 예산 대비 실적 (실적은 이체 제외 지출, 양수)
+
+    실적은 월 단위로 증분 갱신되는 예산 사용액(budget_consumption)에서 읽는다.
+    부서 예산(Department.budget)은 연간 예산이므로 기간 개월 수만큼 월할하고,
+    분류 예산은 기간에 걸친 월별 CategoryBudget 합계에 연간 예산의 월할분을 더해 한 번의 GROUP BY로 구한다.
+    """
+    months = period_months(start_date, end_date)
+    months_by_year = {}
+    for year, _ in months:
+        months_by_year[year] = months_by_year.get(year, 0) + 1
+
+    department_spent = consumption_by('department', months)
+    category_spent = consumption_by('category', months)
+
+    # 분류 예산: 월 예산은 기간 내 월만, 연간 예산(month가 NULL)은 기간에 포함된 개월 수만큼 월할
+    year_month = CategoryBudget.year * 100 + CategoryBudget.month
+    budget_amount = case(
+        (CategoryBudget.month.is_(None),
+         CategoryBudget.budget_amount * case(months_by_year, value=CategoryBudget.year, else_=0) / 12.0),
+        else_=CategoryBudget.budget_amount
+    )
+    category_budgets = dict(db.session.query(
+        CategoryBudget.category_id,
+        func.sum(budget_amount)
+    ).filter(
+        CategoryBudget.is_active == True,
+        CategoryBudget.year.in_(list(months_by_year)),
+        or_(CategoryBudget.month.is_(None),
+            year_month.between(months[0][0] * 100 + months[0][1], months[-1][0] * 100 + months[-1][1]))
+    ).group_by(CategoryBudget.category_id).all())
+
+    def budget_row(key, name, budget, actual):
+        budget = float(budget or 0)
+        actual = float(actual or 0)
+        return {key: name, 'budget': budget, 'actual': actual, 'variance': budget - actual}
+
+    departments = [
+        budget_row('department', department.name, float(department.budget or 0) * len(months) / 12,
+                   department_spent.get(department.id))
+        for department in Department.query.order_by(Department.name).all()
+    ]
+
+    category_ids = [category_id for category_id in set(category_budgets) | set(category_spent)
+                    if category_id and (category_budgets.get(category_id) or category_spent.get(category_id))]
+    categories = [
+        budget_row('category', category.name, category_budgets.get(category.id), category_spent.get(category.id))
+        for category in Category.query.filter(Category.id.in_(category_ids)).order_by(Category.name).all()
+    ]
+
+    return {'departments': departments, 'categories': categories}
@@ -1,11 +1,28 @@
-from flask import render_template, request, redirect, url_for, flash, jsonify, session, make_response, send_file
+from flask import (render_template, request, redirect, url_for, flash, jsonify, session, make_response, send_file,
+                   Response, stream_with_context)
 from flask_login import login_user, logout_user, login_required, current_user
 from datetime import datetime, timedelta, date
-from sqlalchemy import func, desc, extract
+from sqlalchemy import func, desc, extract, case, select
 from app import app, db
 from models import (Institution, Account, Transaction, Category, Department, 
-                   Vendor, MappingRule, Contract, AuditLog, Alert, Consent, User)
-from utils import apply_classification_rules
+                   Vendor, MappingRule, Contract, AuditLog, Alert, Consent, User, Job, LedgerRollup)
+from utils import apply_classification_rules, date_range_filter
+from exports import (COLUMNAR_EXPORT_FORMATS, EXPORT_FETCH_SIZE, TRANSACTION_EXPORT_COLUMNS, XlsxExport,
+                     has_period_transactions, iter_transaction_rows, send_transactions_columnar,
+                     stream_transactions_csv)
+from importer import UPLOAD_FILE_EXTENSIONS, run_import_job
+from report_renderers import REPORT_EXPORT_FORMATS, report_csv, report_filename, report_pdf, report_workbook
+from report_exports import REPORT_EXPORT_JOB, artifact_available, request_report_export
+from budget_tracker import category_usage, check_budget_alerts, department_usage
+from cache import cacheable_json, get_or_compute, invalidate_ledger_cache
+from jobs import submit_job
+from ledger_rollup import rebuild_rollup, rollup_period_filter
+from pagination import KeysetPagination
+from search_index import search_ranking
+from reporting import (CHART_BREAKDOWNS, CHART_WINDOWS, DashboardKpis, budget_vs_actual, daily_cashflow,
+                       monthly_cashflow)
+from rule_engine import (CompiledRule, apply_rule_in_database, invalidate_rule_set,
+                         reapply_all_rules, reclassify_rule_transactions)
 import json
 import re
 import pandas as pd
@@ -58,7 +75,7 @@ TEXTS = {
         'data_import': '데이터 가져오기',
         'file_upload': '파일 업로드',
         'upload_bank_transactions': '은행거래 파일 업로드',
-        'supported_formats': '지원 형식: CSV, Excel (XLS, XLSX)',
+        'supported_formats': '지원 형식: CSV, Excel (XLS, XLSX), Parquet, Arrow IPC',
         'choose_file': '파일 선택',
         'upload': '업로드',
         'sample_download': '샘플 파일 다운로드',
@@ -128,7 +145,7 @@ TEXTS = {
         'data_import': 'Data Import',
         'file_upload': 'File Upload',
         'upload_bank_transactions': 'Upload Bank Transaction File',
-        'supported_formats': 'Supported formats: CSV, Excel (XLS, XLSX)',
+        'supported_formats': 'Supported formats: CSV, Excel (XLS, XLSX), Parquet, Arrow IPC',
         'choose_file': 'Choose File',
         'upload': 'Upload',
         'sample_download': 'Sample File Download',
@@ -338,45 +355,10 @@ def register():
 @login_required
 def dashboard():
     """대시보드 - KPI 및 주요 지표 표시"""
-    from datetime import timedelta
-    # KPI 계산
-    today = datetime.now().date()
-    current_month = today.replace(day=1)
-    last_month = (current_month - timedelta(days=1)).replace(day=1)
-    
-    # 이번달 수입/지출 (이체 제외)
-    current_income = db.session.query(func.sum(Transaction.amount)).filter(
-        Transaction.amount > 0,
-        Transaction.transaction_type != 'transfer',
-        func.date(Transaction.transaction_date) >= current_month
-    ).scalar() or 0
-    
-    current_expense = db.session.query(func.sum(Transaction.amount)).filter(
-        Transaction.amount < 0,
-        Transaction.transaction_type != 'transfer',
-        func.date(Transaction.transaction_date) >= current_month
-    ).scalar() or 0
-    
-    # 저번달 수입/지출 (이체 제외)
-    last_income = db.session.query(func.sum(Transaction.amount)).filter(
-        Transaction.amount > 0,
-        Transaction.transaction_type != 'transfer',
-        func.date(Transaction.transaction_date) >= last_month,
-        func.date(Transaction.transaction_date) < current_month
-    ).scalar() or 0
-    
-    last_expense = db.session.query(func.sum(Transaction.amount)).filter(
-        Transaction.amount < 0,
-        Transaction.transaction_type != 'transfer',
-        func.date(Transaction.transaction_date) >= last_month,
-        func.date(Transaction.transaction_date) < current_month
-    ).scalar() or 0
-    
-    # 미분류 거래 수
-    unclassified_count = Transaction.query.filter_by(classification_status='pending').count()
-    
-    # 부서 수
-    departments_count = Department.query.count()
+    # KPI 계산 (단일 집계 쿼리, 거래 변경 시 캐시 무효화)
+    dashboard_kpis = DashboardKpis()
+    cache_params = {'today': dashboard_kpis.today}
+    kpis = get_or_compute('dashboard_kpis', cache_params, dashboard_kpis.compute)
     
     # 최근 거래 내역 (5건)
     recent_transactions = Transaction.query.order_by(desc(Transaction.transaction_date)).limit(5).all()
@@ -385,32 +367,23 @@ def dashboard():
     recent_alerts = Alert.query.filter_by(is_read=False).order_by(desc(Alert.created_at)).limit(5).all()
     
     # 부서별 지출 현황 (최근 3개월로 확장하여 데이터 확보)
-    three_months_ago = current_month - timedelta(days=90)
-    
-    dept_expenses_raw = db.session.query(
-        Department.name,
-        func.sum(Transaction.amount).label('total')
-    ).join(Transaction).filter(
-        Transaction.amount < 0,
-        Transaction.transaction_type != 'transfer',
-        func.date(Transaction.transaction_date) >= three_months_ago
-    ).group_by(Department.name).all()
-    
-    # Convert to JSON serializable format
-    dept_expenses = [{'name': row.name, 'total': float(abs(row.total or 0))} for row in dept_expenses_raw]
+    dept_expenses = get_or_compute('dashboard_dept_expenses', cache_params,
+                                   lambda: dashboard_kpis.department_expenses(days=90))
     
     print(f"Dashboard - Department expenses data: {dept_expenses}")
     
     return render_template('dashboard.html',
-                         current_income=current_income,
-                         current_expense=abs(current_expense),
-                         last_income=last_income,
-                         last_expense=abs(last_expense),
-                         unclassified_count=unclassified_count,
-                         departments_count=departments_count,
                          recent_transactions=recent_transactions,
                          recent_alerts=recent_alerts,
-                         dept_expenses=dept_expenses)
+                         dept_expenses=dept_expenses,
+                         **kpis)
+
+@app.route('/api/dashboard/kpis')
+@login_required
+def api_dashboard_kpis():
+    """대시보드 KPI API"""
+    dashboard_kpis = DashboardKpis()
+    return cacheable_json(get_or_compute('dashboard_kpis', {'today': dashboard_kpis.today}, dashboard_kpis.compute))
 
 @app.route('/connections')
 @login_required
@@ -537,23 +510,58 @@ def transactions():
         query = query.filter(Transaction.category_id == category_id)
     if account_id:
         query = query.filter(Transaction.account_id == account_id)
+    ranking = None
     if search:
         # 대소문자 구분 없는 검색을 위해 ilike 사용
         search_pattern = f'%{search.strip()}%'
         
-        # 업체, 거래처, 거래내용에서 검색
-        query = query.filter(
-            db.or_(
-                Transaction.description.ilike(search_pattern),  # 거래내용
-                Transaction.counterparty.ilike(search_pattern),  # 거래처
-                Transaction.vendor.has(Vendor.name.ilike(search_pattern))  # 업체명
+        # 업체명은 업체 테이블에서 먼저 찾아 업체 ID로 비교
+        vendor_ids = [row.id for row in db.session.query(Vendor.id).filter(Vendor.name.ilike(search_pattern))]
+        vendor_match = Transaction.vendor_id.in_(vendor_ids)
+        
+        # 거래내용/거래처는 n-gram 검색 색인 사용 (색인을 쓸 수 없는 검색어는 ilike)
+        ranking = search_ranking(search)
+        if ranking is None:
+            query = query.filter(
+                db.or_(
+                    Transaction.description.ilike(search_pattern),  # 거래내용
+                    Transaction.counterparty.ilike(search_pattern),  # 거래처
+                    vendor_match  # 업체명
+                )
             )
-        )
+        elif vendor_ids:
+            query = query.outerjoin(ranking, ranking.c.transaction_id == Transaction.id).filter(
+                db.or_(Transaction.id.in_(select(ranking.c.transaction_id)), vendor_match)
+            )
+        else:
+            query = query.join(ranking, ranking.c.transaction_id == Transaction.id)
     
     # 페이지네이션
-    transactions_page = query.order_by(desc(Transaction.transaction_date)).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+    if ranking is not None:
+        # 색인 검색 결과는 관련도 순 (업체명만 일치한 거래는 관련도 0)
+        transactions_page = query.order_by(
+            func.coalesce(ranking.c.score, 0).desc(), desc(Transaction.transaction_date), desc(Transaction.id)
+        ).paginate(page=page, per_page=per_page, error_out=False)
+    elif 'page' in request.args:
+        # page가 주어지면 기존 번호 페이지
+        transactions_page = query.order_by(desc(Transaction.transaction_date), desc(Transaction.id)).paginate(
+            page=page, per_page=per_page, error_out=False
+        )
+    else:
+        # (거래일시, ID) 키셋 커서 - 건수는 첫 페이지에서만 세고 이후 페이지 링크로 전달
+        after = request.args.get('after') or None
+        before = request.args.get('before') or None
+        # 건수가 0이어도 넘겨받은 값을 그대로 사용
+        carried_total = (request.args.get('count', type=int)
+                         if after is not None or before is not None else None)
+        transactions_page = KeysetPagination(
+            query, Transaction.transaction_date, Transaction.id, per_page,
+            after=after,
+            before=before,
+            with_total=request.args.get('total', '1') != '0',
+            total=carried_total,
+            total_is_estimate=request.args.get('estimated') == '1'
+        )
     
     # 필터 옵션을 위한 데이터
     departments = Department.query.all()
@@ -627,8 +635,8 @@ def delete_transaction(transaction_id):
                 'error': '해당 거래를 찾을 수 없습니다.'
             })
         
-        # 거래를 소프트 삭제 (is_active = False)
-        transaction.is_active = False
+        # 거래를 소프트 삭제 (is_active = False, 재업로드할 수 있도록 fingerprint 제거)
+        transaction.soft_delete()
         db.session.commit()
         
         # 감사 로그 추가
@@ -736,6 +744,7 @@ def edit_transaction(transaction_id):
             transaction.department_id = request.form.get('department_id') or None
             transaction.vendor_id = request.form.get('vendor_id') or None
             transaction.classification_status = request.form.get('classification_status', 'manual')
+            transaction.classified_rule_id = None  # 직접 수정한 분류는 규칙 재분류 대상에서 제외
             transaction.memo = request.form.get('memo') or None
             
             # 수정일시 업데이트
@@ -813,6 +822,7 @@ def add_rule():
     
     db.session.add(rule)
     db.session.commit()
+    invalidate_rule_set()
     
     flash('분류 규칙이 추가되었습니다.', 'success')
     return redirect(url_for('rules'))
@@ -820,14 +830,12 @@ def add_rule():
 @app.route('/rule/<int:rule_id>/edit', methods=['POST'])
 @login_required
 def edit_rule(rule_id):
-    """분류 규칙 수정"""
+    """분류 규칙 수정 (영향 받는 거래만 재분류)"""
     try:
         rule = MappingRule.query.get_or_404(rule_id)
-        old_rule_active = rule.is_active
         
-        # 수정 전 상태가 활성화였다면 기존 분류 취소
-        if old_rule_active:
-            revert_rule_classifications(rule)
+        # 수정 전 조건 보관 (기존 분류 이력이 없는 거래 되돌리기용)
+        old_rule = CompiledRule(rule) if rule.is_active else None
         
         # 규칙 정보 업데이트
         rule.name = request.form['name']
@@ -840,16 +848,17 @@ def edit_rule(rule_id):
         rule.target_vendor_id = request.form.get('target_vendor_id') or None
         rule.is_active = 'is_active' in request.form
         
-        # 수정 후에는 모든 활성 규칙을 다시 적용하여 일관성 보장
         db.session.commit()  # 규칙 수정사항 먼저 저장
+        invalidate_rule_set()
+        
+        # 이 규칙이 분류한 거래와 새 조건에 매칭되는 거래만 재분류
+        reverted_count, reclassified_count = reclassify_rule_transactions(rule.id, old_rule)
+        db.session.commit()
         
         if rule.is_active:
-            total_applied = apply_all_active_rules()
-            db.session.commit()
-            flash(f'분류 규칙이 수정되어 {total_applied}건의 거래가 재분류되었습니다.', 'success')
+            flash(f'분류 규칙이 수정되어 {reclassified_count}건의 거래가 재분류되었습니다.', 'success')
         else:
-            db.session.commit()
-            flash('분류 규칙이 수정되었습니다.', 'success')
+            flash(f'분류 규칙이 수정되었습니다. ({reverted_count}건의 거래가 미분류로 변경)', 'success')
         
     except Exception as e:
         db.session.rollback()
@@ -857,101 +866,28 @@ def edit_rule(rule_id):
     
     return redirect(url_for('rules'))
 
-def check_rule_match(rule, transaction):
-    """거래가 규칙 조건에 매칭되는지 확인하는 함수"""
-    match = False
-    
-    if rule.condition_type == 'contains':
-        if rule.condition_field == 'description':
-            match = rule.condition_value.lower() in (transaction.description or '').lower()
-        elif rule.condition_field == 'counterparty':
-            match = rule.condition_value.lower() in (transaction.counterparty or '').lower()
-    
-    elif rule.condition_type == 'equals':
-        if rule.condition_field == 'description':
-            match = (transaction.description or '').lower() == rule.condition_value.lower()
-        elif rule.condition_field == 'counterparty':
-            match = (transaction.counterparty or '').lower() == rule.condition_value.lower()
-    
-    elif rule.condition_type == 'amount_range':
-        try:
-            range_parts = rule.condition_value.split('-')
-            if len(range_parts) == 2:
-                min_amount = float(range_parts[0])
-                max_amount = float(range_parts[1])
-                transaction_amount = abs(transaction.amount)
-                match = min_amount <= transaction_amount <= max_amount
-        except:
-            match = False
-    
-    elif rule.condition_type == 'regex':
-        try:
-            import re
-            if rule.condition_field == 'description':
-                match = bool(re.search(rule.condition_value, transaction.description or '', re.IGNORECASE))
-            elif rule.condition_field == 'counterparty':
-                match = bool(re.search(rule.condition_value, transaction.counterparty or '', re.IGNORECASE))
-        except:
-            match = False
-    
-    return match
-
-def revert_rule_classifications(rule):
-    """규칙에 매칭되는 모든 거래를 미분류로 되돌리는 함수 (일관성 보장)"""
-    # 모든 분류된 거래 조회
-    all_transactions = Transaction.query.filter(Transaction.classification_status.in_(['classified', 'manual'])).all()
-    reverted_count = 0
-    
-    for transaction in all_transactions:
-        # 해당 규칙 조건에 매칭되는 모든 거래를 미분류로 되돌림 (현재 분류와 무관)
-        if check_rule_match(rule, transaction):
-            transaction.classification_status = 'pending'
-            transaction.category_id = None
-            transaction.department_id = None
-            transaction.vendor_id = None
-            reverted_count += 1
-    
-    return reverted_count
-
-def apply_all_active_rules():
-    """모든 활성 규칙을 우선순위 순서로 적용하는 함수"""
-    active_rules = MappingRule.query.filter_by(is_active=True).order_by(MappingRule.priority.desc()).all()
-    total_applied = 0
-    
-    for rule in active_rules:
-        matched_transactions = apply_rule_to_transactions(rule)
-        total_applied += len(matched_transactions)
-    
-    return total_applied
-
 @app.route('/rule/<int:rule_id>/toggle', methods=['POST'])
 @login_required
 def toggle_rule(rule_id):
-    """분류 규칙 활성/비활성 토글 (일관성 보장)"""
+    """분류 규칙 활성/비활성 토글 (영향 받는 거래만 재분류)"""
     try:
         rule = MappingRule.query.get_or_404(rule_id)
         was_active = rule.is_active
+        old_rule = CompiledRule(rule) if was_active else None
         rule.is_active = not rule.is_active
         
-        # 활성화 시: 모든 활성 규칙을 우선순위 순서로 다시 적용
-        if rule.is_active and not was_active:
-            db.session.commit()  # 규칙 상태 먼저 저장
-            total_applied = apply_all_active_rules()
-            db.session.commit()
-            flash(f'규칙 "{rule.name}"이 활성화되어 {total_applied}건의 거래가 재분류되었습니다.', 'success')
+        db.session.commit()  # 규칙 상태 먼저 저장
+        invalidate_rule_set()
         
-        # 비활성화 시: 해당 규칙 매칭 거래를 미분류로 되돌린 후, 나머지 활성 규칙들 다시 적용
-        elif not rule.is_active and was_active:
-            db.session.commit()  # 규칙 상태 먼저 저장
-            reverted_count = revert_rule_classifications(rule)
-            reapplied_count = apply_all_active_rules()
-            db.session.commit()
-            flash(f'규칙 "{rule.name}"이 비활성화되어 {reverted_count}건의 거래가 미분류 후 {reapplied_count}건이 재분류되었습니다.', 'success')
+        # 활성화 시: 이 규칙에 매칭되는 거래를 우선순위에 따라 재분류
+        # 비활성화 시: 이 규칙이 분류한 거래를 나머지 활성 규칙으로 재분류 (없으면 미분류)
+        reverted_count, reclassified_count = reclassify_rule_transactions(rule.id, old_rule)
+        db.session.commit()
         
+        if rule.is_active:
+            flash(f'규칙 "{rule.name}"이 활성화되어 {reclassified_count}건의 거래가 재분류되었습니다.', 'success')
         else:
-            db.session.commit()
-            status = "활성화" if rule.is_active else "비활성화"
-            flash(f'규칙 "{rule.name}"이 {status}되었습니다.', 'success')
+            flash(f'규칙 "{rule.name}"이 비활성화되어 {reverted_count}건의 거래가 미분류 후 {reclassified_count}건이 재분류되었습니다.', 'success')
         
     except Exception as e:
         db.session.rollback()
@@ -960,62 +896,25 @@ def toggle_rule(rule_id):
     return redirect(url_for('rules'))
 
 def apply_rule_to_transactions(rule, target_transactions=None):
-    """규칙을 거래에 적용하는 공통 함수"""
+    """규칙을 거래에 적용하는 공통 함수 - 적용 건수 반환"""
     if target_transactions is None:
-        # 모든 거래 대상
+        # 모든 거래 대상: 단순 조건은 DB에서 UPDATE 한 번으로 처리
+        applied_count = apply_rule_in_database(rule)
+        if applied_count is not None:
+            return applied_count
+        
+        # SQL로 변환할 수 없는 규칙은 Python으로 평가
         target_transactions = Transaction.query.all()
     
-    matched_transactions = []
+    compiled_rule = CompiledRule(rule)
+    matched_count = 0
     
     for transaction in target_transactions:
-        match = False
-        
-        # 조건 타입에 따른 매칭 로직
-        if rule.condition_type == 'contains':
-            if rule.condition_field == 'description':
-                match = rule.condition_value.lower() in (transaction.description or '').lower()
-            elif rule.condition_field == 'counterparty':
-                match = rule.condition_value.lower() in (transaction.counterparty or '').lower()
-        
-        elif rule.condition_type == 'equals':
-            if rule.condition_field == 'description':
-                match = (transaction.description or '').lower() == rule.condition_value.lower()
-            elif rule.condition_field == 'counterparty':
-                match = (transaction.counterparty or '').lower() == rule.condition_value.lower()
-        
-        elif rule.condition_type == 'amount_range':
-            try:
-                range_parts = rule.condition_value.split('-')
-                if len(range_parts) == 2:
-                    min_amount = float(range_parts[0])
-                    max_amount = float(range_parts[1])
-                    transaction_amount = abs(transaction.amount)
-                    match = min_amount <= transaction_amount <= max_amount
-            except:
-                match = False
-        
-        elif rule.condition_type == 'regex':
-            try:
-                import re
-                if rule.condition_field == 'description':
-                    match = bool(re.search(rule.condition_value, transaction.description or '', re.IGNORECASE))
-                elif rule.condition_field == 'counterparty':
-                    match = bool(re.search(rule.condition_value, transaction.counterparty or '', re.IGNORECASE))
-            except:
-                match = False
-        
-        if match:
-            # 규칙 적용
-            if rule.target_category_id:
-                transaction.category_id = rule.target_category_id
-            if rule.target_department_id:
-                transaction.department_id = rule.target_department_id
-            if rule.target_vendor_id:
-                transaction.vendor_id = rule.target_vendor_id
-            transaction.classification_status = 'classified'
-            matched_transactions.append(transaction)
-    
-    return matched_transactions
+        if compiled_rule.matches(transaction):
+            compiled_rule.apply_to(transaction)
+            matched_count += 1
+    
+    return matched_count
 
 @app.route('/rule/<int:rule_id>/apply')
 @login_required
@@ -1029,13 +928,32 @@ def apply_rule(rule_id):
         return redirect(url_for('rules'))
     
     # 모든 거래에 규칙 적용
-    matched_transactions = apply_rule_to_transactions(rule)
+    matched_count = apply_rule_to_transactions(rule)
     
     db.session.commit()
     
-    flash(f'{len(matched_transactions)}건의 거래가 분류되었습니다.', 'success')
+    flash(f'{matched_count}건의 거래가 분류되었습니다.', 'success')
     return redirect(url_for('rules'))
 
+@app.route('/rules/apply-all', methods=['POST'])
+@login_required
+def apply_all_rules():
+    """전체 활성 규칙 일괄 적용 (벡터 배치 분류)"""
+    if not current_user.is_admin():
+        return jsonify({'success': False, 'error': '관리자만 규칙을 적용할 수 있습니다.'})
+    
+    try:
+        applied_count = reapply_all_rules()
+        db.session.commit()
+        return jsonify({
+            'success': True,
+            'applied_count': applied_count,
+            'message': f'규칙 적용이 완료되었습니다. {applied_count}건의 거래가 분류되었습니다.'
+        })
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)})
+
 @app.route('/rule/<int:rule_id>/test')
 @login_required
 def test_rule(rule_id):
@@ -1046,47 +964,11 @@ def test_rule(rule_id):
         # 모든 거래 조회 (최근 100건으로 제한)
         transactions = Transaction.query.order_by(Transaction.transaction_date.desc()).limit(100).all()
         
+        compiled_rule = CompiledRule(rule)
         matched_transactions = []
         
         for transaction in transactions:
-            match = False
-            
-            # 조건 타입에 따른 매칭 로직
-            if rule.condition_type == 'contains':
-                if rule.condition_field == 'description':
-                    match = rule.condition_value.lower() in (transaction.description or '').lower()
-                elif rule.condition_field == 'counterparty':
-                    match = rule.condition_value.lower() in (transaction.counterparty or '').lower()
-            
-            elif rule.condition_type == 'equals':
-                if rule.condition_field == 'description':
-                    match = (transaction.description or '').lower() == rule.condition_value.lower()
-                elif rule.condition_field == 'counterparty':
-                    match = (transaction.counterparty or '').lower() == rule.condition_value.lower()
-            
-            elif rule.condition_type == 'amount_range':
-                try:
-                    # 금액 범위 조건 (예: "1000-5000")
-                    range_parts = rule.condition_value.split('-')
-                    if len(range_parts) == 2:
-                        min_amount = float(range_parts[0])
-                        max_amount = float(range_parts[1])
-                        transaction_amount = abs(transaction.amount)
-                        match = min_amount <= transaction_amount <= max_amount
-                except:
-                    match = False
-            
-            elif rule.condition_type == 'regex':
-                try:
-                    import re
-                    if rule.condition_field == 'description':
-                        match = bool(re.search(rule.condition_value, transaction.description or '', re.IGNORECASE))
-                    elif rule.condition_field == 'counterparty':
-                        match = bool(re.search(rule.condition_value, transaction.counterparty or '', re.IGNORECASE))
-                except:
-                    match = False
-            
-            if match:
+            if compiled_rule.matches(transaction):
                 matched_transactions.append({
                     'date': transaction.transaction_date.strftime('%Y-%m-%d') if transaction.transaction_date else '',
                     'description': transaction.description or '',
@@ -1122,57 +1004,17 @@ def reports():
     end_date = date.today()
     start_date = end_date.replace(year=end_date.year - 1)
     
-    # 월별 현금흐름 (수입과 지출 분리)
-    monthly_income_raw = db.session.query(
-        extract('year', Transaction.transaction_date).label('year'),
-        extract('month', Transaction.transaction_date).label('month'),
-        func.sum(Transaction.amount).label('total')
-    ).filter(
-        Transaction.transaction_date >= start_date,
-        Transaction.amount > 0
-    ).group_by(
-        extract('year', Transaction.transaction_date),
-        extract('month', Transaction.transaction_date)
-    ).order_by('year', 'month').all()
-    
-    monthly_expense_raw = db.session.query(
-        extract('year', Transaction.transaction_date).label('year'),
-        extract('month', Transaction.transaction_date).label('month'),
-        func.sum(Transaction.amount).label('total')
-    ).filter(
-        Transaction.transaction_date >= start_date,
-        Transaction.amount < 0
-    ).group_by(
-        extract('year', Transaction.transaction_date),
-        extract('month', Transaction.transaction_date)
-    ).order_by('year', 'month').all()
-    
-    # 수입과 지출 데이터를 합치기
-    income_dict = {(int(row.year), int(row.month)): float(row.total or 0) for row in monthly_income_raw}
-    expense_dict = {(int(row.year), int(row.month)): float(row.total or 0) for row in monthly_expense_raw}
-    
-    # 모든 월에 대해 수입과 지출 데이터 생성
-    all_months = set(income_dict.keys()) | set(expense_dict.keys())
-    monthly_flow = []
-    for year, month in sorted(all_months):
-        income = income_dict.get((year, month), 0)
-        expense = expense_dict.get((year, month), 0)
-        monthly_flow.append({
-            'year': year,
-            'month': month,
-            'income': income,
-            'expense': expense,
-            'total': income + expense
-        })
+    # 월별 현금흐름 (이체 제외)
+    monthly_flow = monthly_cashflow(start_date)
     
     # 부서별 지출 현황 (이번달)
     current_month = end_date.replace(day=1)
     dept_spending_raw = db.session.query(
         Department.name,
-        func.sum(Transaction.amount).label('total')
-    ).join(Transaction).filter(
-        Transaction.amount < 0,
-        Transaction.transaction_date >= current_month
+        func.sum(LedgerRollup.total).label('total')
+    ).join(LedgerRollup, LedgerRollup.department_id == Department.id).filter(
+        LedgerRollup.sign < 0,
+        rollup_period_filter(current_month)
     ).group_by(Department.name).all()
     
     # Convert to JSON serializable format
@@ -1181,11 +1023,11 @@ def reports():
     # 상위 거래처 (이번달)
     top_vendors = db.session.query(
         Vendor.name,
-        func.sum(Transaction.amount).label('total'),
-        func.count(Transaction.id).label('count')
-    ).join(Transaction).filter(
-        Transaction.amount < 0,
-        Transaction.transaction_date >= current_month
+        func.sum(LedgerRollup.total).label('total'),
+        func.sum(LedgerRollup.transaction_count).label('count')
+    ).join(LedgerRollup, LedgerRollup.vendor_id == Vendor.id).filter(
+        LedgerRollup.sign < 0,
+        rollup_period_filter(current_month)
     ).group_by(Vendor.name).order_by(desc('total')).limit(10).all()
     
     return render_template('reports.html',
@@ -1194,6 +1036,118 @@ def reports():
                          top_vendors=top_vendors)
 
 
+def build_report_data(report_type, start_date, end_date):
+    """보고서 유형별 데이터 계산"""
+    data = {}
+    
+    if report_type == 'pl':
+        # 손익계산서 - 수익과 비용 분석
+        revenue_data = db.session.query(
+            Category.name,
+            func.sum(LedgerRollup.total).label('total')
+        ).join(LedgerRollup, LedgerRollup.category_id == Category.id).filter(
+            rollup_period_filter(start_date, end_date),
+            LedgerRollup.sign > 0
+        ).group_by(Category.name).all()
+        
+        cost_data = db.session.query(
+            Category.name,
+            func.sum(LedgerRollup.total).label('total')
+        ).join(LedgerRollup, LedgerRollup.category_id == Category.id).filter(
+            rollup_period_filter(start_date, end_date),
+            LedgerRollup.sign < 0
+        ).group_by(Category.name).all()
+        
+        pl_data = []
+        for row in revenue_data:
+            pl_data.append({
+                'name': row.name,
+                'type': 'revenue',
+                'amount': float(row.total or 0)
+            })
+        
+        for row in cost_data:
+            pl_data.append({
+                'name': row.name,
+                'type': 'cost',
+                'amount': float(abs(row.total or 0))
+            })
+        
+        data['pl'] = pl_data
+        
+    elif report_type == 'cashflow':
+        # 현금흐름표 - 월별 현금흐름
+        data['cashflow'] = monthly_cashflow(start_date, end_date)
+        
+    elif report_type == 'budget':
+        # 예산 vs 실적 (부서별/분류별)
+        budget_data = budget_vs_actual(start_date, end_date)
+        data['budget'] = budget_data['departments']
+        data['budget_categories'] = budget_data['categories']
+        
+    elif report_type == 'department':
+        # 부서별 손익 분석
+        dept_analysis_raw = db.session.query(
+            Department.name,
+            func.sum(case((LedgerRollup.sign > 0, LedgerRollup.total), else_=0)).label('revenue'),
+            func.sum(case((LedgerRollup.sign < 0, LedgerRollup.total), else_=0)).label('cost'),
+            func.sum(LedgerRollup.transaction_count).label('count')
+        ).join(LedgerRollup, LedgerRollup.department_id == Department.id).filter(
+            rollup_period_filter(start_date, end_date)
+        ).group_by(Department.name).all()
+        
+        dept_data = []
+        for row in dept_analysis_raw:
+            revenue = float(row.revenue or 0)
+            cost = abs(float(row.cost or 0))
+            dept_data.append({
+                'name': row.name,
+                'revenue': revenue,
+                'cost': cost,
+                'profit': revenue - cost,
+                'count': row.count
+            })
+        
+        data['department'] = dept_data
+        
+    elif report_type == 'vendor':
+        # 거래처별 분석
+        vendor_analysis_raw = db.session.query(
+            Vendor.name,
+            func.sum(LedgerRollup.total).label('total'),
+            func.sum(LedgerRollup.transaction_count).label('count')
+        ).join(LedgerRollup, LedgerRollup.vendor_id == Vendor.id).filter(
+            rollup_period_filter(start_date, end_date)
+        ).group_by(Vendor.name).order_by(func.abs(func.sum(LedgerRollup.total)).desc()).limit(20).all()
+        
+        vendor_data = [{
+            'name': row.name,
+            'total': float(row.total or 0),
+            'count': row.count
+        } for row in vendor_analysis_raw]
+        
+        data['vendor'] = vendor_data
+        
+    elif report_type == 'category':
+        # 카테고리별 분석
+        category_analysis_raw = db.session.query(
+            Category.name,
+            func.sum(LedgerRollup.total).label('total'),
+            func.sum(LedgerRollup.transaction_count).label('count')
+        ).join(LedgerRollup, LedgerRollup.category_id == Category.id).filter(
+            rollup_period_filter(start_date, end_date)
+        ).group_by(Category.name).order_by(func.abs(func.sum(LedgerRollup.total)).desc()).all()
+        
+        category_data = [{
+            'name': row.name,
+            'total': float(row.total or 0),
+            'count': row.count
+        } for row in category_analysis_raw]
+        
+        data['category'] = category_data
+    
+    return data
+
 @app.route('/reports/data')
 @login_required
 def reports_data():
@@ -1223,168 +1177,15 @@ def reports_data():
             start_date = date(today.year, 1, 1)
             end_date = today
         
-        data = {}
-        
-        if report_type == 'pl':
-            # 손익계산서 - 수익과 비용 분석
-            revenue_data = db.session.query(
-                Category.name,
-                func.sum(Transaction.amount).label('total')
-            ).join(Transaction).filter(
-                Transaction.transaction_date >= start_date,
-                Transaction.transaction_date <= end_date,
-                Transaction.amount > 0
-            ).group_by(Category.name).all()
-            
-            cost_data = db.session.query(
-                Category.name,
-                func.sum(Transaction.amount).label('total')
-            ).join(Transaction).filter(
-                Transaction.transaction_date >= start_date,
-                Transaction.transaction_date <= end_date,
-                Transaction.amount < 0
-            ).group_by(Category.name).all()
-            
-            pl_data = []
-            for row in revenue_data:
-                pl_data.append({
-                    'name': row.name,
-                    'type': 'revenue',
-                    'amount': float(row.total or 0)
-                })
-            
-            for row in cost_data:
-                pl_data.append({
-                    'name': row.name,
-                    'type': 'cost',
-                    'amount': float(abs(row.total or 0))
-                })
-            
-            data['pl'] = pl_data
-            
-        elif report_type == 'cashflow':
-            # 현금흐름표 - 월별 현금흐름
-            monthly_flow_raw = db.session.query(
-                extract('year', Transaction.transaction_date).label('year'),
-                extract('month', Transaction.transaction_date).label('month'),
-                func.sum(case((Transaction.amount > 0, Transaction.amount), else_=0)).label('income'),
-                func.sum(case((Transaction.amount < 0, Transaction.amount), else_=0)).label('expense')
-            ).filter(
-                Transaction.transaction_date >= start_date,
-                Transaction.transaction_date <= end_date
-            ).group_by(
-                extract('year', Transaction.transaction_date),
-                extract('month', Transaction.transaction_date)
-            ).order_by('year', 'month').all()
-            
-            cashflow_data = []
-            for row in monthly_flow_raw:
-                income = float(row.income or 0)
-                expense = float(row.expense or 0)
-                cashflow_data.append({
-                    'period': f"{int(row.year)}-{str(int(row.month)).zfill(2)}",
-                    'income': income,
-                    'expense': abs(expense),
-                    'net': income + expense
-                })
-            
-            data['cashflow'] = cashflow_data
-            
-        elif report_type == 'budget':
-            # 예산 vs 실적
-            # 부서별 예산 데이터 (없으면 0으로 처리)
-            dept_budget_raw = db.session.query(Department.name).all()
-            
-            budget_data = []
-            for dept in dept_budget_raw:
-                # 실제 지출 계산
-                actual_spent = db.session.query(
-                    func.sum(Transaction.amount).label('total')
-                ).join(Department).filter(
-                    Department.name == dept.name,
-                    Transaction.transaction_date >= start_date,
-                    Transaction.transaction_date <= end_date,
-                    Transaction.amount < 0
-                ).scalar() or 0
-                
-                # 임시 예산 설정 (실제로는 Budget 테이블에서 가져와야 함)
-                budget_amount = 1000000  # 100만원 기본 예산
-                
-                budget_data.append({
-                    'department': dept.name,
-                    'budget': budget_amount,
-                    'actual': abs(float(actual_spent)),
-                    'variance': budget_amount - abs(float(actual_spent))
-                })
-            
-            data['budget'] = budget_data
-            
-        elif report_type == 'department':
-            # 부서별 손익 분석
-            dept_analysis_raw = db.session.query(
-                Department.name,
-                func.sum(case((Transaction.amount > 0, Transaction.amount), else_=0)).label('revenue'),
-                func.sum(case((Transaction.amount < 0, Transaction.amount), else_=0)).label('cost'),
-                func.count(Transaction.id).label('count')
-            ).join(Transaction).filter(
-                Transaction.transaction_date >= start_date,
-                Transaction.transaction_date <= end_date
-            ).group_by(Department.name).all()
-            
-            dept_data = []
-            for row in dept_analysis_raw:
-                revenue = float(row.revenue or 0)
-                cost = abs(float(row.cost or 0))
-                dept_data.append({
-                    'name': row.name,
-                    'revenue': revenue,
-                    'cost': cost,
-                    'profit': revenue - cost,
-                    'count': row.count
-                })
-            
-            data['department'] = dept_data
-            
-        elif report_type == 'vendor':
-            # 거래처별 분석
-            vendor_analysis_raw = db.session.query(
-                Vendor.name,
-                func.sum(Transaction.amount).label('total'),
-                func.count(Transaction.id).label('count')
-            ).join(Transaction).filter(
-                Transaction.transaction_date >= start_date,
-                Transaction.transaction_date <= end_date
-            ).group_by(Vendor.name).order_by(func.abs(func.sum(Transaction.amount)).desc()).limit(20).all()
-            
-            vendor_data = [{
-                'name': row.name,
-                'total': float(row.total or 0),
-                'count': row.count
-            } for row in vendor_analysis_raw]
-            
-            data['vendor'] = vendor_data
-            
-        elif report_type == 'category':
-            # 카테고리별 분석
-            category_analysis_raw = db.session.query(
-                Category.name,
-                func.sum(Transaction.amount).label('total'),
-                func.count(Transaction.id).label('count')
-            ).join(Transaction).filter(
-                Transaction.transaction_date >= start_date,
-                Transaction.transaction_date <= end_date
-            ).group_by(Category.name).order_by(func.abs(func.sum(Transaction.amount)).desc()).all()
-            
-            category_data = [{
-                'name': row.name,
-                'total': float(row.total or 0),
-                'count': row.count
-            } for row in category_analysis_raw]
-            
-            data['category'] = category_data
+        # 보고서 데이터 (파라미터별 캐시, 거래 변경 시 무효화)
+        data = get_or_compute(
+            'reports_data',
+            {'report_type': report_type, 'start_date': start_date, 'end_date': end_date},
+            lambda: build_report_data(report_type, start_date, end_date)
+        )
         
         print(f"Reports data response: {data}")
-        return jsonify({'success': True, 'data': data})
+        return cacheable_json({'success': True, 'data': data})
         
     except Exception as e:
         print(f"Reports data error: {str(e)}")
@@ -1392,6 +1193,31 @@ def reports_data():
         traceback.print_exc()
         return jsonify({'success': False, 'error': str(e)})
 
+@app.route('/reports/rollup/rebuild', methods=['POST'])
+@login_required
+def rebuild_report_rollup():
+    """보고서 집계(rollup)와 예산 사용액 재계산 (관리자 전용) - 기간 생략 시 전체"""
+    if not current_user.is_admin():
+        return jsonify({'success': False, 'error': '관리자만 집계를 재계산할 수 있습니다.'})
+    
+    try:
+        start_date_str = request.form.get('start_date')
+        end_date_str = request.form.get('end_date')
+        start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date() if start_date_str else None
+        end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date() if end_date_str else None
+        
+        rebuilt_count = rebuild_rollup(start_date, end_date)
+        return jsonify({
+            'success': True,
+            'rebuilt_count': rebuilt_count,
+            'message': f'보고서 집계를 재계산했습니다. ({rebuilt_count}개 집계 행)'
+        })
+    except ValueError as e:
+        return jsonify({'success': False, 'error': f'날짜 형식 오류: {str(e)}'})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)})
+
 @app.route('/settings')
 @login_required
 def settings():
@@ -1487,14 +1313,14 @@ def export_alerts():
         
         # Alert 데이터 조회
         query = Alert.query.filter(
-            Alert.created_at >= start_date,
-            Alert.created_at <= end_date
+            date_range_filter(Alert.created_at, start_date, end_date)
         )
         
         if alert_type != 'all':
             query = query.filter(Alert.alert_type == alert_type)
         
-        alerts = query.order_by(Alert.created_at.desc()).all()
+        # 내보내기 중 일정 건수씩 가져옴
+        alerts = query.order_by(Alert.created_at.desc()).yield_per(EXPORT_FETCH_SIZE)
         
         if export_format == 'csv':
             return export_alerts_csv(alerts, start_date, end_date)
@@ -1558,61 +1384,30 @@ def export_alerts_csv(alerts, start_date, end_date):
 
 def export_alerts_excel(alerts, start_date, end_date):
     """Excel 형식으로 알림 데이터 내보내기"""
-    import io
-    from flask import make_response
-    import openpyxl
-    from openpyxl.styles import Font, PatternFill, Alignment
-    
-    # 워크북 생성
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "알림 내역"
+    from openpyxl.styles import PatternFill
     
-    # 헤더 스타일
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill("solid", fgColor="4472C4")
-    header_alignment = Alignment(horizontal="center")
-    
-    # 헤더 작성
     headers = ['생성일시', '제목', '메시지', '알림 유형', '심각도', '읽음 상태', '관련 테이블', '관련 ID']
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = header_alignment
-    
-    # 데이터 작성
-    for row, alert in enumerate(alerts, 2):
-        ws.cell(row=row, column=1, value=alert.created_at.strftime('%Y-%m-%d %H:%M:%S'))
-        ws.cell(row=row, column=2, value=alert.title)
-        ws.cell(row=row, column=3, value=alert.message)
-        ws.cell(row=row, column=4, value=get_alert_type_name(alert.alert_type))
-        ws.cell(row=row, column=5, value=get_severity_name(alert.severity))
-        ws.cell(row=row, column=6, value='읽음' if alert.is_read else '미읽음')
-        ws.cell(row=row, column=7, value=alert.related_table or '')
-        ws.cell(row=row, column=8, value=alert.related_id or '')
-        
-        # 미읽음 알림 강조
-        if not alert.is_read:
-            for col in range(1, 9):
-                ws.cell(row=row, column=col).fill = PatternFill("solid", fgColor="FFF2CC")
-    
-    # 컬럼 너비 조정
     column_widths = [20, 25, 40, 15, 10, 10, 15, 10]
-    for col, width in enumerate(column_widths, 1):
-        ws.column_dimensions[openpyxl.utils.get_column_letter(col)].width = width
+    unread_fill = PatternFill("solid", fgColor="FFF2CC")
+    
+    rows = ([
+        alert.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+        alert.title,
+        alert.message,
+        get_alert_type_name(alert.alert_type),
+        get_severity_name(alert.severity),
+        '읽음' if alert.is_read else '미읽음',
+        alert.related_table or '',
+        alert.related_id or ''
+    ] for alert in alerts)
+    
+    # 미읽음 알림 강조
+    workbook = XlsxExport()
+    workbook.add_sheet("알림 내역", headers, rows, column_widths=column_widths,
+                       row_fill=lambda row: unread_fill if row[5] == '미읽음' else None)
     
-    # 파일 생성
-    output = io.BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    response = make_response(output.getvalue())
-    response.headers['Content-Type'] = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
     filename = f'alerts_history_{start_date.strftime("%Y%m%d")}_{end_date.strftime("%Y%m%d")}.xlsx'
-    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
-    
-    return response
+    return workbook.send(filename)
 
 
 def get_alert_type_name(alert_type):
@@ -2383,52 +2178,8 @@ def export_reports():
             end_date = date.today()
             start_date = end_date.replace(year=end_date.year - 1)
         
-        # 데이터 조회
-        from models import Transaction, Department, Vendor
-        from sqlalchemy import func, extract
-        
         # 월별 현금흐름 데이터
-        monthly_income_raw = db.session.query(
-            extract('year', Transaction.transaction_date).label('year'),
-            extract('month', Transaction.transaction_date).label('month'),
-            func.sum(Transaction.amount).label('total')
-        ).filter(
-            Transaction.transaction_date >= start_date,
-            Transaction.transaction_date <= end_date,
-            Transaction.amount > 0
-        ).group_by(
-            extract('year', Transaction.transaction_date),
-            extract('month', Transaction.transaction_date)
-        ).order_by('year', 'month').all()
-        
-        monthly_expense_raw = db.session.query(
-            extract('year', Transaction.transaction_date).label('year'),
-            extract('month', Transaction.transaction_date).label('month'),
-            func.sum(Transaction.amount).label('total')
-        ).filter(
-            Transaction.transaction_date >= start_date,
-            Transaction.transaction_date <= end_date,
-            Transaction.amount < 0
-        ).group_by(
-            extract('year', Transaction.transaction_date),
-            extract('month', Transaction.transaction_date)
-        ).order_by('year', 'month').all()
-        
-        # 데이터 정리
-        income_dict = {(int(row.year), int(row.month)): float(row.total or 0) for row in monthly_income_raw}
-        expense_dict = {(int(row.year), int(row.month)): float(row.total or 0) for row in monthly_expense_raw}
-        
-        all_months = set(income_dict.keys()) | set(expense_dict.keys())
-        monthly_data = []
-        for year, month in sorted(all_months):
-            income = income_dict.get((year, month), 0)
-            expense = expense_dict.get((year, month), 0)
-            monthly_data.append({
-                'period': f'{year}-{month:02d}',
-                'income': income,
-                'expense': abs(expense),
-                'net': income + expense
-            })
+        monthly_data = monthly_cashflow(start_date, end_date)
         
         # 파일 생성
         if export_format == 'csv':
@@ -2445,471 +2196,77 @@ def export_reports():
         flash(f'내보내기 중 오류가 발생했습니다: {str(e)}', 'error')
         return redirect(url_for('reports'))
 
+@app.route('/reports/export/jobs', methods=['POST'])
+@login_required
+def create_report_export_job():
+    """리포트 내보내기 작업 등록 (같은 리포트는 진행 중이거나 만료 전인 작업 재사용)"""
+    try:
+        report_type = request.form.get('type', 'cashflow')
+        export_format = request.form.get('format', 'pdf')
+        if export_format not in REPORT_EXPORT_FORMATS:
+            return jsonify({'success': False, 'error': '지원하지 않는 형식입니다.'}), 400
+
+        start_date_str = request.form.get('start_date')
+        end_date_str = request.form.get('end_date')
+        if start_date_str and end_date_str:
+            start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
+            end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
+        else:
+            end_date = date.today()
+            start_date = end_date.replace(year=end_date.year - 1)
+    except ValueError:
+        return jsonify({'success': False, 'error': '날짜 형식이 올바르지 않습니다.'}), 400
+
+    try:
+        job, reused = request_report_export(report_type, start_date, end_date, export_format,
+                                            user_id=current_user.id)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': f'내보내기 작업 등록 중 오류가 발생했습니다: {str(e)}'}), 500
+
+    return jsonify({
+        'success': True,
+        'job_id': job.id,
+        'status': job.status,
+        'deduplicated': reused,
+        'status_url': url_for('job_status', job_id=job.id),
+        'download_url': url_for('download_report_export', job_id=job.id)
+    }), 200 if reused else 202
+
+@app.route('/reports/export/jobs/<int:job_id>/download')
+@login_required
+def download_report_export(job_id):
+    """완료된 리포트 내보내기 작업의 파일 다운로드"""
+    job = Job.query.get(job_id)
+    if not job or job.job_type != REPORT_EXPORT_JOB:
+        return jsonify({'success': False, 'error': '작업을 찾을 수 없습니다.'}), 404
+
+    if job.status in ('queued', 'running'):
+        return jsonify({'success': False, 'error': '파일을 만드는 중입니다.', 'status': job.status}), 409
+
+    if not artifact_available(job):
+        return jsonify({'success': False, 'error': '파일이 만료되었거나 생성되지 않았습니다.', 'status': job.status}), 410
+
+    return send_file(job.artifact_path, as_attachment=True, download_name=job.artifact_name)
+
 def export_csv(data, report_type, start_date, end_date):
     """CSV 내보내기"""
-    import csv
-    import io
-    from flask import make_response
-    
-    output = io.StringIO()
-    
-    # BOM 추가로 Excel에서 한글 깨짐 방지
-    output.write('\ufeff')
-    
-    writer = csv.writer(output)
-    
-    # 리포트 헤더 정보
-    writer.writerow(['Vlan24 - 재무 리포트'])
-    writer.writerow([f'기간: {start_date} ~ {end_date}'])
-    writer.writerow([f'생성일: {datetime.now().strftime("%Y-%m-%d %H:%M")}'])
-    writer.writerow([''])
-    
-    # 요약 정보
-    total_income = sum(row['income'] for row in data)
-    total_expense = sum(row['expense'] for row in data)
-    net_flow = total_income - total_expense
-    
-    writer.writerow(['== 요약 정보 =='])
-    writer.writerow(['총 수입', f'{total_income:,.0f}원'])
-    writer.writerow(['총 지출', f'{total_expense:,.0f}원'])
-    writer.writerow(['순현금흐름', f'{net_flow:,.0f}원'])
-    writer.writerow(['평균 월 수입', f'{total_income/len(data) if data else 0:,.0f}원'])
-    writer.writerow(['평균 월 지출', f'{total_expense/len(data) if data else 0:,.0f}원'])
-    writer.writerow([''])
-    
-    # 월별 상세 데이터
-    writer.writerow(['== 월별 상세 =='])
-    writer.writerow(['기간', '수입(원)', '지출(원)', '순현금흐름(원)', '수입 비중(%)', '지출 비중(%)'])
-    
-    for row in data:
-        income_ratio = (row['income'] / total_income * 100) if total_income > 0 else 0
-        expense_ratio = (row['expense'] / total_expense * 100) if total_expense > 0 else 0
-        
-        writer.writerow([
-            row['period'],
-            f"{row['income']:,.0f}",
-            f"{row['expense']:,.0f}",
-            f"{row['net']:,.0f}",
-            f"{income_ratio:.1f}%",
-            f"{expense_ratio:.1f}%"
-        ])
-    
-    # 응답 생성 - UTF-8 바이트로 변환
-    csv_content = output.getvalue().encode('utf-8-sig')
-    response = make_response(csv_content)
+    response = make_response(report_csv(data, start_date, end_date))
     response.headers['Content-Type'] = 'text/csv; charset=utf-8'
-    response.headers['Content-Disposition'] = f'attachment; filename="financial_report_{start_date}_{end_date}.csv"'
+    response.headers['Content-Disposition'] = f'attachment; filename="{report_filename(start_date, end_date, "csv")}"'
     
     return response
 
 def export_excel(data, report_type, start_date, end_date):
     """Excel 내보내기"""
-    import pandas as pd
-    import io
-    from flask import make_response
-    from datetime import datetime
-    
-    # 요약 정보 계산
-    total_income = sum(row['income'] for row in data)
-    total_expense = sum(row['expense'] for row in data)
-    net_flow = total_income - total_expense
-    avg_income = total_income / len(data) if data else 0
-    avg_expense = total_expense / len(data) if data else 0
-    
-    # 요약 데이터프레임
-    summary_data = {
-        '항목': ['총 수입', '총 지출', '순현금흐름', '평균 월 수입', '평균 월 지출', '분석 기간'],
-        '금액': [
-            f'{total_income:,.0f}원',
-            f'{total_expense:,.0f}원', 
-            f'{net_flow:,.0f}원',
-            f'{avg_income:,.0f}원',
-            f'{avg_expense:,.0f}원',
-            f'{len(data)}개월'
-        ]
-    }
-    summary_df = pd.DataFrame(summary_data)
-    
-    # 상세 데이터프레임
-    detail_data = []
-    for row in data:
-        income_ratio = (row['income'] / total_income * 100) if total_income > 0 else 0
-        expense_ratio = (row['expense'] / total_expense * 100) if total_expense > 0 else 0
-        
-        detail_data.append({
-            '기간': row['period'],
-            '수입(원)': row['income'],
-            '지출(원)': row['expense'],
-            '순현금흐름(원)': row['net'],
-            '수입 비중(%)': round(income_ratio, 1),
-            '지출 비중(%)': round(expense_ratio, 1),
-            '수익률(%)': round((row['net'] / row['expense'] * 100) if row['expense'] > 0 else 0, 1)
-        })
-    
-    detail_df = pd.DataFrame(detail_data)
-    
-    # 메타데이터
-    metadata = {
-        '정보': ['리포트명', '생성일시', '기간', '데이터 건수'],
-        '값': [
-            'Vlan24 재무리포트',
-            datetime.now().strftime('%Y년 %m월 %d일 %H:%M'),
-            f'{start_date} ~ {end_date}',
-            f'{len(data)}개월'
-        ]
-    }
-    metadata_df = pd.DataFrame(metadata)
-    
-    # Excel 파일 생성
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        # 메타데이터 시트
-        metadata_df.to_excel(writer, sheet_name='리포트정보', index=False)
-        
-        # 요약 시트
-        summary_df.to_excel(writer, sheet_name='재무요약', index=False)
-        
-        # 상세 데이터 시트
-        detail_df.to_excel(writer, sheet_name='월별상세', index=False)
-        
-        # 워크시트 서식 설정
-        workbook = writer.book
-        
-        # 요약 시트 서식
-        summary_ws = writer.sheets['재무요약']
-        summary_ws.column_dimensions['A'].width = 15
-        summary_ws.column_dimensions['B'].width = 20
-        
-        # 상세 시트 서식
-        detail_ws = writer.sheets['월별상세']
-        for col in ['A', 'B', 'C', 'D', 'E', 'F', 'G']:
-            detail_ws.column_dimensions[col].width = 15
-    
-    output.seek(0)
-    
-    # 응답 생성
-    response = make_response(output.getvalue())
-    response.headers['Content-Type'] = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    response.headers['Content-Disposition'] = f'attachment; filename="financial_report_{start_date}_{end_date}.xlsx"'
-    
-    return response
+    workbook = report_workbook(data, start_date, end_date, XlsxExport())
+    return workbook.send(report_filename(start_date, end_date, 'excel'))
 
 def export_pdf(data, report_type, start_date, end_date):
     """PDF 내보내기 - 현재 화면 기반"""
-    import weasyprint
-    from flask import make_response
-    from datetime import datetime
-    
-    # 요약 정보 계산
-    total_income = sum(row['income'] for row in data)
-    total_expense = sum(row['expense'] for row in data)
-    net_flow = total_income - total_expense
-    avg_income = total_income / len(data) if data else 0
-    avg_expense = total_expense / len(data) if data else 0
-    
-    # HTML 템플릿 - 영어 버전
-    html_content = f"""
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <title>Financial Report</title>
-        <style>
-            @page {{
-                size: A4;
-                margin: 1.5cm;
-            }}
-            * {{
-                margin: 0;
-                padding: 0;
-                box-sizing: border-box;
-            }}
-            body {{
-                font-family: 'Segoe UI', Arial, sans-serif;
-                line-height: 1.6;
-                color: #333;
-                background-color: white;
-            }}
-            .container {{
-                max-width: 100%;
-                padding: 20px;
-            }}
-            .header {{
-                text-align: center;
-                margin-bottom: 30px;
-                padding-bottom: 20px;
-                border-bottom: 3px solid #0d6efd;
-            }}
-            .header h1 {{
-                color: #0d6efd;
-                font-size: 28px;
-                margin-bottom: 10px;
-                font-weight: bold;
-            }}
-            .header p {{
-                color: #666;
-                font-size: 16px;
-                margin: 5px 0;
-            }}
-            .section {{
-                margin: 25px 0;
-                page-break-inside: avoid;
-            }}
-            .section-title {{
-                background: linear-gradient(135deg, #198754, #20c997);
-                color: white;
-                padding: 12px 20px;
-                font-size: 18px;
-                font-weight: bold;
-                margin-bottom: 15px;
-                border-radius: 8px;
-            }}
-            .summary-grid {{
-                display: grid;
-                grid-template-columns: 1fr 1fr;
-                gap: 20px;
-                margin-bottom: 30px;
-            }}
-            .summary-card {{
-                background: #f8f9fa;
-                border: 1px solid #e9ecef;
-                border-radius: 10px;
-                padding: 20px;
-                text-align: center;
-            }}
-            .summary-card h3 {{
-                color: #0d6efd;
-                font-size: 14px;
-                margin-bottom: 10px;
-                text-transform: uppercase;
-            }}
-            .summary-card .value {{
-                font-size: 24px;
-                font-weight: bold;
-                color: #333;
-            }}
-            .summary-card.positive .value {{
-                color: #198754;
-            }}
-            .summary-card.negative .value {{
-                color: #dc3545;
-            }}
-            .table-wrapper {{
-                background: white;
-                border-radius: 10px;
-                overflow: hidden;
-                box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-            }}
-            .data-table {{
-                width: 100%;
-                border-collapse: collapse;
-                font-size: 13px;
-            }}
-            .data-table thead th {{
-                background: #198754;
-                color: white;
-                padding: 15px 10px;
-                text-align: center;
-                font-weight: bold;
-                border: none;
-            }}
-            .data-table tbody td {{
-                padding: 12px 10px;
-                text-align: center;
-                border-bottom: 1px solid #e9ecef;
-            }}
-            .data-table tbody tr:nth-child(even) {{
-                background-color: #f8f9fa;
-            }}
-            .data-table tbody tr:hover {{
-                background-color: #e3f2fd;
-            }}
-            .positive-amount {{
-                color: #198754;
-                font-weight: bold;
-            }}
-            .negative-amount {{
-                color: #dc3545;
-                font-weight: bold;
-            }}
-            .monthly-summary {{
-                background: linear-gradient(135deg, #f8f9fa, #e9ecef);
-                padding: 20px;
-                border-radius: 10px;
-                margin-bottom: 20px;
-                border-left: 5px solid #0d6efd;
-            }}
-            .monthly-summary h4 {{
-                color: #0d6efd;
-                margin-bottom: 15px;
-                font-size: 16px;
-            }}
-            .summary-row {{
-                display: flex;
-                justify-content: space-between;
-                margin: 8px 0;
-                padding: 5px 0;
-                border-bottom: 1px dotted #ccc;
-            }}
-            .summary-row:last-child {{
-                border-bottom: none;
-                font-weight: bold;
-                font-size: 16px;
-                color: #0d6efd;
-            }}
-            .footer {{
-                margin-top: 30px;
-                padding-top: 20px;
-                border-top: 2px solid #e9ecef;
-                text-align: center;
-                color: #666;
-                font-size: 12px;
-            }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <div class="header">
-                <h1>Korean Open Banking Accounting System</h1>
-                <p><strong>Financial Report</strong></p>
-                <p>Period: {start_date} ~ {end_date}</p>
-                <p>Generated: {datetime.now().strftime('%Y-%m-%d %H:%M')}</p>
-            </div>
-            
-            <div class="section">
-                <div class="section-title">💰 Financial Summary</div>
-                <div class="summary-grid">
-                    <div class="summary-card">
-                        <h3>Total Income</h3>
-                        <div class="value positive">{total_income:,.0f} KRW</div>
-                    </div>
-                    <div class="summary-card">
-                        <h3>Total Expenses</h3>
-                        <div class="value negative">{total_expense:,.0f} KRW</div>
-                    </div>
-                    <div class="summary-card {'positive' if net_flow >= 0 else 'negative'}">
-                        <h3>Net Cash Flow</h3>
-                        <div class="value">{net_flow:,.0f} KRW</div>
-                    </div>
-                    <div class="summary-card">
-                        <h3>Analysis Period</h3>
-                        <div class="value">{len(data)} months</div>
-                    </div>
-                </div>
-                
-                <div class="monthly-summary">
-                    <h4>📊 Monthly Average Analysis</h4>
-                    <div class="summary-row">
-                        <span>Average Monthly Income:</span>
-                        <span class="positive-amount">{avg_income:,.0f} KRW</span>
-                    </div>
-                    <div class="summary-row">
-                        <span>Average Monthly Expenses:</span>
-                        <span class="negative-amount">{avg_expense:,.0f} KRW</span>
-                    </div>
-                    <div class="summary-row">
-                        <span>Average Monthly Net Profit:</span>
-                        <span class="{'positive-amount' if (avg_income - avg_expense) >= 0 else 'negative-amount'}">{avg_income - avg_expense:,.0f} KRW</span>
-                    </div>
-                </div>
-            </div>
-            
-            <div class="section">
-                <div class="section-title">📈 Monthly Details</div>
-                <div class="table-wrapper">
-                    <table class="data-table">
-                        <thead>
-                            <tr>
-                                <th>Period</th>
-                                <th>Income</th>
-                                <th>Expenses</th>
-                                <th>Net Cash Flow</th>
-                                <th>Income Ratio</th>
-                                <th>Expense Ratio</th>
-                            </tr>
-                        </thead>
-                        <tbody>
-    """
-    
-    # 상세 데이터 추가
-    for row in data:
-        income_ratio = (row['income'] / total_income * 100) if total_income > 0 else 0
-        expense_ratio = (row['expense'] / total_expense * 100) if total_expense > 0 else 0
-        net_class = 'positive-amount' if row['net'] >= 0 else 'negative-amount'
-        
-        html_content += f"""
-                            <tr>
-                                <td><strong>{row['period']}</strong></td>
-                                <td class="positive-amount">{row['income']:,.0f} KRW</td>
-                                <td class="negative-amount">{row['expense']:,.0f} KRW</td>
-                                <td class="{net_class}">{row['net']:,.0f} KRW</td>
-                                <td>{income_ratio:.1f}%</td>
-                                <td>{expense_ratio:.1f}%</td>
-                            </tr>
-        """
-    
-    # 분석 의견 생성
-    if net_flow > 0:
-        analysis_status = "Good"
-        analysis_icon = "✅"
-        analysis_text = f"During the analysis period, there was a net cash inflow of <strong>{net_flow:,.0f} KRW</strong>."
-    else:
-        analysis_status = "Caution"
-        analysis_icon = "⚠️"
-        analysis_text = f"During the analysis period, there was a net cash outflow of <strong>{abs(net_flow):,.0f} KRW</strong>."
-    
-    # 추가 분석
-    best_month = max(data, key=lambda x: x['net'])['period'] if data else 'N/A'
-    worst_month = min(data, key=lambda x: x['net'])['period'] if data else 'N/A'
-    
-    html_content += f"""
-                        </tbody>
-                    </table>
-                </div>
-            </div>
-            
-            <div class="section">
-                <div class="section-title">📋 Financial Analysis Report</div>
-                <div class="monthly-summary">
-                    <h4>{analysis_icon} Overall Financial Status: {analysis_status}</h4>
-                    <div style="margin: 15px 0; font-size: 14px; line-height: 1.8;">
-                        {analysis_text}
-                    </div>
-                    
-                    <div style="margin-top: 20px;">
-                        <h4>🔍 Key Metrics Analysis</h4>
-                        <div class="summary-row">
-                            <span>Best Performance Month:</span>
-                            <span class="positive-amount">{best_month}</span>
-                        </div>
-                        <div class="summary-row">
-                            <span>Worst Performance Month:</span>
-                            <span class="negative-amount">{worst_month}</span>
-                        </div>
-                        <div class="summary-row">
-                            <span>Expense to Income Ratio:</span>
-                            <span>{(total_expense/total_income*100) if total_income > 0 else 0:.1f}%</span>
-                        </div>
-                    </div>
-                </div>
-            </div>
-            
-            <div class="footer">
-                <p>This report was automatically generated by the Korean Open Banking Accounting System.</p>
-                <p>Regular review is recommended for data accuracy.</p>
-            </div>
-        </div>
-    </body>
-    </html>
-    """
-    
-    # WeasyPrint로 PDF 생성
-    pdf_bytes = weasyprint.HTML(string=html_content).write_pdf()
-    
-    # 응답 생성
-    response = make_response(pdf_bytes)
+    response = make_response(report_pdf(data, start_date, end_date))
     response.headers['Content-Type'] = 'application/pdf'
-    response.headers['Content-Disposition'] = f'attachment; filename="financial_report_{start_date}_{end_date}.pdf"'
+    response.headers['Content-Disposition'] = f'attachment; filename="{report_filename(start_date, end_date, "pdf")}"'
     
     return response
 
@@ -2936,6 +2293,10 @@ def budgets():
         is_active=True
     ).order_by(CategoryBudget.created_at.desc()).all()
     
+    # 예산 사용 현황 (증분 갱신되는 예산 사용액 기준)
+    department_usage_map = department_usage(current_year)
+    category_usage_map = category_usage(current_year, current_month)
+    
     # 활성 탭 정보
     active_tab = request.args.get('tab', 'department')
     
@@ -2947,7 +2308,8 @@ def budgets():
             'budget_amount': float(budget.budget_amount) if budget.budget_amount else 0,
             'category_name': budget.category.name if budget.category else '',
             'year': budget.year,
-            'month': budget.month
+            'month': budget.month,
+            'spent': category_usage_map.get(budget.id, {}).get('spent', 0)
         })
     
     # Department 객체를 딕셔너리로 변환 (JSON 직렬화를 위해)
@@ -2957,7 +2319,8 @@ def budgets():
             'id': dept.id,
             'name': dept.name,
             'code': dept.code,
-            'budget': float(dept.budget) if dept.budget else 0
+            'budget': float(dept.budget) if dept.budget else 0,
+            'spent': department_usage_map[dept.id]['spent']
         })
     
     return render_template('budgets.html', 
@@ -2968,6 +2331,8 @@ def budgets():
                          category_budgets_dict=category_budgets_dict,
                          current_year=current_year,
                          current_month=current_month,
+                         department_usage=department_usage_map,
+                         category_usage=category_usage_map,
                          active_tab=active_tab)
 
 @app.route('/budgets/update', methods=['POST'])
@@ -2989,6 +2354,9 @@ def update_budgets():
                     department.budget = budget_amount
         
         db.session.commit()
+        # 예산 보고서 캐시 무효화
+        invalidate_ledger_cache()
+        
         flash('예산이 성공적으로 업데이트되었습니다.', 'success')
         
     except Exception as e:
@@ -3035,6 +2403,8 @@ def add_category_budget():
         
         db.session.add(category_budget)
         db.session.commit()
+        # 예산 보고서 캐시 무효화
+        invalidate_ledger_cache()
         
         flash('분류별 예산이 추가되었습니다.', 'success')
         
@@ -3060,6 +2430,8 @@ def edit_category_budget(budget_id):
         category_budget.description = request.form.get('description', '').strip()
         
         db.session.commit()
+        # 예산 보고서 캐시 무효화
+        invalidate_ledger_cache()
         
         flash('분류별 예산이 수정되었습니다.', 'success')
         
@@ -3080,6 +2452,8 @@ def delete_category_budget(budget_id):
         category_budget.is_active = False  # Soft delete
         
         db.session.commit()
+        # 예산 보고서 캐시 무효화
+        invalidate_ledger_cache()
         
         flash('분류별 예산이 삭제되었습니다.', 'success')
         
@@ -3158,6 +2532,8 @@ def add_department():
         department = Department(name=name, code=code, budget=budget)
         db.session.add(department)
         db.session.commit()
+        # 부서 이름/예산이 들어간 대시보드/보고서 캐시 무효화
+        invalidate_ledger_cache()
         
         flash(f'부서 "{name}"이 추가되었습니다.', 'success')
         
@@ -3207,6 +2583,8 @@ def edit_department(dept_id):
         department.budget = budget
         # 부서 코드는 수정하지 않고 기존 값 유지
         db.session.commit()
+        # 부서 이름/예산이 들어간 대시보드/보고서 캐시 무효화
+        invalidate_ledger_cache()
         
         flash(f'부서 "{name}"이 수정되었습니다.', 'success')
         
@@ -3232,6 +2610,8 @@ def delete_department(dept_id):
         
         db.session.delete(department)
         db.session.commit()
+        # 부서 이름/예산이 들어간 대시보드/보고서 캐시 무효화
+        invalidate_ledger_cache()
         
         users_count = len(users_in_department)
         if users_count > 0:
@@ -3296,6 +2676,8 @@ def add_category():
         category = Category(code=code, name=name, description=description)
         db.session.add(category)
         db.session.commit()
+        # 분류 이름이 들어간 대시보드/보고서 캐시 무효화
+        invalidate_ledger_cache()
         
         flash(f'분류 "{name}" (코드: {code})이 추가되었습니다.', 'success')
         
@@ -3334,6 +2716,8 @@ def edit_category(category_id):
         category.name = name
         category.description = description
         db.session.commit()
+        # 분류 이름이 들어간 대시보드/보고서 캐시 무효화
+        invalidate_ledger_cache()
         
         flash(f'분류 "{name}"이 수정되었습니다.', 'success')
         
@@ -3367,6 +2751,8 @@ def delete_category(category_id):
         
         db.session.delete(category)
         db.session.commit()
+        # 분류 이름이 들어간 대시보드/보고서 캐시 무효화
+        invalidate_ledger_cache()
         
         flash(f'분류 "{category.name}"이 삭제되었습니다.', 'success')
         
@@ -3421,6 +2807,8 @@ def add_vendor():
         
         db.session.add(vendor)
         db.session.commit()
+        # 업체 이름이 들어간 대시보드/보고서 캐시 무효화
+        invalidate_ledger_cache()
         
         flash(f'공급업체 "{name}"이 추가되었습니다.', 'success')
         
@@ -3462,6 +2850,8 @@ def edit_vendor(vendor_id):
         vendor.contact_info = contact_info if contact_info else None
         vendor.category_id = int(category_id) if category_id else None
         db.session.commit()
+        # 업체 이름이 들어간 대시보드/보고서 캐시 무효화
+        invalidate_ledger_cache()
         
         flash(f'업체 "{name}"이 수정되었습니다.', 'success')
         
@@ -3496,6 +2886,8 @@ def delete_vendor(vendor_id):
         vendor_name = vendor.name
         db.session.delete(vendor)
         db.session.commit()
+        # 업체 이름이 들어간 대시보드/보고서 캐시 무효화
+        invalidate_ledger_cache()
         
         flash(f'업체 "{vendor_name}"이 삭제되었습니다.', 'success')
         
@@ -3739,45 +3131,20 @@ def delete_user(user_id):
 @app.route('/api/dashboard/chart-data')
 @login_required
 def api_dashboard_chart_data():
-    """대시보드 차트 데이터 API"""
-    # 최근 7일 일별 현금흐름
-    end_date = date.today()
-    start_date = end_date - timedelta(days=6)
-    
-    # 간단하게 모든 거래를 가져와서 처리
-    transactions = Transaction.query.filter(
-        func.date(Transaction.transaction_date) >= start_date
-    ).all()
-    
-    # 날짜별로 데이터 집계
-    daily_data = {}
-    current_date = start_date
-    while current_date <= end_date:
-        daily_data[current_date] = {'income': 0, 'expense': 0}
-        current_date += timedelta(days=1)
-    
-    for transaction in transactions:
-        trans_date = transaction.transaction_date.date()
-        if trans_date in daily_data:
-            if transaction.amount > 0:
-                daily_data[trans_date]['income'] += float(transaction.amount)
-            else:
-                daily_data[trans_date]['expense'] += float(abs(transaction.amount))
+    """대시보드 차트 데이터 API - days(7/30/90), breakdown(account/department) 선택"""
+    days = request.args.get('days', 7, type=int)
+    breakdown = request.args.get('breakdown') or None
     
-    dates = []
-    income_data = []
-    expense_data = []
+    if days not in CHART_WINDOWS:
+        return jsonify({'success': False, 'error': f'days는 {", ".join(map(str, CHART_WINDOWS))} 중 하나여야 합니다.'}), 400
+    if breakdown and breakdown not in CHART_BREAKDOWNS:
+        return jsonify({'success': False, 'error': 'breakdown은 account 또는 department만 가능합니다.'}), 400
     
-    for date_key in sorted(daily_data.keys()):
-        dates.append(date_key.strftime('%m/%d'))
-        income_data.append(daily_data[date_key]['income'])
-        expense_data.append(daily_data[date_key]['expense'])
-    
-    return jsonify({
-        'dates': dates,
-        'income': income_data,
-        'expense': expense_data
-    })
+    return cacheable_json(get_or_compute(
+        'dashboard_chart_data',
+        {'days': days, 'breakdown': breakdown, 'today': date.today()},
+        lambda: daily_cashflow(days, breakdown)
+    ))
 
 # 초기 데이터 생성용 헬퍼 함수들
 
@@ -3933,6 +3300,7 @@ def init_sample_data():
     
     db.session.add_all(sample_rules)
     db.session.commit()
+    invalidate_rule_set()
 
 # 데이터 관리 라우트
 @app.route('/data-management')
@@ -3987,7 +3355,6 @@ def export_transactions_period():
     try:
         import io
         from datetime import datetime
-        from models import Transaction, Account, Category, Department, Vendor
         
         # 폼 데이터 받기
         start_date_str = request.form.get('start_date')
@@ -4006,87 +3373,35 @@ def export_transactions_period():
             flash('시작일은 종료일보다 이전이어야 합니다.', 'error')
             return redirect(url_for('data_management'))
         
-        # 기간내 거래 조회
-        transactions = Transaction.query.filter(
-            Transaction.transaction_date >= start_date,
-            Transaction.transaction_date <= end_date
-        ).order_by(Transaction.transaction_date.desc()).all()
-        
-        if not transactions:
+        # 기간내 거래 확인
+        if not has_period_transactions(start_date, end_date):
             flash(f'{start_date_str}부터 {end_date_str}까지 거래 내역이 없습니다.', 'warning')
             return redirect(url_for('data_management'))
         
-        # 데이터 준비
-        transaction_data = []
-        for transaction in transactions:
-            # 관련 데이터 조회
-            account = Account.query.get(transaction.account_id) if transaction.account_id else None
-            category = Category.query.get(transaction.category_id) if transaction.category_id else None
-            department = Department.query.get(transaction.department_id) if transaction.department_id else None
-            vendor = Vendor.query.get(transaction.vendor_id) if transaction.vendor_id else None
-            
-            transaction_data.append({
-                '거래일': transaction.transaction_date.strftime('%Y-%m-%d'),
-                '거래시간': transaction.transaction_date.strftime('%H:%M:%S') if transaction.transaction_date else '',
-                '계정': account.name if account else '',
-                '거래유형': transaction.transaction_type or '',
-                '금액': transaction.amount,
-                '잔액': transaction.balance if transaction.balance else '',
-                '내용': transaction.description or '',
-                '상대계좌': transaction.counterpart_account or '',
-                '상대은행': transaction.counterpart_bank or '',
-                '분류': category.name if category else '',
-                '부서': department.name if department else '',
-                '업체': vendor.name if vendor else '',
-                '분류상태': {
-                    'pending': '미분류',
-                    'classified': '분류완료',
-                    'manual': '수동분류'
-                }.get(transaction.classification_status, transaction.classification_status or ''),
-                '메모': transaction.memo or ''
-            })
-        
         # 파일명 생성
         filename = f"transactions_{start_date_str}_{end_date_str}"
         
         if export_format == 'excel':
-            # Excel 파일 생성
-            import pandas as pd
-            df = pd.DataFrame(transaction_data)
-            
-            output = io.BytesIO()
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                df.to_excel(writer, sheet_name='거래내역', index=False)
-            
-            output.seek(0)
-            
-            return send_file(
-                output,
-                as_attachment=True,
-                download_name=f"{filename}.xlsx",
-                mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            )
+            # Excel 파일 생성 (write_only 워크북에 커서 행을 바로 기록)
+            workbook = XlsxExport()
+            workbook.add_sheet('거래내역', TRANSACTION_EXPORT_COLUMNS, iter_transaction_rows(start_date, end_date))
+            return workbook.send(f"{filename}.xlsx")
+        
+        elif export_format in COLUMNAR_EXPORT_FORMATS:
+            # Parquet / Arrow IPC (타입 있는 컬럼, 레코드 배치 단위 기록)
+            try:
+                return send_transactions_columnar(start_date, end_date, export_format, filename)
+            except ImportError:
+                flash('Parquet/Arrow 형식으로 내려받으려면 pyarrow 패키지가 필요합니다.', 'error')
+                return redirect(url_for('data_management'))
         
         else:
-            # CSV 파일 생성 (UTF-8 BOM으로 한글 지원)
-            import csv
-            output = io.StringIO()
-            
-            if transaction_data:
-                fieldnames = transaction_data[0].keys()
-                writer = csv.DictWriter(output, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(transaction_data)
-            
-            # UTF-8 BOM 추가 (Excel에서 한글 깨짐 방지)
-            csv_content = '\ufeff' + output.getvalue()
-            
+            # CSV 스트리밍 (조인 쿼리 결과를 가져오는 대로 전송)
             return Response(
-                csv_content,
-                mimetype='text/csv; charset=utf-8',
+                stream_with_context(stream_transactions_csv(start_date, end_date)),
+                content_type='text/csv; charset=utf-8',
                 headers={
-                    'Content-Disposition': f'attachment; filename="{filename}.csv"',
-                    'Content-Type': 'text/csv; charset=utf-8'
+                    'Content-Disposition': f'attachment; filename="{filename}.csv"'
                 }
             )
             
@@ -4130,166 +3445,50 @@ def upload_transactions():
         filename = secure_filename(file.filename)
         file_ext = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
         
-        if file_ext not in ['csv', 'xls', 'xlsx']:
+        if file_ext not in UPLOAD_FILE_EXTENSIONS:
             return jsonify({'success': False, 'error': '지원하지 않는 파일 형식입니다.'})
         
-        # 파일 읽기
-        if file_ext == 'csv':
-            df = pd.read_csv(file.stream, encoding='utf-8')
-        else:
-            df = pd.read_excel(file.stream)
-        
-        # 필수 컬럼 확인 (항상 5개 필수)
-        required_columns = ['계정', '거래일자', '거래유형', '금액', '거래처']
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        
-        if missing_columns:
-            return jsonify({'success': False, 'error': f'필수 컬럼이 누락되었습니다: {", ".join(missing_columns)}'})
-        
-        # 데이터 처리 및 저장
-        processed_count = 0
-        for _, row in df.iterrows():
-            try:
-                transaction = Transaction()
-                
-                # 계정 처리 - 파일에 계정 컬럼이 있으면 그것을 우선 사용
-                if '계정' in df.columns and pd.notna(row['계정']):
-                    account_name = str(row['계정']).strip()
-                    # 계정명으로 계정 찾기
-                    file_account = Account.query.filter_by(name=account_name).first()
-                    if not file_account:
-                        print(f"Warning: Account '{account_name}' not found, using default account")
-                        transaction.account_id = account_id  # 기본 계정 사용
-                    else:
-                        transaction.account_id = file_account.id
-                else:
-                    # 파일에 계정 컬럼이 없으면 폼에서 선택한 계정 사용
-                    transaction.account_id = account_id
-                
-                transaction.transaction_id = f'UPLOAD-{datetime.now().strftime("%Y%m%d%H%M%S")}-{processed_count:04d}'
-                
-                # 거래일자 처리
-                transaction_date = pd.to_datetime(row['거래일자'])
-                if '거래시간' in df.columns and pd.notna(row['거래시간']):
-                    # 거래시간이 있으면 결합
-                    time_str = str(row['거래시간'])
-                    if ':' in time_str:
-                        date_str = transaction_date.strftime('%Y-%m-%d')
-                        transaction_datetime = pd.to_datetime(f"{date_str} {time_str}")
-                        transaction.transaction_date = transaction_datetime
-                    else:
-                        transaction.transaction_date = transaction_date
-                else:
-                    transaction.transaction_date = transaction_date
-                
-                # 금액 처리
-                amount = float(str(row['금액']).replace(',', '').replace('원', ''))
-                transaction.amount = amount
-                
-                # 거래유형 처리
-                transaction_type = str(row['거래유형']).strip()
-                
-                if transaction_type in ['입금', '수입', 'deposit']:
-                    transaction.transaction_type = 'credit'
-                elif transaction_type in ['출금', '지출', 'withdrawal']:
-                    transaction.transaction_type = 'debit'
-                    transaction.amount = -abs(amount)  # 지출은 음수로
-                elif transaction_type in ['이체', 'transfer']:
-                    transaction.transaction_type = 'transfer'
-                    transaction.amount = -abs(amount)  # 이체도 음수 (보내는 쪽)
-                    
-                    # 이체의 경우 대상계정 필수 체크
-                    if not ('대상계정' in df.columns and pd.notna(row['대상계정']) and str(row['대상계정']).strip()):
-                        print(f"Warning: Transfer transaction missing target account in row {processed_count}")
-                        continue  # 이체인데 대상계정이 없으면 건너뛰기
-                else:
-                    transaction.transaction_type = 'debit'  # 기본값
-                
-                # 거래처 정보
-                transaction.counterparty = str(row['거래처']).strip()
-                
-                # 메모 (선택사항)
-                if '메모' in df.columns and pd.notna(row['메모']):
-                    transaction.description = str(row['메모']).strip()
-                else:
-                    transaction.description = transaction.counterparty
-                
-                # 대상 계정 처리 (이체의 경우)
-                if transaction.transaction_type == 'transfer':
-                    if '대상계정' in df.columns and pd.notna(row['대상계정']):
-                        target_account_name = str(row['대상계정']).strip()
-                        transaction.description += f' (받는 계정: {target_account_name})'
-                    elif default_target_account:
-                        target_account = Account.query.get(default_target_account)
-                        if target_account:
-                            transaction.description += f' (받는 계정: {target_account.name})'
-                
-                # 분류 정보 처리 (이체가 아닌 경우만)
-                if transaction.transaction_type != 'transfer':
-                    # 카테고리
-                    if '분류' in df.columns and pd.notna(row['분류']):
-                        category_name = str(row['분류']).strip()
-                        category = Category.query.filter_by(name=category_name).first()
-                        if category:
-                            transaction.category_id = category.id
-                    elif default_category_id:
-                        transaction.category_id = default_category_id
-                    
-                    # 부서
-                    if '부서' in df.columns and pd.notna(row['부서']):
-                        dept_name = str(row['부서']).strip()
-                        department = Department.query.filter_by(name=dept_name).first()
-                        if department:
-                            transaction.department_id = department.id
-                    elif default_department_id:
-                        transaction.department_id = default_department_id
-                    
-                    # 업체
-                    if '업체' in df.columns and pd.notna(row['업체']):
-                        vendor_name = str(row['업체']).strip()
-                        vendor = Vendor.query.filter_by(name=vendor_name).first()
-                        if vendor:
-                            transaction.vendor_id = vendor.id
-                    elif default_vendor_id:
-                        transaction.vendor_id = default_vendor_id
-                    
-                    # 분류 상태 설정
-                    if transaction.category_id or transaction.department_id or transaction.vendor_id:
-                        transaction.classification_status = 'classified'
-                    else:
-                        transaction.classification_status = 'pending'
-                else:
-                    # 이체는 자동으로 분류됨
-                    transaction.classification_status = 'classified'
-                
-                db.session.add(transaction)
-                processed_count += 1
-                
-            except Exception as e:
-                print(f"Row processing error: {e}")
-                continue
-        
-        db.session.commit()
-        
-        # 자동 분류 규칙 적용 (새로 추가된 거래들에 대해)
-        new_transactions = Transaction.query.filter(
-            Transaction.transaction_id.like(f'UPLOAD-{datetime.now().strftime("%Y%m%d%H%M%S")}%')
-        ).all()
-        
-        for transaction in new_transactions:
-            apply_classification_rules(transaction)
-        
-        db.session.commit()
+        # 임시 파일로 저장 후 백그라운드 작업으로 처리 (청크 단위 일괄 저장 및 자동 분류)
+        fd, temp_path = tempfile.mkstemp(suffix=f'.{file_ext}')
+        with os.fdopen(fd, 'wb') as temp_file:
+            file.save(temp_file)
+        
+        job = submit_job(
+            'transaction_import', run_import_job, temp_path, file_ext, account_id,
+            user_id=current_user.id,
+            default_target_account=default_target_account,
+            default_category_id=default_category_id,
+            default_department_id=default_department_id,
+            default_vendor_id=default_vendor_id
+        )
         
         return jsonify({
-            'success': True, 
-            'processed_count': processed_count,
-            'message': f'{processed_count}건의 거래가 성공적으로 업로드되었습니다.'
+            'success': True,
+            'job_id': job.id,
+            'status_url': url_for('job_status', job_id=job.id),
+            'message': '업로드 작업이 등록되었습니다.'
         })
         
     except Exception as e:
         return jsonify({'success': False, 'error': f'파일 처리 중 오류가 발생했습니다: {str(e)}'})
 
+@app.route('/jobs/<int:job_id>')
+@login_required
+def job_status(job_id):
+    """백그라운드 작업 진행 상황 조회"""
+    job = Job.query.get(job_id)
+    if not job:
+        return jsonify({'success': False, 'error': '작업을 찾을 수 없습니다.'}), 404
+    
+    # 리포트 내보내기 작업은 같은 리포트를 요청한 다른 사용자와 공유됨
+    if job.job_type != REPORT_EXPORT_JOB and job.user_id != current_user.id and not current_user.is_admin():
+        return jsonify({'success': False, 'error': '권한이 없습니다.'}), 403
+
+    result = {'success': True, 'job': job.to_dict()}
+    if job.job_type == REPORT_EXPORT_JOB and job.status == 'completed':
+        result['download_url'] = url_for('download_report_export', job_id=job.id)
+    return jsonify(result)
+
 def check_and_create_anomaly_alerts(transaction):
     """거래에 대해 이상거래 알림 확인 및 생성"""
     try:
@@ -4437,6 +3636,13 @@ def add_transaction():
         # 이상거래 알림 확인 및 생성
         check_and_create_anomaly_alerts(transaction)
         
+        # 예산 사용률 알림 확인 (실패해도 거래 추가는 유지)
+        try:
+            check_budget_alerts()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error checking budget alerts: {str(e)}")
+        
         flash('거래가 성공적으로 추가되었습니다.', 'success')
         
     except Exception as e:
@@ -4526,7 +3732,7 @@ def check_upload(upload_id):
         
         # 같은 날짜, 같은 계정의 거래 건수 조회
         same_date_count = Transaction.query.filter(
-            func.date(Transaction.created_at) == func.date(transaction.created_at),
+            date_range_filter(Transaction.created_at, transaction.created_at, transaction.created_at),
             Transaction.account_id == transaction.account_id
         ).count()
         
@@ -4559,16 +3765,18 @@ def delete_upload(upload_id):
         account_id = target_transaction.account_id
         
         # 해당 날짜에 생성된 모든 거래 삭제
+        # (이미 비활성인 분할 원본은 fingerprint를 유지해 다시 업로드되지 않게 제외)
         transactions_to_delete = Transaction.query.filter(
-            func.date(Transaction.created_at) == upload_date,
-            Transaction.account_id == account_id
+            date_range_filter(Transaction.created_at, upload_date, upload_date),
+            Transaction.account_id == account_id,
+            Transaction.is_active == True
         ).all()
         
         deleted_count = len(transactions_to_delete)
         
-        # 거래들을 소프트 삭제 (is_active = False)
+        # 거래들을 소프트 삭제 (is_active = False, 재업로드할 수 있도록 fingerprint 제거)
         for transaction in transactions_to_delete:
-            transaction.is_active = False
+            transaction.soft_delete()
         
         db.session.commit()
         
@@ -0,0 +1,585 @@
+"""
+거래 자동 분류 규칙 엔진
+
+활성 MappingRule을 한 번만 조회하여 비교에 필요한 값(소문자 변환, 정규식 컴파일,
+금액 범위 파싱)을 미리 준비해 두고, 거래 분류는 메모리 안에서만 수행한다.
+규칙이 추가/수정/토글될 때 invalidate_rule_set()으로 캐시를 무효화하며, 공유 세대 번호를
+올려 다른 워커도 다음 get_rule_set()에서 규칙을 다시 로드한다.
+
+contains/equals 규칙은 필드별 Aho-Corasick 오토마톤으로 묶어 거래 텍스트를
+한 번만 스캔하여 매칭되는 모든 규칙을 찾는다.
+
+각 거래는 자신을 분류한 규칙(Transaction.classified_rule_id)을 기록하므로,
+규칙 변경 시 해당 규칙이 분류한 거래와 새 조건에 매칭되는 후보만 재분류한다.
+
+단순 조건(contains/equals/amount_range, SQLite의 regex, PostgreSQL과 의미가 같은 regex)은 SQL WHERE 절로
+변환하여 규칙 일괄 적용을 DB 안에서 UPDATE 한 번으로 처리한다.
+
+조건 판정 로직은 이 모듈 한 곳에만 있으며, 업로드/일괄 재적용처럼 많은 거래를
+한 번에 처리할 때는 DataFrame 기반 벡터 연산(classify_frame)을 사용한다.
+"""
+
+import re
+import threading
+from collections import deque
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import String, Text, func, or_, update
+
+from app import db
+from cache import RULES_NAMESPACE, bump_generation, cache_generation
+from ledger_rollup import rollup_adjusted
+from models import MappingRule, Transaction
+
+RECLASSIFY_CHUNK_SIZE = 1000
+
+# 배치 분류에 사용하는 DataFrame 컬럼
+BATCH_COLUMNS = ('description', 'counterparty', 'amount')
+
+
+def parse_amount_range(value):
+    """
+    금액 범위 조건 파싱 - (최소, 최대) 또는 None 반환
+    
+    화면에서 입력하는 "10000,50000" 형식과 예전 "10000-50000" 형식을 모두 허용
+    """
+    value = (value or '').replace(' ', '')
+    for separator in (',', '-'):
+        parts = value.split(separator)
+        if len(parts) == 2:
+            try:
+                return float(parts[0]), float(parts[1])
+            except ValueError:
+                return None
+    return None
+
+
+class CompiledRule:
+    """비교용 값이 미리 계산된 분류 규칙"""
+
+    __slots__ = ('id', 'order', 'name', 'priority', 'condition_type', 'condition_field',
+                 'raw_value', 'value', 'pattern', 'min_amount', 'max_amount',
+                 'target_category_id', 'target_department_id', 'target_vendor_id')
+
+    def __init__(self, rule):
+        self.id = rule.id
+        self.order = 0
+        self.name = rule.name
+        self.priority = rule.priority or 0
+        self.condition_type = rule.condition_type
+        self.condition_field = rule.condition_field
+        self.raw_value = rule.condition_value or ''
+        self.value = self.raw_value.lower()
+        self.pattern = None
+        self.min_amount = None
+        self.max_amount = None
+        self.target_category_id = rule.target_category_id
+        self.target_department_id = rule.target_department_id
+        self.target_vendor_id = rule.target_vendor_id
+
+        if self.condition_type == 'regex':
+            try:
+                self.pattern = re.compile(self.raw_value, re.IGNORECASE)
+            except re.error:
+                self.pattern = None
+        elif self.condition_type == 'amount_range':
+            amount_range = parse_amount_range(self.raw_value)
+            if amount_range is not None:
+                self.min_amount, self.max_amount = amount_range
+
+    def field_text(self, transaction):
+        """비교 대상 필드 값을 문자열로 반환"""
+        field_value = getattr(transaction, self.condition_field, '')
+        if field_value is None:
+            return ''
+        return str(field_value)
+
+    def matches(self, transaction):
+        """거래가 규칙 조건에 맞는지 확인 (대소문자 무시)"""
+        if self.condition_type == 'contains':
+            return self.value in self.field_text(transaction).lower()
+        elif self.condition_type == 'equals':
+            return self.field_text(transaction).lower() == self.value
+        elif self.condition_type == 'regex':
+            if self.pattern is None:
+                return False
+            return bool(self.pattern.search(self.field_text(transaction)))
+        elif self.condition_type == 'amount_range':
+            amount = getattr(transaction, 'amount', None)
+            if self.min_amount is None or amount is None:
+                return False
+            return self.min_amount <= abs(float(amount)) <= self.max_amount
+        return False
+
+    def match_frame(self, frame, lowered):
+        """DataFrame 전체에 대한 매칭 여부를 불리언 배열로 반환"""
+        if self.condition_type == 'amount_range':
+            if self.min_amount is None or 'amount' not in frame:
+                return np.zeros(len(frame), dtype=bool)
+            amounts = np.abs(pd.to_numeric(frame['amount'], errors='coerce').to_numpy(dtype=float))
+            return (amounts >= self.min_amount) & (amounts <= self.max_amount)
+
+        if self.condition_field not in frame:
+            texts = pd.Series([''] * len(frame), index=frame.index)
+        else:
+            texts = frame[self.condition_field].fillna('').astype(str)
+
+        if self.condition_type == 'contains':
+            if self.condition_field not in lowered:
+                lowered[self.condition_field] = texts.str.lower()
+            return lowered[self.condition_field].str.contains(self.value, regex=False).to_numpy(dtype=bool)
+        elif self.condition_type == 'equals':
+            if self.condition_field not in lowered:
+                lowered[self.condition_field] = texts.str.lower()
+            return (lowered[self.condition_field] == self.value).to_numpy(dtype=bool)
+        elif self.condition_type == 'regex' and self.pattern is not None:
+            return texts.str.contains(self.pattern, regex=True).to_numpy(dtype=bool)
+        return np.zeros(len(frame), dtype=bool)
+
+    def update_values(self):
+        """규칙 적용 시 변경할 거래 컬럼 값 (일괄 UPDATE용)"""
+        values = {'classification_status': 'classified', 'classified_rule_id': self.id}
+        if self.target_category_id:
+            values['category_id'] = self.target_category_id
+        if self.target_department_id:
+            values['department_id'] = self.target_department_id
+        if self.target_vendor_id:
+            values['vendor_id'] = self.target_vendor_id
+        return values
+
+    def apply_to(self, transaction):
+        """거래에 규칙의 분류 결과 반영"""
+        if self.target_category_id:
+            transaction.category_id = self.target_category_id
+        if self.target_department_id:
+            transaction.department_id = self.target_department_id
+        if self.target_vendor_id:
+            transaction.vendor_id = self.target_vendor_id
+        transaction.classification_status = 'classified'
+        transaction.classified_rule_id = self.id
+
+
+class AhoCorasick:
+    """다중 문자열 패턴 매칭 오토마톤"""
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        self._built = False
+
+    def add(self, pattern, value):
+        """패턴과 매칭 시 반환할 값 등록"""
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append((len(pattern), value))
+        self._built = False
+
+    def build(self):
+        """실패 링크 계산 (BFS)"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._output[next_state].extend(self._output[self._fail[next_state]])
+        self._built = True
+
+    def iter_matches(self, text):
+        """텍스트를 한 번 스캔하며 (시작 위치, 끝 위치, 값) 반환"""
+        if not self._built:
+            self.build()
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for length, value in output[state]:
+                yield index + 1 - length, index + 1, value
+
+
+class CompiledRuleSet:
+    """우선순위 순으로 정렬된 컴파일된 규칙 모음"""
+
+    def __init__(self, rules):
+        self.rules = [CompiledRule(rule) for rule in rules]
+        self.rules.sort(key=lambda rule: rule.priority, reverse=True)
+        for order, rule in enumerate(self.rules):
+            rule.order = order
+        self._rules_by_id = {rule.id: rule for rule in self.rules}
+
+        # contains/equals 규칙은 필드별 오토마톤으로, 나머지는 개별 평가
+        self._automata = {}
+        self._residual_rules = []
+        for rule in self.rules:
+            if rule.condition_type in ('contains', 'equals') and rule.value:
+                automaton = self._automata.get(rule.condition_field)
+                if automaton is None:
+                    automaton = self._automata[rule.condition_field] = AhoCorasick()
+                automaton.add(rule.value, rule)
+            else:
+                self._residual_rules.append(rule)
+        for automaton in self._automata.values():
+            automaton.build()
+
+    @classmethod
+    def load(cls):
+        """DB에서 활성 규칙을 한 번 조회하여 규칙 모음 생성"""
+        rules = MappingRule.query.filter_by(is_active=True).order_by(MappingRule.priority.desc()).all()
+        return cls(rules)
+
+    def __len__(self):
+        return len(self.rules)
+
+    def get(self, rule_id):
+        """규칙 ID로 컴파일된 규칙 조회 (비활성 규칙이면 None)"""
+        return self._rules_by_id.get(rule_id)
+
+    def matching_rules(self, transaction):
+        """거래에 매칭되는 모든 규칙을 우선순위 순서로 반환"""
+        matched = {}
+        for field, automaton in self._automata.items():
+            field_value = getattr(transaction, field, '')
+            text = '' if field_value is None else str(field_value).lower()
+            for start, end, rule in automaton.iter_matches(text):
+                if rule.condition_type == 'equals' and (start != 0 or end != len(text)):
+                    continue
+                matched[rule.order] = rule
+        for rule in self._residual_rules:
+            if rule.matches(transaction):
+                matched[rule.order] = rule
+        return [matched[order] for order in sorted(matched)]
+
+    def match(self, transaction):
+        """거래에 처음으로 매칭되는 (가장 우선순위가 높은) 규칙 반환"""
+        rules = self.matching_rules(transaction)
+        return rules[0] if rules else None
+
+    def classify_frame(self, frame):
+        """
+        DataFrame(description/counterparty/amount 컬럼)을 벡터 연산으로 한 번에 분류
+        
+        행마다 가장 우선순위가 높은 매칭 규칙의 ID를 담은 배열 반환 (미매칭은 0)
+        """
+        rule_ids = np.zeros(len(frame), dtype=np.int64)
+        unassigned = np.ones(len(frame), dtype=bool)
+        lowered = {}
+        for rule in self.rules:
+            if not unassigned.any():
+                break
+            hit = rule.match_frame(frame, lowered) & unassigned
+            rule_ids[hit] = rule.id
+            unassigned &= ~hit
+        return rule_ids
+
+    def classify_columns(self, descriptions=None, counterparties=None, amounts=None):
+        """컬럼 배열을 받아 classify_frame으로 분류"""
+        columns = {}
+        for name, values in zip(BATCH_COLUMNS, (descriptions, counterparties, amounts)):
+            if values is not None:
+                columns[name] = pd.Series(values)
+        return self.classify_frame(pd.DataFrame(columns))
+
+    def apply(self, transaction):
+        """거래에 분류 규칙 적용 - 적용 여부 반환"""
+        rule = self.match(transaction)
+        if rule is None:
+            return False
+        rule.apply_to(transaction)
+        return True
+
+
+# 정규식을 SQL로 실행할 수 있는 DB (SQLite는 SQLAlchemy가 Python re로 REGEXP 제공)
+REGEX_PUSHDOWN_DIALECTS = ('postgresql', 'sqlite')
+
+# PostgreSQL 정규식(ARE)에서도 Python re와 같은 의미인 문자 이스케이프 (대괄호 밖에서만)
+POSIX_SAFE_ESCAPES = frozenset('dDsS')
+
+# {m}, {m,}, {m,n} 반복 (PostgreSQL은 반복 횟수 255까지 허용)
+REPEAT_PATTERN = re.compile(r'\{(\d+)(?:,(\d*))?\}')
+POSIX_MAX_REPEAT = 255
+
+
+def is_pushdown_safe(rule):
+    """
+    regex 규칙을 PostgreSQL ~*로 실행해도 Python re와 결과가 같은지 확인
+
+    두 문법이 같은 의미인 부분(리터럴, . ^ $ * + ? |, 괄호, 대괄호 문자 집합, 반복 횟수,
+    \\d \\s 와 기호 이스케이프)만 허용한다. \\b(PostgreSQL에서는 백스페이스), \\w, (?...) 그룹,
+    역참조, [[:class:]] 같은 구문이 있으면 False를 반환해 Python 평가로 처리하게 한다.
+    """
+    pattern = rule.raw_value
+    index = 0
+    in_class = False
+    while index < len(pattern):
+        char = pattern[index]
+        if char == '\\':
+            escaped = pattern[index + 1:index + 2]
+            if not escaped:
+                return False
+            if escaped.isalnum() and (in_class or escaped not in POSIX_SAFE_ESCAPES):
+                return False
+            index += 2
+            continue
+
+        if in_class:
+            if char == '[' and pattern[index + 1:index + 2] in (':', '=', '.'):
+                return False
+            if char == ']':
+                in_class = False
+        elif char == '[':
+            in_class = True
+            index += 1
+            # 맨 앞의 ^와 ]는 두 문법 모두 집합의 일부로 취급
+            if pattern[index:index + 1] == '^':
+                index += 1
+            if pattern[index:index + 1] == ']':
+                index += 1
+            continue
+        elif char == '(' and pattern[index + 1:index + 2] == '?':
+            return False
+        elif char == '{':
+            repeat = REPEAT_PATTERN.match(pattern, index)
+            if repeat is None or int(repeat.group(1)) > POSIX_MAX_REPEAT \
+                    or (repeat.group(2) and int(repeat.group(2)) > POSIX_MAX_REPEAT):
+                return False
+            index = repeat.end()
+            continue
+        index += 1
+    return not in_class
+
+
+def compile_rule_predicate(rule, dialect_name=None):
+    """
+    규칙 조건을 Transaction 테이블에 대한 SQL 조건식으로 변환
+    
+    SQL로 표현할 수 없는 규칙(빈 값, 문자열이 아닌 필드, 지원하지 않는 DB의 regex,
+    PostgreSQL에서 의미가 달라지는 regex)은 None을 반환하며, 호출 측은 Python 평가로 대체해야 한다.
+    """
+    if not isinstance(rule, CompiledRule):
+        rule = CompiledRule(rule)
+    if dialect_name is None:
+        dialect_name = db.engine.dialect.name
+
+    if rule.condition_type == 'amount_range':
+        if rule.min_amount is None:
+            return None
+        return func.abs(Transaction.amount).between(rule.min_amount, rule.max_amount)
+
+    column = Transaction.__table__.columns.get(rule.condition_field)
+    if column is None or not isinstance(column.type, (String, Text)) or not rule.value:
+        return None
+    column = getattr(Transaction, rule.condition_field)
+
+    if rule.condition_type == 'contains':
+        return column.icontains(rule.value, autoescape=True)
+    elif rule.condition_type == 'equals':
+        return func.lower(column) == rule.value
+    elif rule.condition_type == 'regex':
+        if rule.pattern is None or dialect_name not in REGEX_PUSHDOWN_DIALECTS:
+            return None
+        if dialect_name == 'sqlite':
+            # SQLite REGEXP는 Python re.search로 평가되므로 인라인 플래그 사용
+            return column.regexp_match(f'(?i){rule.raw_value}')
+        if not is_pushdown_safe(rule):
+            return None
+        return column.regexp_match(rule.raw_value, flags='i')
+    return None
+
+
+def apply_rule_in_database(rule):
+    """
+    규칙을 UPDATE ... WHERE 한 번으로 전체 거래에 적용 - 적용 건수 반환
+    
+    SQL로 변환할 수 없는 규칙이면 None 반환
+    """
+    if not isinstance(rule, CompiledRule):
+        rule = CompiledRule(rule)
+    predicate = compile_rule_predicate(rule)
+    if predicate is None:
+        return None
+
+    with rollup_adjusted(predicate):
+        result = db.session.execute(
+            update(Transaction).where(predicate).values(**rule.update_values()),
+            execution_options={'synchronize_session': False}
+        )
+    return result.rowcount
+
+
+def reapply_all_rules(rule_set=None, chunk_size=RECLASSIFY_CHUNK_SIZE):
+    """
+    활성 규칙 전체를 벡터 배치로 재적용 - 분류가 바뀐 거래 건수 반환
+    
+    거래를 ID 순으로 나눠 읽어 classify_frame으로 분류하고, 규칙별 UPDATE로 반영한다.
+    수동분류 거래는 제외한다.
+    """
+    if rule_set is None:
+        rule_set = get_rule_set()
+    if not len(rule_set):
+        return 0
+
+    applied_count = 0
+    last_id = 0
+    while True:
+        rows = db.session.query(
+            Transaction.id,
+            Transaction.description,
+            Transaction.counterparty,
+            Transaction.amount,
+            Transaction.classified_rule_id
+        ).filter(
+            Transaction.id > last_id,
+            Transaction.classification_status != 'manual'
+        ).order_by(Transaction.id).limit(chunk_size).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        frame = pd.DataFrame(rows, columns=['id', *BATCH_COLUMNS, 'classified_rule_id'])
+        rule_ids = rule_set.classify_frame(frame)
+        current_ids = frame['classified_rule_id'].fillna(0).to_numpy(dtype=np.int64)
+        changed = (rule_ids != 0) & (rule_ids != current_ids)
+
+        changed_frame = pd.DataFrame({'id': frame['id'][changed], 'rule_id': rule_ids[changed]})
+        for rule_id, group in changed_frame.groupby('rule_id'):
+            rule = rule_set.get(int(rule_id))
+            ids_condition = Transaction.id.in_(group['id'].tolist())
+            with rollup_adjusted(ids_condition):
+                db.session.execute(
+                    update(Transaction).where(ids_condition).values(**rule.update_values()),
+                    execution_options={'synchronize_session': False}
+                )
+            applied_count += len(group)
+
+    return applied_count
+
+
+def reset_classification(transaction):
+    """자동 분류 결과를 지우고 미분류 상태로 되돌림"""
+    transaction.classification_status = 'pending'
+    transaction.category_id = None
+    transaction.department_id = None
+    transaction.vendor_id = None
+    transaction.classified_rule_id = None
+
+
+def reclassify_rule_transactions(rule_id, old_rule=None, rule_set=None):
+    """
+    규칙 변경(수정/활성화/비활성화) 시 영향 받는 거래만 재분류
+    
+    대상: 해당 규칙이 분류한 거래 + 변경 전 조건(old_rule)에 매칭되는 분류 이력 없는
+    기존 거래 + 현재 조건에 매칭되는 후보 거래. 수동분류 거래는 건드리지 않는다.
+    반환값: (미분류로 되돌린 건수, 재분류된 건수)
+    """
+    if rule_set is None:
+        rule_set = get_rule_set()
+    new_rule = rule_set.get(rule_id)
+
+    affected_ids = {
+        transaction_id for (transaction_id,) in
+        db.session.query(Transaction.id).filter(Transaction.classified_rule_id == rule_id)
+    }
+
+    if old_rule is not None or new_rule is not None:
+        # 비교에 필요한 컬럼만 스트리밍하여 후보 검색
+        candidate_rows = db.session.query(
+            Transaction.id,
+            Transaction.description,
+            Transaction.counterparty,
+            Transaction.amount,
+            Transaction.classification_status,
+            Transaction.classified_rule_id
+        ).filter(
+            Transaction.classification_status != 'manual'
+        )
+
+        # 조건을 SQL로 변환할 수 있으면 DB에서 후보를 먼저 걸러냄
+        predicates = []
+        for rule in (new_rule, old_rule):
+            if rule is None:
+                continue
+            predicate = compile_rule_predicate(rule)
+            if predicate is None:
+                predicates = None
+                break
+            predicates.append(predicate)
+        if predicates:
+            candidate_rows = candidate_rows.filter(or_(*predicates))
+        candidate_rows = candidate_rows.yield_per(RECLASSIFY_CHUNK_SIZE)
+
+        for row in candidate_rows:
+            if row.id in affected_ids:
+                continue
+            if new_rule is not None and new_rule.matches(row):
+                affected_ids.add(row.id)
+            elif (old_rule is not None and row.classified_rule_id is None
+                  and row.classification_status == 'classified' and old_rule.matches(row)):
+                affected_ids.add(row.id)
+
+    reverted_count = 0
+    reclassified_count = 0
+    affected_ids = sorted(affected_ids)
+    for start in range(0, len(affected_ids), RECLASSIFY_CHUNK_SIZE):
+        chunk_ids = affected_ids[start:start + RECLASSIFY_CHUNK_SIZE]
+        for transaction in Transaction.query.filter(Transaction.id.in_(chunk_ids)):
+            if transaction.classification_status == 'manual':
+                continue
+
+            best_rule = rule_set.match(transaction)
+            if best_rule is None:
+                if transaction.classification_status != 'pending':
+                    reset_classification(transaction)
+                    reverted_count += 1
+                continue
+
+            if best_rule.id == transaction.classified_rule_id:
+                continue
+
+            reset_classification(transaction)
+            best_rule.apply_to(transaction)
+            reclassified_count += 1
+
+    return reverted_count, reclassified_count
+
+
+# (규칙 세대 번호, CompiledRuleSet) - 세대 번호는 cache 모듈이 모든 워커에 공유
+_rule_set = None
+_rule_set_lock = threading.Lock()
+
+
+def get_rule_set():
+    """캐시된 활성 규칙 모음 반환 (없거나 다른 워커에서 규칙이 바뀌었으면 DB에서 다시 로드)"""
+    global _rule_set
+    generation = cache_generation(RULES_NAMESPACE)
+    cached = _rule_set
+    if cached is None or cached[0] != generation:
+        with _rule_set_lock:
+            cached = _rule_set
+            if cached is None or cached[0] != generation:
+                cached = _rule_set = (generation, CompiledRuleSet.load())
+    return cached[1]
+
+
+def invalidate_rule_set():
+    """규칙 변경(커밋 후) 시 모든 워커의 캐시된 규칙 모음 무효화"""
+    global _rule_set
+    with _rule_set_lock:
+        _rule_set = None
+    bump_generation(RULES_NAMESPACE)
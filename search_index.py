@@ -0,0 +1,195 @@
+"""
+거래 검색 색인
+
+거래내용/거래처를 n-gram(2글자) 토큰으로 색인해 ILIKE '%검색어%' 전체 스캔 없이
+부분 문자열 검색과 관련도 정렬을 제공한다. 한국어는 띄어쓰기 단위 단어 안의 부분 문자열로
+검색하는 경우가 많아 형태소 분석 대신 2-gram을 쓴다 ('스타벅스' -> 스타 타벅 벅스).
+
+- SQLite: FTS5 가상 테이블 (bm25 정렬)
+- PostgreSQL: tsvector('simple') 생성 컬럼 + GIN 인덱스 (ts_rank 정렬)
+- 그 밖의 DB이거나 FTS5가 없으면 색인을 쓰지 않고 기존 ILIKE 검색으로 처리
+
+ORM으로 추가/수정한 거래는 flush 이벤트에서, 업로드 일괄 INSERT는 index_transactions()로 색인한다.
+업체명은 업체 테이블이 작으므로 색인하지 않고 검색 시 업체 ID 목록으로 찾는다.
+"""
+
+import re
+
+from sqlalchemy import event, inspect, select, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from sqlalchemy.types import Float, Integer
+
+from app import db
+from models import Transaction
+
+SEARCH_TABLE = 'transaction_search'
+
+# 색인 INSERT 한 번에 처리할 거래 수
+SEARCH_INDEX_CHUNK_SIZE = 1000
+
+WORD_PATTERN = re.compile(r'[^\W_]+')
+
+_backend = {}
+
+
+def ngram_words(value):
+    """문자열을 소문자 단어별 2-gram 목록으로 분해 (한 글자 단어는 그대로)"""
+    words = []
+    for word in WORD_PATTERN.findall((value or '').lower()):
+        if len(word) == 1:
+            words.append([word])
+        else:
+            words.append([word[index:index + 2] for index in range(len(word) - 1)])
+    return words
+
+
+def ngram_document(*values):
+    """색인할 n-gram 토큰 문자열"""
+    return ' '.join(token for value in values for word in ngram_words(value) for token in word)
+
+
+def search_backend():
+    """사용 중인 DB의 검색 색인 종류 ('fts5', 'tsvector' 또는 None)"""
+    engine = db.engine
+    if engine not in _backend:
+        backend = None
+        if engine.dialect.name == 'sqlite':
+            backend = 'fts5'
+        elif engine.dialect.name == 'postgresql':
+            backend = 'tsvector'
+        _backend[engine] = backend
+    return _backend[engine]
+
+
+def ensure_search_index():
+    """검색 색인 테이블 생성 - 비어 있는데 거래가 있으면 전체 색인"""
+    backend = search_backend()
+    if backend is None:
+        return
+
+    try:
+        with db.engine.begin() as conn:
+            if backend == 'fts5':
+                conn.exec_driver_sql(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} "
+                    f"USING fts5(ngrams, tokenize='unicode61 remove_diacritics 0')"
+                )
+            else:
+                conn.exec_driver_sql(
+                    f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ("
+                    f"transaction_id INTEGER PRIMARY KEY, "
+                    f"ngrams TEXT NOT NULL, "
+                    f"document TSVECTOR GENERATED ALWAYS AS (to_tsvector('simple', ngrams)) STORED)"
+                )
+                conn.exec_driver_sql(
+                    f"CREATE INDEX IF NOT EXISTS ix_{SEARCH_TABLE}_document ON {SEARCH_TABLE} USING GIN (document)"
+                )
+    except DBAPIError as e:
+        # FTS5 미지원 SQLite 빌드, PostgreSQL 11 이하 등 - ILIKE 검색 유지
+        print(f"Warning: transaction search index unavailable ({e.orig}), using ILIKE search")
+        _backend[db.engine] = None
+        return
+
+    indexed = db.session.execute(text(f'SELECT 1 FROM {SEARCH_TABLE} LIMIT 1')).first()
+    if indexed is None and db.session.query(Transaction.id).first() is not None:
+        rebuilt = rebuild_search_index()
+        print(f"Transaction search index rebuilt: {rebuilt} rows")
+
+
+def _write_documents(connection, documents):
+    """{거래 ID: n-gram 문자열} 색인 저장 (있으면 교체)"""
+    rows = [{'id': transaction_id, 'ngrams': ngrams} for transaction_id, ngrams in documents.items()]
+    if not rows:
+        return
+    if search_backend() == 'fts5':
+        connection.execute(text(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = :id'), rows)
+        connection.execute(text(f'INSERT INTO {SEARCH_TABLE} (rowid, ngrams) VALUES (:id, :ngrams)'), rows)
+    else:
+        connection.execute(text(
+            f'INSERT INTO {SEARCH_TABLE} (transaction_id, ngrams) VALUES (:id, :ngrams) '
+            f'ON CONFLICT (transaction_id) DO UPDATE SET ngrams = EXCLUDED.ngrams'
+        ), rows)
+
+
+def index_transactions(condition):
+    """조건에 맞는 거래를 색인 (일괄 INSERT 후 호출, 커밋은 호출자가 함) - 색인한 건수 반환"""
+    if search_backend() is None:
+        return 0
+
+    connection = db.session.connection()
+    result = connection.execute(
+        select(Transaction.id, Transaction.description, Transaction.counterparty).where(condition)
+    )
+    count = 0
+    while True:
+        rows = result.fetchmany(SEARCH_INDEX_CHUNK_SIZE)
+        if not rows:
+            break
+        _write_documents(connection, {row.id: ngram_document(row.description, row.counterparty) for row in rows})
+        count += len(rows)
+    return count
+
+
+def rebuild_search_index():
+    """검색 색인 전체 재생성 - 색인한 건수 반환"""
+    if search_backend() is None:
+        return 0
+    db.session.execute(text(f'DELETE FROM {SEARCH_TABLE}'))
+    count = index_transactions(Transaction.id.isnot(None))
+    db.session.commit()
+    return count
+
+
+@event.listens_for(Session, 'after_flush')
+def _index_flushed_transactions(session, flush_context):
+    """추가되었거나 거래내용/거래처가 바뀐 거래 색인"""
+    if session is not db.session() or search_backend() is None:
+        return
+
+    documents = {}
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, Transaction) or obj.id is None:
+            continue
+        state = inspect(obj)
+        if obj in session.new or state.attrs.description.history.has_changes() \
+                or state.attrs.counterparty.history.has_changes():
+            documents[obj.id] = ngram_document(obj.description, obj.counterparty)
+    if documents:
+        _write_documents(session.connection(), documents)
+
+
+def search_query_string(search):
+    """검색어를 색인 쿼리 문자열로 변환 - 색인으로 찾을 수 없으면(한 글자 단어 포함) None"""
+    words = ngram_words(search)
+    if not words or any(len(word[0]) < 2 for word in words):
+        return None
+    if search_backend() == 'fts5':
+        # 단어별 n-gram 구문(phrase)을 AND로 결합
+        return ' AND '.join('"' + ' '.join(word) + '"' for word in words)
+    return ' & '.join('(' + ' <-> '.join(f"'{token}'" for token in word) + ')' for word in words)
+
+
+def search_ranking(search):
+    """
+    검색어에 맞는 거래 ID와 관련도 점수(클수록 관련도 높음) 서브쿼리
+
+    색인을 쓸 수 없으면 None을 반환하므로 호출자는 ILIKE 검색으로 처리한다.
+    """
+    query_string = search_query_string(search)
+    if query_string is None:
+        return None
+
+    if search_backend() == 'fts5':
+        statement = text(
+            f'SELECT rowid AS transaction_id, -bm25({SEARCH_TABLE}) AS score '
+            f'FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :query'
+        )
+    else:
+        statement = text(
+            f"SELECT transaction_id, ts_rank(document, to_tsquery('simple', :query)) AS score "
+            f"FROM {SEARCH_TABLE} WHERE document @@ to_tsquery('simple', :query)"
+        )
+    return statement.bindparams(query=query_string).columns(
+        transaction_id=Integer, score=Float
+    ).subquery('search_rank')
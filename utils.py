@@ -1,25 +1,14 @@
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 import re
+from sqlalchemy import and_, true
 from models import MappingRule, Transaction
+from rule_engine import CompiledRule, get_rule_set
 
-def apply_classification_rules(transaction):
-    """거래에 분류 규칙 적용"""
-    rules = MappingRule.query.filter_by(is_active=True).order_by(MappingRule.priority.desc()).all()
-    
-    for rule in rules:
-        if check_rule_condition(transaction, rule):
-            # 규칙 조건에 맞으면 분류 적용
-            if rule.target_category_id:
-                transaction.category_id = rule.target_category_id
-            if rule.target_department_id:
-                transaction.department_id = rule.target_department_id
-            if rule.target_vendor_id:
-                transaction.vendor_id = rule.target_vendor_id
-            
-            transaction.classification_status = 'classified'
-            return True
-    
-    return False
+def apply_classification_rules(transaction, rule_set=None):
+    """거래에 분류 규칙 적용 (캐시된 컴파일 규칙 사용)"""
+    if rule_set is None:
+        rule_set = get_rule_set()
+    return rule_set.apply(transaction)
 
 def parse_alert_condition(condition_text):
     """
@@ -92,32 +81,7 @@ def generate_condition_from_type(condition_type, condition_value):
 
 def check_rule_condition(transaction, rule):
     """규칙 조건 확인"""
-    field_value = getattr(transaction, rule.condition_field, '')
-    if field_value is None:
-        field_value = ''
-    
-    field_value = str(field_value).lower()
-    condition_value = rule.condition_value.lower()
-    
-    if rule.condition_type == 'contains':
-        return condition_value in field_value
-    elif rule.condition_type == 'equals':
-        return field_value == condition_value
-    elif rule.condition_type == 'regex':
-        try:
-            return bool(re.search(condition_value, field_value))
-        except re.error:
-            return False
-    elif rule.condition_type == 'amount_range':
-        # condition_value 형식: "min,max" 예: "10000,50000"
-        try:
-            min_val, max_val = map(float, condition_value.split(','))
-            amount = float(transaction.amount)
-            return min_val <= abs(amount) <= max_val
-        except (ValueError, AttributeError):
-            return False
-    
-    return False
+    return CompiledRule(rule).matches(transaction)
 
 def format_currency(amount):
     """통화 포맷팅"""
@@ -173,3 +137,33 @@ app.jinja_env.filters['transaction_type'] = get_transaction_type_text
 app.jinja_env.filters['classification_status'] = get_classification_status_text
 app.jinja_env.filters['alert_type'] = get_alert_type_text
 app.jinja_env.filters['amount_color'] = get_color_for_amount
+
+def day_bounds(start_day=None, end_day=None):
+    """
+    날짜 구간(양 끝 포함)을 반개구간 datetime 경계로 변환
+    예시: (2024-05-01, 2024-05-31) -> (2024-05-01 00:00, 2024-06-01 00:00)
+    """
+    start = None
+    end = None
+    if start_day is not None:
+        if isinstance(start_day, datetime):
+            start_day = start_day.date()
+        start = datetime.combine(start_day, datetime.min.time())
+    if end_day is not None:
+        if isinstance(end_day, datetime):
+            end_day = end_day.date()
+        end = datetime.combine(end_day + timedelta(days=1), datetime.min.time())
+    return start, end
+
+def date_range_filter(column, start_day=None, end_day=None):
+    """
+    날짜 컬럼 필터 조건 (column >= 시작일 0시 AND column < 종료일 다음날 0시)
+    func.date(column)로 감싸지 않으므로 인덱스 범위 검색이 가능하다.
+    """
+    start, end = day_bounds(start_day, end_day)
+    conditions = []
+    if start is not None:
+        conditions.append(column >= start)
+    if end is not None:
+        conditions.append(column < end)
+    return and_(*conditions) if conditions else true()
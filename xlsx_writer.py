@@ -0,0 +1,60 @@
+"""
+openpyxl write_only 워크북 작성기
+
+write_only 워크시트는 append한 행을 즉시 임시 파일에 쓰므로 행 수와 관계없이 메모리가 일정하다.
+앱/DB에 의존하지 않아 요청 처리와 내보내기 작업 프로세스 양쪽에서 쓴다.
+"""
+
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font, PatternFill
+from openpyxl.utils import get_column_letter
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+class XlsxWorkbook:
+    """시트 행을 순서대로 기록하는 write_only 워크북"""
+
+    header_font = Font(bold=True, color="FFFFFF")
+    header_fill = PatternFill("solid", fgColor="4472C4")
+    header_alignment = Alignment(horizontal="center")
+
+    def __init__(self):
+        self.workbook = openpyxl.Workbook(write_only=True)
+
+    def add_sheet(self, title, headers, rows, column_widths=None, row_fill=None):
+        """
+        시트 추가 - rows는 값 목록의 반복자(쿼리 커서 등)
+
+        row_fill(row)이 PatternFill을 반환하면 그 행의 모든 셀에 채우기를 적용한다.
+        """
+        worksheet = self.workbook.create_sheet(title)
+        # write_only 시트의 컬럼 너비는 행을 쓰기 전에 지정해야 함
+        for column, width in enumerate(column_widths or [], 1):
+            worksheet.column_dimensions[get_column_letter(column)].width = width
+
+        worksheet.append([self._header_cell(worksheet, header) for header in headers])
+        for row in rows:
+            fill = row_fill(row) if row_fill else None
+            if fill is None:
+                worksheet.append(row)
+                continue
+            cells = []
+            for value in row:
+                cell = WriteOnlyCell(worksheet, value=value)
+                cell.fill = fill
+                cells.append(cell)
+            worksheet.append(cells)
+        return worksheet
+
+    def _header_cell(self, worksheet, value):
+        cell = WriteOnlyCell(worksheet, value=value)
+        cell.font = self.header_font
+        cell.fill = self.header_fill
+        cell.alignment = self.header_alignment
+        return cell
+
+    def save(self, path):
+        """파일로 저장"""
+        self.workbook.save(path)